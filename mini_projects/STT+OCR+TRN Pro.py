@@ -17,7 +17,7 @@ from typing import Optional, Dict, Any, Tuple, List
 import io
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox, colorchooser, filedialog, simpledialog
-from PIL import ImageGrab, ImageEnhance, ImageFilter, Image, ImageDraw, ImageTk, ImageFont, ImageOps
+from PIL import ImageGrab, ImageEnhance, ImageFilter, Image, ImageDraw, ImageFont, ImageOps
 import pytesseract
 from pynput import keyboard
 import numpy as np
@@ -25,8 +25,9 @@ import sounddevice as sd
 import torch
 import math
 from datetime import datetime
-from collections import deque
 import time
+from edit_history import EditHistory
+from paint_engine import CanvasRenderer, StrokeEngine, draw_polyline, flood_fill, union_box
 
 
 # ==================== ПРОСТА МАЛЮВАЛЬНЯ БЕЗ АЛЬФА-КАНАЛУ ====================
@@ -46,6 +47,8 @@ class DrawingCanvas(tk.Toplevel):
         "fill": "🪣 Заливка",
         "text": "📝 Текст"
     }
+    # Пам'ять під undo/redo: зберігаються лише змінені області, тож сотні кроків у ній вміщаються
+    HISTORY_BUDGET = 128 * 1024 * 1024
 
     def __init__(self, app_instance):
         super().__init__()
@@ -67,15 +70,14 @@ class DrawingCanvas(tk.Toplevel):
         self.drawing = False
         self.last_pos = None
         self.start_pos = None
+        # Область поточного мазка: у історію потрапляє лише вона
+        self.stroke_box = None
 
-        # ОПТИМІЗАЦІЯ: Обмеження FPS для зменшення лагів
-        self.last_update_time = time.time()
-        self.min_frame_time = 0  # Максимум 60 FPS
+        # Точки мазка буферизуються і малюються згладженими пачками раз на кадр
+        self.strokes = StrokeEngine(self, self.draw_stroke)
 
-        # Історія (проста)
-        self.history = []
-        self.history_index = -1
-        self.max_history = 30
+        # Історія на дельтах змінених областей
+        self.history = EditHistory(self.HISTORY_BUDGET)
 
         # Основне зображення (RGB, без альфа-каналу)
         self.image = Image.new('RGB', self.canvas_size, (255, 255, 255))
@@ -84,12 +86,13 @@ class DrawingCanvas(tk.Toplevel):
         # Створення UI
         self.create_ui()
         self.create_menu()
+        self.renderer = CanvasRenderer(self.canvas)
 
         # Прив'язка подій
         self.bind_events()
 
         # Зберегти початковий стан
-        self.save_state()
+        self.history.reset(self.image)
         self.update_canvas()
 
     def create_ui(self):
@@ -192,6 +195,20 @@ class DrawingCanvas(tk.Toplevel):
                  troughcolor='#2d2d2d', highlightthickness=0,
                  command=self.update_brush_size).pack(fill=tk.X, padx=5)
 
+        # Заливка
+        fill_frame = tk.LabelFrame(self.left_panel, text=" Заливка ",
+                                   bg='#252526', fg='white', font=('Segoe UI', 10, 'bold'))
+        fill_frame.pack(fill=tk.X, padx=5, pady=5)
+
+        self.fill_tolerance = tk.IntVar(value=0)
+        tk.Scale(fill_frame, from_=0, to=255, orient=tk.HORIZONTAL, label="Допуск",
+                 variable=self.fill_tolerance, bg='#3c3c3c', fg='white',
+                 troughcolor='#2d2d2d', highlightthickness=0).pack(fill=tk.X, padx=5)
+        self.fill_diagonal = tk.BooleanVar(value=False)
+        tk.Checkbutton(fill_frame, text="Через діагоналі", variable=self.fill_diagonal,
+                       bg='#252526', fg='white', selectcolor='#3c3c3c',
+                       activebackground='#252526').pack(anchor=tk.W, padx=5)
+
         # Бистрі дії
         actions_frame = tk.LabelFrame(self.left_panel, text=" Дії ",
                                       bg='#252526', fg='white', font=('Segoe UI', 10, 'bold'))
@@ -244,45 +261,25 @@ class DrawingCanvas(tk.Toplevel):
         self.drawing = True
         self.last_pos = (event.x, event.y)
         self.start_pos = (event.x, event.y)
+        self.stroke_box = None
+        if self.current_tool in ["brush", "pencil", "eraser"]:
+            self.strokes.begin(event.x, event.y)
 
     def on_mouse_move(self, event):
-        """ОПТИМІЗОВАНИЙ рух миші з обмеженням FPS"""
+        """Рух миші: для кисті лише запам'ятовується точка, малювання - раз на кадр"""
         if not self.drawing:
             return
 
-        # ОБМЕЖЕННЯ FPS: пропускаємо події, якщо йдуть занадто швидко
-        current_time = time.time()
-        if current_time - self.last_update_time < self.min_frame_time:
-            # Оновлюємо позицію, але не малюємо
-            self.last_pos = (event.x, event.y)
-            return
-
-        self.last_update_time = current_time
-
         current_pos = (event.x, event.y)
 
-        # Малювання в реальному часі
-        if self.current_tool in ["brush", "pencil", "eraser"]:
-            # 1. Малюємо на Image
-            self.draw_line(self.last_pos, current_pos)
-
-            # 2. ШВИДКЕ оновлення: тільки додаємо лінію на canvas, без повного redraw
-            color = self.primary_color
-            width = self.brush_size
-            if self.current_tool == "pencil":
-                width = max(1, width // 2)
-            elif self.current_tool == "eraser":
-                color = "#ffffff"
-                width = width * 2
-
-            self.canvas.create_line(self.last_pos[0], self.last_pos[1],
-                                    current_pos[0], current_pos[1],
-                                    fill=color, width=width, capstyle=tk.ROUND)
+        if self.strokes.active:
+            self.strokes.add(event.x, event.y)
 
         elif self.current_tool in ["line", "rectangle", "circle", "filled_rect", "filled_circle"]:
-            # Для форм - повне оновлення (рідко викликається)
+            # Для форм перемальовується лише контур-прев'ю, зображення не чіпається
             self.last_pos = current_pos
-            self.update_canvas()
+            self.canvas.delete("preview")
+            self.draw_preview(current_pos)
 
         self.last_pos = current_pos
 
@@ -292,34 +289,52 @@ class DrawingCanvas(tk.Toplevel):
             return
 
         end_pos = (event.x, event.y)
+        self.strokes.end(event.x, event.y)
+        box = self.stroke_box
 
         if self.current_tool in ["line", "rectangle", "circle", "filled_rect", "filled_circle", "fill", "text"]:
-            self.apply_tool(end_pos)
+            box = self.apply_tool(end_pos)
 
         self.drawing = False
+        self.stroke_box = None
 
         # ОПТИМІЗАЦІЯ: зберігаємо стан тільки після завершення дії
-        self.save_state()
-        self.update_canvas()
-
-    def draw_line(self, start: Tuple[int, int], end: Tuple[int, int]):
-        """Малювати лінію"""
-        color = self.primary_color
-        width = self.brush_size
+        self.save_state(box)
+        self.update_canvas(box)
 
+    def brush_style(self):
+        """Колір і товщина поточного інструмента"""
         if self.current_tool == "pencil":
-            width = max(1, width // 2)
-        elif self.current_tool == "eraser":
-            color = "#ffffff"
-            width = width * 2
+            return self.primary_color, max(1, self.brush_size // 2)
+        if self.current_tool == "eraser":
+            return "#ffffff", self.brush_size * 2
+        return self.primary_color, self.brush_size
+
+    def draw_stroke(self, points):
+        """Пачка згладжених точок мазка: одна операція на Image і один елемент canvas"""
+        color, width = self.brush_style()
+        box = draw_polyline(self.draw, points, color, width)
+        self.stroke_box = union_box(self.stroke_box, box)
+
+        # Лінія на canvas одразу, у бітмап вона переходить пачками
+        coords = [c for point in (points if len(points) > 1 else points * 2) for c in point]
+        item = self.canvas.create_line(*coords, fill=color, width=width,
+                                       capstyle=tk.ROUND, joinstyle=tk.ROUND)
+        self.renderer.add_stroke_item(item, box)
 
-        self.draw.line([start, end], fill=color, width=width)
+    @staticmethod
+    def segment_box(start: Tuple[int, int], end: Tuple[int, int], width: int):
+        """Межі відрізка з урахуванням товщини"""
+        pad = width // 2 + 1
+        return (min(start[0], end[0]) - pad, min(start[1], end[1]) - pad,
+                max(start[0], end[0]) + pad + 1, max(start[1], end[1]) + pad + 1)
 
     def apply_tool(self, end_pos: Tuple[int, int]):
-        """Застосувати інструмент"""
+        """Застосувати інструмент; повертає змінену область, якщо вона відома"""
         x0, y0 = self.start_pos
         x1, y1 = end_pos
         color = self.primary_color
+        box = self.segment_box(self.start_pos, end_pos, self.brush_size)
 
         if self.current_tool == "line":
             self.draw.line([self.start_pos, end_pos], fill=color, width=self.brush_size)
@@ -332,50 +347,16 @@ class DrawingCanvas(tk.Toplevel):
         elif self.current_tool == "filled_circle":
             self.draw.ellipse([x0, y0, x1, y1], fill=color, outline=color)
         elif self.current_tool == "fill":
-            self.flood_fill(self.start_pos[0], self.start_pos[1], color)
+            return self.flood_fill(self.start_pos[0], self.start_pos[1], color)
         elif self.current_tool == "text":
             self.add_text(x0, y0)
+            return None
+        return box
 
     def flood_fill(self, x: int, y: int, fill_color: str):
-        """ОПТИМІЗОВАНА заливка з deque"""
-        if x < 0 or y < 0 or x >= self.image.width or y >= self.image.height:
-            return
-
-        # Конвертувати hex в RGB
-        hex_color = fill_color.lstrip('#')
-        rgb_fill = tuple(int(hex_color[i:i + 2], 16) for i in (0, 2, 4))
-
-        target_color = self.image.getpixel((x, y))
-
-        # Якщо колір вже такий - виходимо
-        if target_color == rgb_fill:
-            return
-
-        pixels = self.image.load()
-        width, height = self.image.size
-        visited = set()
-        to_fill = deque([(x, y)])  # ВИКОРИСТОВУЄМО DEQUE замість списку
-
-        while to_fill:
-            cx, cy = to_fill.popleft()  # O(1) операція
-
-            if (cx, cy) in visited:
-                continue
-            visited.add((cx, cy))
-
-            try:
-                current_color = pixels[cx, cy]
-            except:
-                continue
-
-            if current_color == target_color:
-                pixels[cx, cy] = rgb_fill
-
-                # Додаємо сусідів
-                if cx > 0: to_fill.append((cx - 1, cy))
-                if cx < width - 1: to_fill.append((cx + 1, cy))
-                if cy > 0: to_fill.append((cx, cy - 1))
-                if cy < height - 1: to_fill.append((cx, cy + 1))
+        """Заливка відрізками рядків через NumPy; повертає залиту область"""
+        connectivity = 8 if self.fill_diagonal.get() else 4
+        return flood_fill(self.image, x, y, fill_color, self.fill_tolerance.get(), connectivity)
 
     def add_text(self, x: int, y: int):
         """Додати текст"""
@@ -401,58 +382,49 @@ class DrawingCanvas(tk.Toplevel):
         x1, y1 = current_pos
 
         if self.current_tool == "line":
-            self.canvas.create_line(x0, y0, x1, y1, fill=self.primary_color, width=self.brush_size)
+            self.canvas.create_line(x0, y0, x1, y1, fill=self.primary_color, width=self.brush_size,
+                                    tags="preview")
         elif self.current_tool == "rectangle":
-            self.canvas.create_rectangle(x0, y0, x1, y1, outline=self.primary_color, width=self.brush_size)
+            self.canvas.create_rectangle(x0, y0, x1, y1, outline=self.primary_color, width=self.brush_size,
+                                         tags="preview")
         elif self.current_tool == "circle":
-            self.canvas.create_oval(x0, y0, x1, y1, outline=self.primary_color, width=self.brush_size)
+            self.canvas.create_oval(x0, y0, x1, y1, outline=self.primary_color, width=self.brush_size,
+                                    tags="preview")
         elif self.current_tool == "filled_rect":
-            self.canvas.create_rectangle(x0, y0, x1, y1, fill=self.primary_color, outline=self.primary_color)
+            self.canvas.create_rectangle(x0, y0, x1, y1, fill=self.primary_color, outline=self.primary_color,
+                                         tags="preview")
         elif self.current_tool == "filled_circle":
-            self.canvas.create_oval(x0, y0, x1, y1, fill=self.primary_color, outline=self.primary_color)
+            self.canvas.create_oval(x0, y0, x1, y1, fill=self.primary_color, outline=self.primary_color,
+                                    tags="preview")
 
-    def update_canvas(self):
-        """Оновити відображення canvas"""
-        self.tk_image = ImageTk.PhotoImage(self.image)
-        self.canvas.delete("all")
-        self.canvas.create_image(0, 0, anchor=tk.NW, image=self.tk_image)
+    def update_canvas(self, box=None):
+        """Оновити відображення canvas: у постійному PhotoImage лише область box (None - усе)"""
+        self.renderer.refresh(self.image, box)
+        self.canvas.delete("preview")
 
         # Малювати попереджуючу форму
         if self.drawing and self.current_tool in ["line", "rectangle", "circle", "filled_rect", "filled_circle"]:
             self.draw_preview(self.last_pos)
 
-    def save_state(self):
-        """Зберегти стан для undo/redo"""
-        # Видаляємо майбутню історію
-        self.history = self.history[:self.history_index + 1]
-
-        # Зберігаємо копію зображення
-        self.history.append(self.image.copy())
-
-        if len(self.history) > self.max_history:
-            self.history.pop(0)
-        else:
-            self.history_index += 1
+    def save_state(self, box=None):
+        """Зберегти зміну для undo/redo (лише змінену область)"""
+        self.history.commit(self.image, box)
 
     def undo(self):
         """Скасувати"""
-        if self.history_index > 0:
-            self.history_index -= 1
-            self.restore_state()
+        if self.history.can_undo:
+            self.restore_state(self.history.undo(self.image))
 
     def redo(self):
         """Повторити"""
-        if self.history_index < len(self.history) - 1:
-            self.history_index += 1
-            self.restore_state()
+        if self.history.can_redo:
+            self.restore_state(self.history.redo(self.image))
 
-    def restore_state(self):
+    def restore_state(self, image):
         """Відновити стан з історії"""
-        if self.history_index < 0 or self.history_index >= len(self.history):
-            return
-
-        self.image = self.history[self.history_index].copy()
+        self.image = image
         self.draw = ImageDraw.Draw(self.image)
+        self.canvas_size = image.size
         self.update_canvas()
 
     def clear_canvas(self):
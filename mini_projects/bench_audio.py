@@ -0,0 +1,112 @@
+"""
+Бенчмарк пам'яті для конвертації аудіо.
+
+Створює довгий WAV (за замовчуванням 3 години, 44.1 кГц, стерео, ~1.9 ГБ) і конвертує його
+потоковим шляхом (convert_audio) та старим шляхом (AudioSegment.from_file + export).
+Кожен спосіб запускається в окремому процесі; пікова RSS береться з getrusage
+разом із дочірнім ffmpeg. Потрібен Unix (модуль resource).
+
+    python bench_audio.py
+    python bench_audio.py --hours 1 --format mp3 --skip-legacy
+"""
+import argparse
+import math
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+# Скільки секунд сигналу генерувати за один запис
+WRITE_SECONDS = 10
+
+
+def build_long_wav(path, hours, sample_rate=SAMPLE_RATE, channels=CHANNELS):
+    """Пише WAV з тоном 440 Гц блоками, не тримаючи весь сигнал у пам'яті"""
+    # Один період тону повторюється, тож блок будується один раз
+    period = [int(12000 * math.sin(2 * math.pi * 440 * i / sample_rate)) for i in range(sample_rate)]
+    second = struct.pack(f"<{sample_rate * channels}h", *[s for s in period for _ in range(channels)])
+    block = second * WRITE_SECONDS
+    total_seconds = int(hours * 3600)
+    with wave.open(path, 'wb') as writer:
+        writer.setnchannels(channels)
+        writer.setsampwidth(2)
+        writer.setframerate(sample_rate)
+        for _ in range(total_seconds // WRITE_SECONDS):
+            writer.writeframesraw(block)
+        writer.writeframesraw(second * (total_seconds % WRITE_SECONDS))
+
+
+def worker(method, src, output, format):
+    """Виконується в дочірньому процесі: конвертує і друкує час та пікову RSS у МБ"""
+    import resource
+    from media_convert import convert_audio
+    from pydub import AudioSegment
+
+    start = time.perf_counter()
+    if method == "streaming":
+        convert_audio(src, output, format)
+    else:
+        AudioSegment.from_file(src).export(output, format=format)
+    elapsed = time.perf_counter() - start
+
+    # ru_maxrss у КБ на Linux і в байтах на macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    peak_self = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+    peak_children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    print(f"{elapsed:.2f} {peak_self:.1f} {peak_children:.1f}")
+
+
+def measure(method, src, output, format):
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", method, src, output, format],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        print(f"{method:10} ❌ {result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'помилка'}")
+        return None
+    elapsed, peak_self, peak_children = map(float, result.stdout.split()[-3:])
+    peak = max(peak_self, peak_children)
+    print(f"{method:10} {elapsed:9.1f} с   пікова RSS: {peak:9.1f} МБ "
+          f"(python {peak_self:.1f} МБ, ffmpeg {peak_children:.1f} МБ)")
+    return peak
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--worker":
+        worker(*sys.argv[2:6])
+        return
+
+    parser = argparse.ArgumentParser(description="Пікова пам'ять конвертації аудіо")
+    parser.add_argument('--hours', type=float, default=3.0, help="тривалість тестового WAV")
+    parser.add_argument('--format', default="mp3", help="цільовий формат")
+    parser.add_argument('--src', help="використати наявний файл замість згенерованого")
+    parser.add_argument('--skip-legacy', action='store_true', help="не запускати старий шлях (потребує RAM)")
+    parser.add_argument('--keep', action='store_true', help="не видаляти тимчасові файли")
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp(prefix="bench_audio_")
+    try:
+        src = args.src
+        if not src:
+            src = os.path.join(temp_dir, "long.wav")
+            print(f"Створення WAV на {args.hours} год у {src} ...")
+            start = time.perf_counter()
+            build_long_wav(src, args.hours)
+            print(f"Готово за {time.perf_counter() - start:.1f} с, {os.path.getsize(src) / 1024 ** 3:.2f} ГБ\n")
+
+        streaming = measure("streaming", src, os.path.join(temp_dir, f"streaming.{args.format}"), args.format)
+        if not args.skip_legacy:
+            legacy = measure("legacy", src, os.path.join(temp_dir, f"legacy.{args.format}"), args.format)
+            if streaming and legacy:
+                print(f"\nПотоковий шлях використовує в {legacy / streaming:.1f} раза менше пам'яті")
+    finally:
+        if not args.keep:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Бенчмарк швидкості конвертації зображень.
+
+Генерує набір JPEG-фото (за замовчуванням 40 шт. 4000x3000) і порівнює старий шлях
+(повне декодування + save з типовими параметрами) з профілями convert_image,
+які для зменшених результатів декодують JPEG через draft().
+
+    python bench_images.py
+    python bench_images.py --count 100 --format webp --profiles web thumbnail
+    python bench_images.py --src "photos/*.jpg"
+"""
+import argparse
+import glob
+import os
+import shutil
+import tempfile
+import time
+
+from PIL import Image
+
+from media_convert import IMAGE_PROFILES, convert_image
+
+
+def build_photos(folder, count, size):
+    """Фото-подібні JPEG: градієнти з шумом, щоб кодер не стискав їх тривіально"""
+    width, height = size
+    noise = Image.effect_noise(size, 40)
+    gradient_x = Image.linear_gradient("L").rotate(90).resize(size)
+    gradient_y = Image.linear_gradient("L").resize(size)
+    base = Image.merge("RGB", (gradient_x, gradient_y, noise))
+    paths = []
+    for i in range(count):
+        path = os.path.join(folder, f"photo_{i:04d}.jpg")
+        # Невеликий зсув, щоб файли не були однаковими
+        base.rotate(i % 7, expand=False).save(path, "JPEG", quality=92)
+        paths.append(path)
+    return paths
+
+
+def legacy_convert(src, output, format):
+    """Попередній convert_image: повне декодування і збереження з типовими параметрами"""
+    img = Image.open(src)
+    if format == "jpeg":
+        img = img.convert("RGB")
+    img.save(output)
+
+
+def measure(label, paths, convert):
+    start = time.perf_counter()
+    for path in paths:
+        convert(path)
+    elapsed = time.perf_counter() - start
+    rate = len(paths) / elapsed if elapsed else float('inf')
+    print(f"{label:24} {elapsed:8.2f} с  {rate:8.1f} зобр/с")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Швидкість конвертації зображень за профілями")
+    parser.add_argument('--count', type=int, default=40, help="кількість згенерованих фото")
+    parser.add_argument('--size', type=int, nargs=2, default=[4000, 3000], metavar=('W', 'H'))
+    parser.add_argument('--src', help="шаблон glob з власними фото замість згенерованих")
+    parser.add_argument('--format', default="jpeg", help="цільовий формат")
+    parser.add_argument('--profiles', nargs='+', choices=list(IMAGE_PROFILES), default=list(IMAGE_PROFILES))
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp(prefix="bench_images_")
+    try:
+        if args.src:
+            paths = sorted(glob.glob(args.src))
+        else:
+            print(f"Створення {args.count} фото {args.size[0]}x{args.size[1]} ...")
+            paths = build_photos(temp_dir, args.count, tuple(args.size))
+        out_dir = os.path.join(temp_dir, "out")
+        os.makedirs(out_dir)
+
+        def output_for(path):
+            return os.path.join(out_dir, os.path.splitext(os.path.basename(path))[0] + "." + args.format)
+
+        legacy = measure("старий шлях", paths, lambda path: legacy_convert(path, output_for(path), args.format))
+        for profile in args.profiles:
+            rate = measure(f"профіль {profile}", paths,
+                           lambda path: convert_image(path, output_for(path), args.format, {"profile": profile}))
+            print(f"{'':24} x{rate / legacy:.2f} відносно старого шляху")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,294 @@
+"""
+Конвертер медіафайлів без графічного інтерфейсу.
+
+Приймає файли, шаблони (glob) або папки і конвертує їх у пулі процесів
+(ті самі функції, що й translate_files.py). У режимі --watch стежить за папками
+і конвертує нові файли, щойно вони перестають змінюватися.
+
+    python convert_cli.py "photos/*.jpg" --image WEBP -o out
+    python convert_cli.py incoming --recursive --video MP4 --audio MP3 -j 8
+    python convert_cli.py incoming --watch --interval 5 --settle 10 -o /srv/ingest
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+import queue
+import threading
+import multiprocessing
+
+from media_convert import (FORMATS, DEFAULT_MAX_JOBS, DEFAULT_VIDEO_JOBS, SCRIPT_DIR, CACHE_FILENAME,
+                           IMAGE_PROFILES, DEFAULT_IMAGE_PROFILE,
+                           ConversionScheduler, get_file_type)
+
+
+def parse_size(value):
+    width, _, height = value.lower().partition("x")
+    try:
+        return int(width), int(height or width)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"очікується ШИРИНАxВИСОТА, отримано {value}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетна конвертація медіафайлів")
+    parser.add_argument('inputs', nargs='+', help="файли, шаблони glob або папки")
+    parser.add_argument('-o', '--output-dir', default="converted", help="папка для результатів")
+    for file_type, formats in FORMATS.items():
+        parser.add_argument(f'--{file_type}', type=str.upper, choices=formats, default=formats[0],
+                            help=f"формат для типу {file_type} (за замовчуванням {formats[0]})")
+    parser.add_argument('--image-profile', choices=list(IMAGE_PROFILES), default=DEFAULT_IMAGE_PROFILE,
+                        help="профіль конвертації зображень")
+    parser.add_argument('--max-size', type=parse_size, metavar='WxH', help="обмежити розмір зображень")
+    parser.add_argument('--quality', type=int, help="якість JPEG/WEBP (1-100)")
+    parser.add_argument('--keep-metadata', action='store_true', default=None, help="зберігати EXIF та ICC")
+    parser.add_argument('--only', nargs='+', choices=sorted(FORMATS), help="конвертувати лише ці типи")
+    parser.add_argument('-r', '--recursive', action='store_true', help="обходити папки рекурсивно")
+    parser.add_argument('-j', '--jobs', type=int, default=DEFAULT_MAX_JOBS, help="паралельних завдань")
+    parser.add_argument('--video-jobs', type=int, default=DEFAULT_VIDEO_JOBS, help="з них паралельних відео")
+    parser.add_argument('--no-cache', action='store_true', help="не використовувати кеш конвертацій")
+    parser.add_argument('--cache', help="шлях до бази кешу (за замовчуванням поруч зі скриптом)")
+    parser.add_argument('-w', '--watch', action='store_true', help="стежити за папками і конвертувати нові файли")
+    parser.add_argument('--interval', type=float, default=2.0, help="період перевірки папок у режимі --watch, с")
+    parser.add_argument('--settle', type=float, default=5.0,
+                        help="скільки секунд файл має не змінюватися, щоб вважатися дописаним")
+    parser.add_argument('-q', '--quiet', action='store_true', help="виводити лише помилки та підсумок")
+    return parser.parse_args(argv)
+
+
+def is_supported(path, types):
+    file_type = get_file_type(path)
+    return file_type is not None and file_type in types
+
+
+def iter_sources(inputs, recursive, types, exclude_dir=None):
+    """
+    Повертає (файл, корінь) для підтримуваних файлів; корінь потрібен,
+    щоб зберегти структуру вкладених папок у папці виводу
+    """
+    for pattern in inputs:
+        paths = glob.glob(pattern, recursive=recursive) if glob.has_magic(pattern) else [pattern]
+        for path in paths:
+            if os.path.isdir(path):
+                yield from iter_dir_sources(path, recursive, types, exclude_dir)
+            elif os.path.isfile(path) and is_supported(path, types):
+                yield os.path.abspath(path), os.path.dirname(os.path.abspath(path))
+
+
+def iter_dir_sources(root, recursive, types, exclude_dir=None):
+    root = os.path.abspath(root)
+    stack = [root]
+    while stack:
+        dir_path = stack.pop()
+        try:
+            with os.scandir(dir_path) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                # Папку виводу всередині вхідної не обходимо, інакше результати конвертуються знову
+                if recursive and entry.path != exclude_dir:
+                    stack.append(entry.path)
+            elif entry.is_file() and is_supported(entry.name, types):
+                yield entry.path, root
+
+
+def make_job(src, root, output_dir, formats, image_options=None, suffix=""):
+    file_type = get_file_type(src)
+    output_format = formats[file_type].lower()
+    rel_dir = os.path.relpath(os.path.dirname(src), root)
+    target_dir = os.path.normpath(os.path.join(output_dir, rel_dir))
+    os.makedirs(target_dir, exist_ok=True)
+    base_name = os.path.splitext(os.path.basename(src))[0]
+    return {
+        "src": src,
+        "output": os.path.join(target_dir, f"{base_name}{suffix}.{output_format}"),
+        "type": file_type,
+        "format": output_format,
+        "options": image_options if file_type == "image" else None,
+        "ref": src
+    }
+
+
+def make_jobs(sources, output_dir, formats, image_options=None, assigned=None):
+    """
+    Завдання для (файл, корінь). Завдання виконуються паралельно, тож джерела з однаковим
+    виходом (a.png і a.jpg -> a.webp) отримують розширення джерела в назві (a_png.webp,
+    a_jpg.webp), а якщо й цього мало - ще й номер.
+    assigned - {джерело: вихід} попередніх пакетів (режим --watch): змінений файл пишеться
+    туди ж, що й раніше, а нові файли не займають чужих виходів; словник доповнюється.
+    Повертає завдання і список перейменованих джерел
+    """
+    assigned = {} if assigned is None else assigned
+    taken = {os.path.normcase(output) for output in assigned.values()}
+    jobs = []
+    groups = {}
+    for src, root in sources:
+        job = make_job(src, root, output_dir, formats, image_options)
+        if src in assigned:
+            job["output"] = assigned[src]
+            jobs.append(job)
+        else:
+            groups.setdefault(os.path.normcase(job["output"]), []).append((src, root, job))
+
+    renamed = []
+    for key, group in groups.items():
+        if len(group) == 1 and key not in taken:
+            job = group[0][2]
+        else:
+            for src, root, job in sorted(group, key=lambda entry: entry[0]):
+                suffix = "_" + os.path.splitext(src)[1].lstrip(".").lower()
+                job = make_job(src, root, output_dir, formats, image_options, suffix)
+                number = 2
+                while os.path.normcase(job["output"]) in taken or os.path.normcase(job["output"]) in groups:
+                    job = make_job(src, root, output_dir, formats, image_options, f"{suffix}_{number}")
+                    number += 1
+                taken.add(os.path.normcase(job["output"]))
+                assigned[src] = job["output"]
+                jobs.append(job)
+                renamed.append(src)
+            continue
+        taken.add(key)
+        assigned[job["src"]] = job["output"]
+        jobs.append(job)
+    return jobs, renamed
+
+
+def warn_renamed(renamed):
+    for src in renamed:
+        print(f"⚠️ Однакова назва виходу, до неї додано розширення: {src}", file=sys.stderr)
+
+
+class ConsoleReporter:
+    """Друкує події планувальника в консоль і рахує підсумок"""
+
+    def __init__(self, quiet=False):
+        self.quiet = quiet
+        self.queue = queue.Queue()
+        self.counts = {"completed": 0, "cached": 0, "error": 0, "cancelled": 0}
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def join(self):
+        self.thread.join()
+
+    def _run(self):
+        while True:
+            msg = self.queue.get()
+            if msg[0] == "done":
+                break
+            if msg[0] != "status":
+                continue
+            _, src, status, text = msg
+            if status not in self.counts:
+                continue
+            self.counts[status] += 1
+            if status == "error" or not self.quiet:
+                print(f"{text} {src}", file=sys.stderr if status == "error" else sys.stdout, flush=True)
+
+
+def convert_batch(jobs, args, cache_path):
+    """Конвертує пакет завдань і повертає лічильники результатів"""
+    reporter = ConsoleReporter(args.quiet)
+    reporter.start()
+    scheduler = ConversionScheduler(reporter.queue, args.jobs, args.video_jobs, cache_path)
+    try:
+        # На Ctrl+C планувальник сам скасовує всі завдання і пробрасує KeyboardInterrupt далі
+        scheduler.run(jobs)
+    finally:
+        reporter.join()
+    return reporter.counts
+
+
+def print_summary(counts, elapsed):
+    print(f"📊 Конвертовано: {counts['completed']} | з кешу: {counts['cached']} | "
+          f"помилок: {counts['error']} | скасовано: {counts['cancelled']} | {elapsed:.1f} с", file=sys.stderr)
+
+
+def watch(args, formats, types, cache_path, output_dir):
+    """
+    Опитує папки кожні interval секунд. Новий або змінений файл конвертується,
+    коли його розмір і mtime не змінювалися settle секунд (копіювання завершено)
+    """
+    pending = {}     # шлях -> (розмір, mtime_ns, з якого моменту незмінний, корінь)
+    processed = {}   # шлях -> (розмір, mtime_ns) вже конвертованої версії
+    assigned = {}    # шлях -> вихідний файл, закріплений за ним
+    print(f"👀 Стежу за: {', '.join(args.inputs)} (Ctrl+C - вихід)", file=sys.stderr)
+
+    while True:
+        now = time.monotonic()
+        seen = set()
+        for src, root in iter_sources(args.inputs, args.recursive, types, output_dir):
+            seen.add(src)
+            try:
+                src_stat = os.stat(src)
+            except OSError:
+                continue
+            signature = (src_stat.st_size, src_stat.st_mtime_ns)
+            if processed.get(src) == signature:
+                continue
+            previous = pending.get(src)
+            if previous is None or previous[:2] != signature:
+                pending[src] = signature + (now, root)
+
+        # Зниклі файли забуваємо
+        for src in list(pending):
+            if src not in seen:
+                del pending[src]
+
+        ready = [(src, info) for src, info in pending.items() if now - info[2] >= args.settle]
+        if ready:
+            sources = []
+            for src, (size, mtime_ns, _, root) in ready:
+                del pending[src]
+                processed[src] = (size, mtime_ns)
+                sources.append((src, root))
+            jobs, renamed = make_jobs(sources, output_dir, formats, args.image_options, assigned)
+            warn_renamed(renamed)
+            convert_batch(jobs, args, cache_path)
+
+        time.sleep(args.interval)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    formats = {file_type: getattr(args, file_type) for file_type in FORMATS}
+    output_dir = os.path.abspath(args.output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    cache_path = None if args.no_cache else (args.cache or os.path.join(SCRIPT_DIR, CACHE_FILENAME))
+    types = set(args.only or FORMATS)
+    args.image_options = {"profile": args.image_profile, "max_size": args.max_size,
+                          "quality": args.quality, "keep_metadata": args.keep_metadata}
+
+    start = time.perf_counter()
+    try:
+        if args.watch:
+            watch(args, formats, types, cache_path, output_dir)
+            return 0
+
+        # Той самий файл, заданий кількома входами, конвертується один раз - з першим коренем
+        roots = {}
+        for src, root in iter_sources(args.inputs, args.recursive, types, output_dir):
+            roots.setdefault(src, root)
+        if not roots:
+            print("❌ Не знайдено підтримуваних файлів", file=sys.stderr)
+            return 2
+        jobs, renamed = make_jobs(roots.items(), output_dir, formats, args.image_options)
+        warn_renamed(renamed)
+        counts = convert_batch(jobs, args, cache_path)
+    except KeyboardInterrupt:
+        print("\n⏹ Зупинено", file=sys.stderr)
+        return 130
+
+    print_summary(counts, time.perf_counter() - start)
+    return 1 if counts['error'] else 0
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,230 @@
+"""
+Історія undo/redo на дельтах замість повних копій зображення.
+
+Крок пензлем зберігає лише стиснуту прямокутну область, яку він змінив. Операції з
+параметрами (поворот, яскравість) записуються як команди: оборотні взагалі не
+зберігають пікселів, інші повторюються при redo замість зберігання результату.
+Глибина історії обмежена бюджетом пам'яті, а не кількістю кроків.
+"""
+import zlib
+
+from PIL import Image, ImageChops
+
+DEFAULT_BUDGET = 256 * 1024 * 1024
+MAX_STEPS = 1000
+# Рівень 1: стиснення майже не відстає від копіювання, а мазки стискаються в десятки разів
+COMPRESS_LEVEL = 1
+# Області стискаються смугами, щоб не тримати другу повну копію великої області
+BAND_ROWS = 256
+
+
+def changed_bbox(before, after):
+    """Межі змінених пікселів; TiledImage порівнює лише тайли, що не є спільними"""
+    if hasattr(after, "changed_bbox"):
+        return after.changed_bbox(before)
+    return ImageChops.difference(before, after).getbbox()
+
+
+class Pixels:
+    """Стиснуті пікселі області box (None - усе зображення, розмір якого міг змінитися)"""
+
+    def __init__(self, image, box=None):
+        self.box = box
+        self.full_size = image.size
+        x0, y0, x1, y1 = box or (0, 0, image.width, image.height)
+        self.mode = image.mode
+        self.width = x1 - x0
+        self.bands = []
+        for top in range(y0, y1, BAND_ROWS):
+            band = image.crop((x0, top, x1, min(top + BAND_ROWS, y1)))
+            self.bands.append((band.height, zlib.compress(band.tobytes(), COMPRESS_LEVEL)))
+        self.nbytes = sum(len(data) for _, data in self.bands)
+
+    def restore(self, image, from_image=None):
+        """
+        Повертає пікселі в image. Для області змінює image на місці (або його копію, якщо
+        документ незмінний); для всього зображення створює нове
+        """
+        if self.box is None:
+            image = Image.new(self.mode, self.full_size)
+            x0, y0 = 0, 0
+        else:
+            if from_image:
+                image = image.copy()
+            x0, y0 = self.box[:2]
+        top = y0
+        for height, data in self.bands:
+            image.paste(Image.frombytes(self.mode, (self.width, height), zlib.decompress(data)), (x0, top))
+            top += height
+        if self.box is None and from_image:
+            image = from_image(image)
+        return image
+
+
+class Delta:
+    """Піксельна зміна: зберігає пікселі неактивного стану і міняється з ними місцями"""
+
+    def __init__(self, pixels):
+        self.pixels = pixels
+
+    @property
+    def nbytes(self):
+        return self.pixels.nbytes
+
+    @property
+    def box(self):
+        return self.pixels.box
+
+    def swap(self, history, image):
+        current = Pixels(image, self.pixels.box)
+        image = self.pixels.restore(image, history.from_image)
+        self.pixels = current
+        return image
+
+    undo = redo = swap
+
+
+class Command:
+    """
+    Операція з параметрами. Оборотна скасовується зворотною функцією і не тримає пікселів;
+    для необоротної зберігається попередній стан, а redo повторює операцію
+    """
+
+    def __init__(self, name, params, before=None):
+        self.name = name
+        self.params = params
+        self.before = before
+
+    @property
+    def nbytes(self):
+        return self.before.nbytes if self.before else 0
+
+    @property
+    def box(self):
+        return self.before.box if self.before else None
+
+    def undo(self, history, image):
+        _, inverse = history.commands[self.name]
+        if inverse:
+            return inverse(image, *self.params)
+        image = self.before.restore(image, history.from_image)
+        # Результат не потрібен: redo отримає його повтором команди
+        self.before = None
+        return image
+
+    def redo(self, history, image):
+        apply, inverse = history.commands[self.name]
+        if not inverse:
+            self.before = Pixels(image)
+        return apply(image, *self.params)
+
+
+class EditHistory:
+    """
+    Лінійна історія змін одного документа.
+
+    from_image - фабрика незмінних документів (наприклад, TiledImage.from_image): тоді
+    історія ніколи не змінює переданий документ і тримає посилання на поточний стан.
+    Без неї документом є PIL.Image, який змінюється на місці, а історія тримає його копію.
+    commands - {назва: (apply(image, *params), inverse(image, *params) або None)}
+    """
+
+    def __init__(self, budget=DEFAULT_BUDGET, max_steps=MAX_STEPS, commands=None, from_image=None):
+        self.budget = budget
+        self.max_steps = max_steps
+        self.commands = commands or {}
+        self.from_image = from_image
+        self.entries = []
+        self.position = 0
+        self.head = None
+
+    @property
+    def can_undo(self):
+        return self.position > 0
+
+    @property
+    def can_redo(self):
+        return self.position < len(self.entries)
+
+    @property
+    def nbytes(self):
+        return sum(entry.nbytes for entry in self.entries)
+
+    def reset(self, image):
+        self.entries = []
+        self.position = 0
+        self.head = image if self.from_image else image.copy()
+
+    def commit(self, image, box=None):
+        """
+        Записує піксельну зміну відносно попереднього стану. box - підказка, де були зміни
+        (наприклад, межі мазка); без неї область шукається порівнянням
+        """
+        if image.size != self.head.size or image.mode != self.head.mode:
+            before = Pixels(self.head)
+            box = None
+        else:
+            if box is not None:
+                box = (max(0, box[0]), max(0, box[1]), min(image.width, box[2]), min(image.height, box[3]))
+                if box[0] >= box[2] or box[1] >= box[3]:
+                    return False
+            else:
+                box = changed_bbox(self.head, image)
+                if box is None:
+                    return False
+            before = Pixels(self.head, box)
+        self._push(Delta(before))
+        self._sync_head(image, box)
+        return True
+
+    def commit_command(self, image, name, *params):
+        """Записує команду, яку щойно застосовано до попереднього стану; image - результат"""
+        _, inverse = self.commands[name]
+        before = None
+        if not inverse:
+            box = None
+            if image.size == self.head.size and image.mode == self.head.mode:
+                box = changed_bbox(self.head, image)
+                if box is None:
+                    return False
+            before = Pixels(self.head, box)
+        self._push(Command(name, params, before))
+        self._sync_head(image, None)
+        return True
+
+    def undo(self, image):
+        if not self.can_undo:
+            return image
+        self.position -= 1
+        entry = self.entries[self.position]
+        box = entry.box
+        image = entry.undo(self, image)
+        self._sync_head(image, box)
+        return image
+
+    def redo(self, image):
+        if not self.can_redo:
+            return image
+        entry = self.entries[self.position]
+        self.position += 1
+        image = entry.redo(self, image)
+        self._sync_head(image, entry.box)
+        return image
+
+    def _push(self, entry):
+        del self.entries[self.position:]
+        self.entries.append(entry)
+        # Найстаріші кроки видаляються, доки історія не влізе в бюджет; останній лишається завжди
+        total = self.nbytes
+        while len(self.entries) > 1 and (total > self.budget or len(self.entries) > self.max_steps):
+            total -= self.entries.pop(0).nbytes
+        self.position = len(self.entries)
+
+    def _sync_head(self, image, box):
+        """Оновлює копію поточного стану лише в зміненій області"""
+        if self.from_image:
+            self.head = image
+        elif box is None or image.size != self.head.size or image.mode != self.head.mode:
+            self.head = image.copy()
+        else:
+            self.head.paste(image.crop(box), box[:2])
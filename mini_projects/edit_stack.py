@@ -0,0 +1,221 @@
+"""
+Неруйнівний стек корекцій.
+
+Кожна корекція - вузол. Сусідні точкові операції (яскравість, контраст, інверсія,
+соляризація, постеризація, відтінки сірого) зливаються в одну таблицю LUT і
+застосовуються одним проходом; сусідні фільтри-згортки та відображення групуються
+в один сегмент. Результат кожного сегмента кешується, тому зміна останнього
+ефекту не перераховує попередні.
+"""
+import numpy as np
+from PIL import Image, ImageEnhance, ImageFilter, ImageStat
+
+from image_tiles import filter_margin
+
+IDENTITY = np.arange(256)
+
+# Назва вузла -> (вид, параметр виду). Вид визначає, з якими сусідами вузол зливається
+OPS = {
+    "brightness": ("point", None),
+    "contrast": ("point", None),
+    "invert": ("point", None),
+    "solarize": ("point", None),
+    "posterize": ("point", None),
+    "grayscale": ("point", None),
+    "blur": ("filter", ImageFilter.BLUR),
+    "sharpen": ("filter", ImageFilter.SHARPEN),
+    "edge_enhance": ("filter", ImageFilter.EDGE_ENHANCE),
+    "emboss": ("filter", ImageFilter.EMBOSS),
+    "contour": ("filter", ImageFilter.CONTOUR),
+    "mirror": ("transpose", Image.Transpose.FLIP_LEFT_RIGHT),
+    "flip": ("transpose", Image.Transpose.FLIP_TOP_BOTTOM),
+    "saturation": ("pixel", lambda img, factor: ImageEnhance.Color(img).enhance(factor)),
+}
+# Види, сусідні вузли яких об'єднуються в один сегмент
+FUSED_KINDS = {"point", "filter", "transpose"}
+TILED_TRANSPOSES = {Image.Transpose.FLIP_LEFT_RIGHT: "mirrored", Image.Transpose.FLIP_TOP_BOTTOM: "flipped"}
+
+LABELS = {
+    "brightness": "Яскравість", "contrast": "Контраст", "saturation": "Насиченість",
+    "invert": "Інверсія", "solarize": "Соляризація", "posterize": "Постеризація",
+    "grayscale": "Чорно-біле", "blur": "Blur", "sharpen": "Sharpen", "edge_enhance": "Edge Enhance",
+    "emboss": "Emboss", "contour": "Outline", "mirror": "Дзеркало ↔", "flip": "Дзеркало ↕",
+}
+
+
+class Node:
+    """
+    Незмінний вузол стеку. op - назва з OPS або функція img, *params -> img
+    (тоді вузол обробляється окремо, як "pixel")
+    """
+
+    def __init__(self, op, *params):
+        self.op = op
+        self.params = params
+
+    @property
+    def kind(self):
+        return OPS[self.op][0] if self.op in OPS else "pixel"
+
+    @property
+    def key(self):
+        return self.op, self.params
+
+    @property
+    def label(self):
+        name = LABELS.get(self.op, getattr(self.op, "__name__", str(self.op)))
+        return f"{name} {', '.join(str(p) for p in self.params)}".strip()
+
+    def __repr__(self):
+        return f"Node{self.key!r}"
+
+
+def blend_lut(base, factor):
+    """LUT для Image.blend(сталий колір base, img, factor) з тим самим округленням, що й у Pillow"""
+    values = np.float32(base) + np.float32(factor) * (IDENTITY.astype(np.float32) - np.float32(base))
+    return np.where(values <= 0, 0, np.where(values >= 255, 255, values)).astype(np.int64)
+
+
+def point_lut(node, mean):
+    op = node.op
+    if op == "brightness":
+        return blend_lut(0, node.params[0])
+    if op == "contrast":
+        return blend_lut(mean, node.params[0])
+    if op == "invert":
+        return 255 - IDENTITY
+    if op == "solarize":
+        threshold = node.params[0] if node.params else 128
+        return np.where(IDENTITY < threshold, IDENTITY, 255 - IDENTITY)
+    if op == "posterize":
+        return IDENTITY & ~(2 ** (8 - node.params[0]) - 1)
+    raise ValueError(f"Невідома точкова операція: {op}")
+
+
+def luma_mean(img):
+    """Середня яскравість, як її рахує ImageEnhance.Contrast"""
+    return int(ImageStat.Stat(img if img.mode == "L" else img.convert("L")).mean[0] + 0.5)
+
+
+def segments(nodes):
+    """
+    Розбиває вузли на сегменти [(вид, [вузли])]. Контраст завжди починає новий
+    сегмент: йому потрібна середня яскравість саме свого входу
+    """
+    result = []
+    for node in nodes:
+        kind = node.kind
+        if result and kind in FUSED_KINDS and result[-1][0] == kind and node.op != "contrast":
+            result[-1][1].append(node)
+        else:
+            result.append((kind, [node]))
+    return result
+
+
+def apply_point(img, nodes, mean=None, keep_gray=False):
+    """
+    Злиті точкові операції: LUT компонуються в одну таблицю, зображення проходить
+    через неї один раз (ще раз - на кожне перетворення у відтінки сірого).
+    keep_gray - після відтінків сірого лишити режим L: наступні фільтри тоді
+    обробляють один канал замість трьох однакових
+    """
+    alpha = None
+    if img.mode == "RGBA":
+        # Альфа-канал точкові операції не змінюють
+        alpha = img.getchannel("A")
+        img = img.convert("RGB")
+    mode = img.mode
+    lut = IDENTITY
+    for node in nodes:
+        if node.op == "grayscale":
+            if img.mode != "L":
+                if lut is not IDENTITY:
+                    img = img.point(lut.tolist() * len(img.getbands()))
+                    lut = IDENTITY
+                img = img.convert("L")
+            continue
+        if node.op == "contrast" and mean is None:
+            mean = luma_mean(img)
+        lut = point_lut(node, mean)[lut]
+    if lut is not IDENTITY:
+        img = img.point(lut.tolist() * len(img.getbands()))
+    if alpha is not None:
+        img = img.convert(mode)
+        img.putalpha(alpha)
+    elif img.mode != mode and not keep_gray:
+        img = img.convert(mode)
+    return img
+
+
+def apply_filters(img, nodes):
+    for node in nodes:
+        img = img.filter(OPS[node.op][1])
+    return img
+
+
+def apply_segment(img, kind, nodes, keep_gray=False):
+    if kind == "point":
+        return apply_point(img, nodes, keep_gray=keep_gray)
+    if kind == "filter":
+        return apply_filters(img, nodes)
+    if kind == "transpose":
+        for node in nodes:
+            img = img.transpose(OPS[node.op][1])
+        return img
+    node = nodes[0]
+    func = OPS[node.op][1] if node.op in OPS else node.op
+    return func(img, *node.params)
+
+
+class EditStack:
+    """
+    Рендер списку вузлів із кешем виходу кожного сегмента. Кеш прив'язаний до одного
+    джерела; одним екземпляром має користуватися один потік
+    """
+
+    def __init__(self):
+        self.source = None
+        self.cache = {}
+
+    def render(self, source, nodes):
+        if source is not self.source:
+            self.source = source
+            self.cache = {}
+        img = source
+        # Режим, до якого повертається зображення, залишене точковим сегментом у L
+        mode = source.mode
+        key = ()
+        cache = {}
+        for kind, group in segments(nodes):
+            key += tuple(node.key for node in group)
+            cached = self.cache.get(key)
+            if cached is None:
+                if kind == "pixel" and img.mode != mode:
+                    img = img.convert(mode)
+                cached = apply_segment(img, kind, group, keep_gray=True)
+            cache[key] = img = cached
+            if kind == "pixel":
+                mode = img.mode
+        # Лишаються лише сегменти поточного ланцюжка
+        self.cache = cache
+        return img if img.mode == mode else img.convert(mode)
+
+
+def render_tiled(document, nodes):
+    """
+    Той самий стек на TiledImage у повній роздільності: сегменти по тайлах,
+    фільтри із запасом сусідніх пікселів, контраст - із середнім усього зображення
+    """
+    for kind, group in segments(nodes):
+        if kind == "point":
+            mean = document.luma_mean() if group[0].op == "contrast" else None
+            document = document.map_pil(lambda tile: apply_point(tile, group, mean))
+        elif kind == "filter":
+            margin = sum(filter_margin(OPS[node.op][1]) for node in group)
+            document = document.map_pil(lambda tile: apply_filters(tile, group), margin=margin)
+        elif kind == "transpose":
+            for node in group:
+                document = getattr(document, TILED_TRANSPOSES[OPS[node.op][1]])()
+        else:
+            document = document.map_pil(lambda tile: apply_segment(tile, kind, group))
+    return document
@@ -0,0 +1,263 @@
+"""
+Тайлове зображення для фоторедактора.
+
+Пікселі зберігаються сіткою NumPy-тайлів. Тайли ніколи не змінюються на місці:
+операція створює нові масиви лише для тих тайлів, яких торкається, а copy() ділить
+решту з оригіналом, тому знімок документа майже нічого не коштує. Великі зображення
+лежать у memmap-файлі на диску, і тайл читається в пам'ять лише тоді, коли потрібен.
+"""
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+TILE_SIZE = 512
+# Понад стільки байт пікселів вихідні тайли кладуться в memmap-файл замість RAM
+MEMMAP_THRESHOLD = 256 * 1024 * 1024
+# Pillow і NumPy відпускають GIL на важких операціях, тож потоків достатньо
+DEFAULT_WORKERS = min(8, os.cpu_count() or 1)
+# Режими, які зберігаються напряму; решта конвертується при завантаженні
+TILED_MODES = {"L": 1, "RGB": 3, "RGBA": 4}
+# Запас навколо тайла для фільтрів, якщо у фільтра немає розміру ядра
+DEFAULT_FILTER_MARGIN = 4
+
+_pool = None
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=DEFAULT_WORKERS, thread_name_prefix="tiles")
+    return _pool
+
+
+def filter_margin(image_filter):
+    """Радіус ядра фільтра Pillow: стільки пікселів сусідніх тайлів потрібно для точного результату"""
+    args = getattr(image_filter, "filterargs", None)
+    if args:
+        return max(args[0]) // 2
+    return DEFAULT_FILTER_MARGIN
+
+
+def intersect(a, b):
+    x0, y0 = max(a[0], b[0]), max(a[1], b[1])
+    x1, y1 = min(a[2], b[2]), min(a[3], b[3])
+    if x0 >= x1 or y0 >= y1:
+        return None
+    return x0, y0, x1, y1
+
+
+class TiledImage:
+    """Зображення як словник {(стовпець, рядок): масив тайла}"""
+
+    def __init__(self, size, mode, tiles, tile_size=TILE_SIZE, backing=None):
+        self.size = size
+        self.mode = mode
+        self.tiles = tiles
+        self.tile_size = tile_size
+        # Відкритий файл memmap, щоб він жив, доки на нього посилаються тайли
+        self.backing = backing
+
+    @property
+    def width(self):
+        return self.size[0]
+
+    @property
+    def height(self):
+        return self.size[1]
+
+    @classmethod
+    def open(cls, path, tile_size=TILE_SIZE, memmap_threshold=MEMMAP_THRESHOLD):
+        with Image.open(path) as img:
+            return cls.from_image(img, tile_size, memmap_threshold)
+
+    @classmethod
+    def from_image(cls, img, tile_size=TILE_SIZE, memmap_threshold=MEMMAP_THRESHOLD):
+        if img.mode not in TILED_MODES:
+            has_alpha = "A" in img.getbands() or "transparency" in img.info
+            img = img.convert("RGBA" if has_alpha else "RGB")
+        width, height = img.size
+        bands = TILED_MODES[img.mode]
+        shape = (height, width, bands) if bands > 1 else (height, width)
+
+        backing = None
+        if width * height * bands > memmap_threshold:
+            # Смугами по висоті тайла, щоб не тримати другу повну копію в RAM
+            backing = tempfile.TemporaryFile(prefix="tiles_")
+            data = np.memmap(backing, dtype=np.uint8, mode="w+", shape=shape)
+            for top in range(0, height, tile_size):
+                bottom = min(top + tile_size, height)
+                data[top:bottom] = np.asarray(img.crop((0, top, width, bottom)))
+            data.flush()
+        else:
+            data = np.asarray(img)
+
+        tiles = {}
+        for row, top in enumerate(range(0, height, tile_size)):
+            for col, left in enumerate(range(0, width, tile_size)):
+                tiles[col, row] = data[top:top + tile_size, left:left + tile_size]
+        return cls(img.size, img.mode, tiles, tile_size, backing)
+
+    @classmethod
+    def build(cls, size, mode, make_tile, tile_size=TILE_SIZE):
+        """Нове зображення, де кожен тайл рахує make_tile(box) у пулі потоків"""
+        probe = cls(size, mode, {}, tile_size)
+        keys = list(probe.tile_keys())
+        arrays = get_pool().map(lambda key: make_tile(probe.tile_box(key)), keys)
+        probe.tiles = dict(zip(keys, arrays))
+        return probe
+
+    def copy(self):
+        return TiledImage(self.size, self.mode, dict(self.tiles), self.tile_size, self.backing)
+
+    def tile_box(self, key):
+        col, row = key
+        left, top = col * self.tile_size, row * self.tile_size
+        return left, top, min(left + self.tile_size, self.width), min(top + self.tile_size, self.height)
+
+    def tile_keys(self, box=None):
+        """Ключі тайлів, що перетинають box (усі, якщо box не задано)"""
+        x0, y0, x1, y1 = box or (0, 0, self.width, self.height)
+        x0, y0 = max(0, x0), max(0, y0)
+        x1, y1 = min(self.width, x1), min(self.height, y1)
+        size = self.tile_size
+        for row in range(y0 // size, (y1 + size - 1) // size):
+            for col in range(x0 // size, (x1 + size - 1) // size):
+                yield col, row
+
+    def region(self, box):
+        """Масив пікселів області box, зібраний із тайлів"""
+        x0, y0, x1, y1 = box
+        bands = TILED_MODES[self.mode]
+        shape = (y1 - y0, x1 - x0, bands) if bands > 1 else (y1 - y0, x1 - x0)
+        out = np.empty(shape, dtype=np.uint8)
+        for key in self.tile_keys(box):
+            tile_box = self.tile_box(key)
+            part = intersect(box, tile_box)
+            if part is None:
+                continue
+            px0, py0, px1, py1 = part
+            out[py0 - y0:py1 - y0, px0 - x0:px1 - x0] = \
+                self.tiles[key][py0 - tile_box[1]:py1 - tile_box[1], px0 - tile_box[0]:px1 - tile_box[0]]
+        return out
+
+    def crop(self, box):
+        return Image.fromarray(self.region(box))
+
+    def to_image(self):
+        return self.crop((0, 0, self.width, self.height))
+
+    def paste(self, img, box):
+        """Вставляє PIL-зображення в box; нові масиви отримують лише зачеплені тайли"""
+        src = np.asarray(img.convert(self.mode) if img.mode != self.mode else img)
+        x0, y0 = box[:2]
+        box = (x0, y0, x0 + src.shape[1], y0 + src.shape[0])
+        for key in list(self.tile_keys(box)):
+            tile_box = self.tile_box(key)
+            px0, py0, px1, py1 = intersect(box, tile_box)
+            tile = self.tiles[key].copy()
+            tile[py0 - tile_box[1]:py1 - tile_box[1], px0 - tile_box[0]:px1 - tile_box[0]] = \
+                src[py0 - y0:py1 - y0, px0 - x0:px1 - x0]
+            self.tiles[key] = tile
+
+    def changed_bbox(self, other):
+        """Межі пікселів, що відрізняються від other; спільні тайли не порівнюються"""
+        if other.size != self.size or other.tile_size != self.tile_size:
+            return 0, 0, self.width, self.height
+        box = None
+        for key, tile in self.tiles.items():
+            old = other.tiles[key]
+            if tile is old:
+                continue
+            diff = tile != old
+            if diff.ndim == 3:
+                diff = diff.any(axis=2)
+            rows = np.flatnonzero(diff.any(axis=1))
+            if not rows.size:
+                continue
+            cols = np.flatnonzero(diff.any(axis=0))
+            left, top = self.tile_box(key)[:2]
+            part = (left + cols[0], top + rows[0], left + cols[-1] + 1, top + rows[-1] + 1)
+            if box is not None:
+                part = (min(box[0], part[0]), min(box[1], part[1]), max(box[2], part[2]), max(box[3], part[3]))
+            box = part
+        return None if box is None else tuple(int(v) for v in box)
+
+    def map_tiles(self, func, margin=0, box=None):
+        """
+        Нове зображення, де func(масив) -> масив застосовано до тайлів у box.
+        margin - скільки пікселів сусідів додати навколо тайла для фільтрів з ядром;
+        результат обрізається назад до розміру тайла
+        """
+        def process(key):
+            x0, y0, x1, y1 = self.tile_box(key)
+            if not margin:
+                return func(self.tiles[key])
+            padded = (max(0, x0 - margin), max(0, y0 - margin),
+                      min(self.width, x1 + margin), min(self.height, y1 + margin))
+            result = func(self.region(padded))
+            return result[y0 - padded[1]:y1 - padded[1], x0 - padded[0]:x1 - padded[0]]
+
+        keys = list(self.tile_keys(box))
+        result = self.copy()
+        for key, tile in zip(keys, get_pool().map(process, keys)):
+            result.tiles[key] = tile
+        return result
+
+    def map_pil(self, func, margin=0, box=None):
+        """map_tiles для функцій, що працюють з PIL-зображенням"""
+        return self.map_tiles(lambda tile: np.asarray(func(Image.fromarray(tile))), margin, box)
+
+    def transformed(self, size, source):
+        """
+        Нове зображення розміру size; source(box) повертає масив для кожного вихідного тайла.
+        Так перебудовуються обрізання і відображення без збирання всього зображення
+        """
+        return TiledImage.build(size, self.mode, source, self.tile_size)
+
+    def cropped(self, box):
+        left, top = box[:2]
+        size = (box[2] - left, box[3] - top)
+        return self.transformed(size, lambda b: self.region((b[0] + left, b[1] + top, b[2] + left, b[3] + top)))
+
+    def mirrored(self):
+        width = self.width
+        return self.transformed(self.size, lambda b: self.region((width - b[2], b[1], width - b[0], b[3]))[:, ::-1])
+
+    def flipped(self):
+        height = self.height
+        return self.transformed(self.size, lambda b: self.region((b[0], height - b[3], b[2], height - b[1]))[::-1])
+
+    def luma_mean(self):
+        """Середня яскравість, як її рахує ImageEnhance.Contrast"""
+        histograms = get_pool().map(lambda tile: Image.fromarray(tile).convert("L").histogram(),
+                                    self.tiles.values())
+        total = np.sum(list(histograms), axis=0)
+        return int(np.dot(total, np.arange(256)) / max(1, total.sum()) + 0.5)
+
+    def resized(self, size, resample=Image.Resampling.LANCZOS, reducing_gap=None):
+        """Зменшена копія як PIL-зображення; кожен тайл масштабується окремо у своє місце"""
+        out = Image.new(self.mode, size)
+        scale_x, scale_y = size[0] / self.width, size[1] / self.height
+
+        def process(key):
+            x0, y0, x1, y1 = self.tile_box(key)
+            dest = (round(x0 * scale_x), round(y0 * scale_y), round(x1 * scale_x), round(y1 * scale_y))
+            if dest[2] <= dest[0] or dest[3] <= dest[1]:
+                return dest, None
+            tile = Image.fromarray(self.tiles[key])
+            return dest, tile.resize((dest[2] - dest[0], dest[3] - dest[1]), resample, reducing_gap=reducing_gap)
+
+        for dest, part in get_pool().map(process, list(self.tiles)):
+            if part is not None:
+                out.paste(part, dest[:2])
+        return out
+
+    def preview(self, max_w, max_h, resample=Image.Resampling.LANCZOS):
+        ratio = min(max_w / self.width, max_h / self.height)
+        size = (max(1, int(self.width * ratio)), max(1, int(self.height * ratio)))
+        # Для екрана вистачає швидкого цілочисельного зменшення перед LANCZOS
+        return self.resized(size, resample, reducing_gap=3.0)
+
@@ -0,0 +1,77 @@
+"""
+Живе прев'ю для повзунків: рендер на зменшеній копії у фоновому потоці.
+
+Поки користувач тягне повзунок, запити об'єднуються: рендериться лише найсвіжіший,
+не частіше одного разу за кадр, а застарілі результати не показуються.
+Повна роздільність обчислюється окремо - один раз на Apply або Save.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+# Мінімальний інтервал між рендерами прев'ю (~30 кадрів/с)
+FRAME_MS = 33
+POLL_MS = 10
+
+
+def make_proxy(img, max_w, max_h):
+    """Копія розміру вікна прев'ю, на якій рахуються всі ефекти під час руху повзунків"""
+    ratio = min(max_w / img.width, max_h / img.height)
+    size = (max(1, int(img.width * ratio)), max(1, int(img.height * ratio)))
+    # reducing_gap: спершу швидке зменшення в ціле число разів, потім LANCZOS на малому
+    return img.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+
+class LivePreview:
+    """
+    render(*params) -> PIL-зображення виконується у фоновому потоці,
+    show(image) - у потоці Tk. widget потрібен лише для after()
+    """
+
+    def __init__(self, widget, render, show, frame_ms=FRAME_MS):
+        self.widget = widget
+        self.render = render
+        self.show = show
+        self.frame_ms = frame_ms
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="preview")
+        self.pending = None
+        self.timer = None
+        self.future = None
+        self.generation = 0
+
+    def request(self, *params):
+        """Запам'ятовує найсвіжіші параметри; рендер стартує не частіше frame_ms"""
+        self.pending = params
+        self.generation += 1
+        if self.timer is None and self.future is None:
+            self.timer = self.widget.after(self.frame_ms, self._start)
+
+    def cancel(self):
+        """Скасовує очікувані запити; результат поточного рендеру буде відкинуто"""
+        if self.timer is not None:
+            self.widget.after_cancel(self.timer)
+            self.timer = None
+        self.pending = None
+        self.generation += 1
+
+    def _start(self):
+        self.timer = None
+        if self.pending is None:
+            return
+        params, self.pending = self.pending, None
+        self.future = self.executor.submit(self.render, *params)
+        self.widget.after(POLL_MS, self._poll, self.generation)
+
+    def _poll(self, generation):
+        if not self.future.done():
+            self.widget.after(POLL_MS, self._poll, generation)
+            return
+        future, self.future = self.future, None
+        if generation == self.generation:
+            try:
+                self.show(future.result())
+            except Exception as e:
+                print(f"Помилка прев'ю: {e}")
+        elif self.pending is not None:
+            # Поки рендер ішов, повзунок зрушив: одразу рендеримо новіший стан
+            self.timer = self.widget.after_idle(self._start)
@@ -0,0 +1,643 @@
+import os
+import sys
+import json
+import time
+import shutil
+import wave
+import hashlib
+import sqlite3
+import subprocess
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, CancelledError
+
+from PIL import Image, ImageOps
+from pydub import AudioSegment
+
+# Формати виводу для кожного типу медіа
+FORMATS = {
+    "image": ["PNG", "JPEG", "WEBP", "BMP", "TIFF"],
+    "video": ["MP4", "AVI", "MOV", "WEBM", "GIF"],
+    "audio": ["MP3", "WAV", "OGG", "AAC", "FLAC"]
+}
+
+if getattr(sys, 'frozen', False):
+    SCRIPT_DIR = os.path.dirname(sys.executable)
+else:
+    SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CACHE_FILENAME = "conversion_cache.db"
+# Змінюється разом із параметрами кодування, щоб старі записи кешу перестали збігатися
+CACHE_VERSION = 1
+HASH_BUFFER = 1024 * 1024
+
+DEFAULT_MAX_JOBS = os.cpu_count() or 1
+# Відео й так завантажує всі ядра кодером, тому паралельно їх мало
+DEFAULT_VIDEO_JOBS = 1
+
+FFMPEG = shutil.which("ffmpeg")
+FFPROBE = shutil.which("ffprobe")
+
+# Кодеки, які контейнер приймає без перекодування: тоді потоки просто копіюються (remux)
+REMUX_CODECS = {
+    "mp4": ({"h264", "hevc", "mpeg4", "av1"}, {"aac", "mp3", "alac", "ac3", "opus"}),
+    "mov": ({"h264", "hevc", "mpeg4", "prores", "mjpeg"}, {"aac", "mp3", "alac", "pcm_s16le", "pcm_s24le"}),
+    "webm": ({"vp8", "vp9", "av1"}, {"opus", "vorbis"}),
+    "avi": ({"mpeg4", "h264", "mjpeg", "msmpeg4v3"}, {"mp3", "ac3", "pcm_s16le"}),
+}
+
+# Параметри кодування, коли копіювання неможливе
+ENCODE_ARGS = {
+    "mp4": ["-c:v", "libx264", "-preset", "medium", "-crf", "23", "-c:a", "aac", "-b:a", "192k"],
+    "mov": ["-c:v", "libx264", "-preset", "medium", "-crf", "23", "-c:a", "aac", "-b:a", "192k"],
+    "webm": ["-c:v", "libvpx-vp9", "-crf", "32", "-b:v", "0", "-row-mt", "1", "-c:a", "libopus", "-b:a", "128k"],
+    "avi": ["-c:v", "mpeg4", "-q:v", "4", "-c:a", "libmp3lame", "-q:a", "2"],
+    "gif": ["-vf", "fps=10,split[a][b];[a]palettegen[p];[b][p]paletteuse", "-an"],
+}
+# Профілі конвертації зображень. max_size - межі (ширина, висота) зі збереженням пропорцій,
+# quality None - типова якість Pillow, keep_metadata - переносити EXIF та ICC-профіль у результат
+IMAGE_PROFILES = {
+    "original": {"max_size": None, "quality": None, "optimize": False, "progressive": False,
+                 "webp_method": 4, "keep_metadata": True},
+    "web": {"max_size": (1920, 1920), "quality": 82, "optimize": True, "progressive": True,
+            "webp_method": 4, "keep_metadata": False},
+    "thumbnail": {"max_size": (320, 320), "quality": 75, "optimize": True, "progressive": False,
+                  "webp_method": 2, "keep_metadata": False},
+    "archive": {"max_size": None, "quality": 95, "optimize": True, "progressive": False,
+                "webp_method": 6, "keep_metadata": True},
+}
+DEFAULT_IMAGE_PROFILE = "original"
+EXIF_ORIENTATION = 0x0112
+# Назви форматів для Pillow там, де вони не збігаються з розширенням
+PIL_FORMATS = {"jpeg": "JPEG", "jpg": "JPEG", "tif": "TIFF"}
+
+# Аудіокодеки та формат контейнера ffmpeg для кожного цільового формату
+AUDIO_ENCODE_ARGS = {
+    "mp3": ["-c:a", "libmp3lame", "-q:a", "2", "-f", "mp3"],
+    "wav": ["-c:a", "pcm_s16le", "-f", "wav"],
+    "ogg": ["-c:a", "libvorbis", "-q:a", "5", "-f", "ogg"],
+    "aac": ["-c:a", "aac", "-b:a", "192k", "-f", "adts"],
+    "flac": ["-c:a", "flac", "-f", "flac"],
+}
+# Скільки аудіокадрів читати за раз у запасному потоковому шляху WAV -> WAV (~1 с для 44.1 кГц)
+AUDIO_BLOCK_FRAMES = 65536
+
+# Контейнери, у яких індекс переноситься на початок, щоб відео можна було дивитися під час завантаження
+FASTSTART_FORMATS = {"mp4", "mov"}
+
+
+class ConversionCancelled(Exception):
+    """Конвертацію перервано користувачем"""
+
+
+def get_file_type(filename):
+    ext = filename.lower().split(".")[-1]
+    if ext in ["png", "jpg", "jpeg", "jfif", "bmp", "webp", "tiff"]:
+        return "image"
+    if ext in ["mp4", "mov", "avi", "mkv", "webm", "flv"]:
+        return "video"
+    if ext in ["mp3", "wav", "ogg", "aac", "m4a", "flac"]:
+        return "audio"
+    return None
+
+
+def image_options(options=None):
+    """Параметри профілю з options['profile'] та окремими перевизначеннями з options"""
+    options = options or {}
+    resolved = dict(IMAGE_PROFILES[options.get("profile") or DEFAULT_IMAGE_PROFILE])
+    resolved.update({key: value for key, value in options.items() if key in resolved and value is not None})
+    if resolved["max_size"] is not None:
+        resolved["max_size"] = tuple(resolved["max_size"])
+    return resolved
+
+
+def image_save_args(format, opts, metadata):
+    """Параметри кодера для конкретного формату"""
+    args = {}
+    if format in ("jpeg", "jpg"):
+        args.update(optimize=opts["optimize"], progressive=opts["progressive"])
+    elif format == "webp":
+        args.update(method=opts["webp_method"])
+    elif format == "png":
+        args.update(optimize=opts["optimize"])
+    elif format in ("tiff", "tif"):
+        args.update(compression="tiff_deflate" if opts["optimize"] else None)
+    if format in ("jpeg", "jpg", "webp") and opts["quality"] is not None:
+        args["quality"] = opts["quality"]
+    if opts["keep_metadata"]:
+        args.update({key: value for key, value in metadata.items() if value})
+    return args
+
+
+def convert_image(src, output, format, options=None):
+    """
+    Конвертує зображення за профілем. Для JPEG з обмеженням розміру draft() декодує
+    одразу в зменшеному масштабі (1/2, 1/4, 1/8), тож повне зображення не розпаковується
+    """
+    opts = image_options(options)
+    with Image.open(src) as img:
+        if opts["max_size"] and img.format == "JPEG":
+            img.draft("RGB", opts["max_size"])
+
+        metadata = {"exif": img.info.get("exif"), "icc_profile": img.info.get("icc_profile")}
+        if not opts["keep_metadata"] and img.getexif().get(EXIF_ORIENTATION, 1) != 1:
+            # Без EXIF орієнтація загубиться, тому застосовуємо її до пікселів
+            img = ImageOps.exif_transpose(img)
+        if opts["max_size"]:
+            img.thumbnail(opts["max_size"], Image.LANCZOS)
+        if format in ("jpeg", "jpg") and img.mode not in ("RGB", "L", "CMYK"):
+            img = img.convert("RGB")
+        img.save(output, PIL_FORMATS.get(format, format.upper()), **image_save_args(format, opts, metadata))
+
+
+def probe_media(src):
+    """Тривалість (с) і потоки файлу за даними ffprobe"""
+    result = subprocess.run(
+        [FFPROBE, "-v", "error", "-print_format", "json", "-show_format", "-show_streams", src],
+        capture_output=True, text=True, check=True)
+    info = json.loads(result.stdout)
+    duration = float(info.get("format", {}).get("duration") or 0)
+    return duration, info.get("streams", [])
+
+
+def can_remux(streams, format):
+    """Чи підходять кодеки джерела цільовому контейнеру без перекодування"""
+    if format not in REMUX_CODECS:
+        return False
+    video_codecs, audio_codecs = REMUX_CODECS[format]
+    has_video = False
+    for stream in streams:
+        # Обкладинки (attached_pic) не копіюються, тож на вибір не впливають
+        if stream.get("disposition", {}).get("attached_pic"):
+            continue
+        if stream.get("codec_type") == "video":
+            has_video = True
+            if stream.get("codec_name") not in video_codecs:
+                return False
+        elif stream.get("codec_type") == "audio" and stream.get("codec_name") not in audio_codecs:
+            return False
+    return has_video
+
+
+def build_video_command(src, output, format, streams):
+    """Команда ffmpeg: копіювання потоків, якщо можливо, інакше перекодування"""
+    command = [FFMPEG, "-hide_banner", "-nostdin", "-y", "-loglevel", "error",
+               "-progress", "pipe:1", "-nostats", "-i", src]
+    remux = can_remux(streams, format)
+    if remux:
+        # Лише перше відео та всі аудіо; субтитри й дані в інший контейнер часто не влазять
+        command += ["-map", "0:V:0", "-map", "0:a?", "-c", "copy", "-sn", "-dn"]
+    else:
+        command += ENCODE_ARGS.get(format, [])
+    if format in FASTSTART_FORMATS:
+        command += ["-movflags", "+faststart"]
+    command.append(output)
+    return command, remux
+
+
+def parse_progress(stream, duration, progress, cancelled, process):
+    """
+    Читає блоки key=value з -progress і повідомляє відсоток та ETA.
+    Повертає True, якщо процес зупинено через скасування
+    """
+    out_time = 0.0
+    speed = 0.0
+    for line in stream:
+        key, _, value = line.strip().partition("=")
+        if key in ("out_time_us", "out_time_ms"):
+            # Обидва ключі в ffmpeg містять мікросекунди
+            try:
+                out_time = int(value) / 1_000_000
+            except ValueError:
+                pass
+        elif key == "speed":
+            try:
+                speed = float(value.rstrip("x"))
+            except ValueError:
+                speed = 0.0
+        elif key == "progress":
+            if cancelled is not None and cancelled():
+                process.terminate()
+                return True
+            if progress is not None and duration > 0:
+                percent = min(100.0, out_time / duration * 100)
+                eta = (duration - out_time) / speed if speed > 0 else None
+                progress(percent, eta)
+    return False
+
+
+def convert_video(src, output, format, progress=None, cancelled=None):
+    """Конвертує відео через ffmpeg з реальним прогресом; без ffmpeg - через moviepy"""
+    if FFMPEG is None or FFPROBE is None:
+        convert_video_moviepy(src, output, format)
+        return
+
+    duration, streams = probe_media(src)
+    command, remux = build_video_command(src, output, format, streams)
+    run_ffmpeg(command, src, duration, progress, cancelled, "копіювання" if remux else "кодування")
+
+
+def run_ffmpeg(command, src, duration, progress=None, cancelled=None, label="кодування"):
+    """Запускає ffmpeg з -progress pipe:1, передає прогрес і перетворює помилки на винятки"""
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               text=True, encoding="utf-8", errors="replace")
+
+    # stderr читаємо окремо, щоб заповнений канал не зупинив ffmpeg
+    errors = []
+    reader = threading.Thread(target=lambda: errors.append(process.stderr.read()), daemon=True)
+    reader.start()
+    try:
+        was_cancelled = parse_progress(process.stdout, duration, progress, cancelled, process)
+    finally:
+        process.wait()
+        reader.join()
+
+    if was_cancelled:
+        raise ConversionCancelled(src)
+    if process.returncode != 0:
+        raise RuntimeError(f"ffmpeg ({label}): {''.join(errors).strip()}")
+
+
+def convert_video_moviepy(src, output, format):
+    # moviepy імпортується довго, тож лише в процесі, що справді конвертує відео
+    from moviepy.editor import VideoFileClip
+
+    clip = VideoFileClip(src)
+    if format == "gif":
+        clip.write_gif(output, fps=10)
+    else:
+        clip.write_videofile(output, codec="libx264", audio_codec="aac", verbose=False, logger=None)
+    clip.close()
+
+
+def convert_audio(src, output, format, progress=None, cancelled=None):
+    """
+    Потокова конвертація аудіо: ffmpeg читає і кодує блоками, тож пам'ять не залежить від тривалості.
+    Без ffmpeg WAV -> WAV копіюється блоками, а решта йде старим шляхом через pydub
+    """
+    if FFMPEG is not None and FFPROBE is not None:
+        duration, _ = probe_media(src)
+        command = [FFMPEG, "-hide_banner", "-nostdin", "-y", "-loglevel", "error",
+                   "-progress", "pipe:1", "-nostats", "-i", src, "-vn", "-map_metadata", "0"]
+        command += AUDIO_ENCODE_ARGS.get(format, [])
+        command.append(output)
+        run_ffmpeg(command, src, duration, progress, cancelled)
+    elif format == "wav" and src.lower().endswith(".wav"):
+        copy_wav_blocks(src, output, progress, cancelled)
+    else:
+        audio = AudioSegment.from_file(src)
+        audio.export(output, format=format)
+
+
+def copy_wav_blocks(src, output, progress=None, cancelled=None):
+    """Переписує WAV фіксованими блоками по AUDIO_BLOCK_FRAMES кадрів"""
+    with wave.open(src, 'rb') as reader, wave.open(output, 'wb') as writer:
+        writer.setparams(reader.getparams())
+        total = reader.getnframes()
+        done = 0
+        while True:
+            frames = reader.readframes(AUDIO_BLOCK_FRAMES)
+            if not frames:
+                break
+            writer.writeframesraw(frames)
+            done += len(frames) // (reader.getsampwidth() * reader.getnchannels())
+            if cancelled is not None and cancelled():
+                raise ConversionCancelled(src)
+            if progress is not None and total:
+                progress(done / total * 100, None)
+
+
+CONVERTERS = {
+    "image": convert_image,
+    "video": convert_video,
+    "audio": convert_audio,
+}
+
+
+def hash_file(path):
+    """blake2b усього вмісту файлу"""
+    digest = hashlib.blake2b(digest_size=20)
+    buffer = bytearray(HASH_BUFFER)
+    view = memoryview(buffer)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            digest.update(view[:read])
+    return digest.hexdigest()
+
+
+class ConversionCache:
+    """
+    Кеш конвертацій за вмістом: ключ - хеш джерела, цільовий формат і параметри.
+    Для кожного ключа зберігається готовий вихідний файл (шлях, розмір, mtime);
+    при повторі він або вже лежить на місці, або жорстко лінкується (копіюється) у новий шлях.
+    Хеші джерел запам'ятовуються за (шлях, розмір, mtime), тож незмінені файли не перечитуються.
+    База спільна для всіх процесів пулу (WAL).
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sources (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                digest TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS outputs (
+                key TEXT PRIMARY KEY,
+                output TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                created REAL NOT NULL
+            );
+        """)
+
+    def source_digest(self, src):
+        """Хеш джерела; з бази, якщо файл не змінювався"""
+        src_stat = os.stat(src)
+        path = os.path.abspath(src)
+        row = self.conn.execute("SELECT size, mtime_ns, digest FROM sources WHERE path = ?", (path,)).fetchone()
+        if row is not None and row[0] == src_stat.st_size and row[1] == src_stat.st_mtime_ns:
+            return row[2]
+        digest = hash_file(src)
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO sources (path, size, mtime_ns, digest) VALUES (?, ?, ?, ?)",
+                              (path, src_stat.st_size, src_stat.st_mtime_ns, digest))
+        return digest
+
+    def key(self, src, format, options=None):
+        options = json.dumps(options or {}, sort_keys=True)
+        return f"{self.source_digest(src)}:{format}:{CACHE_VERSION}:{options}"
+
+    def restore(self, key, output):
+        """Повертає True, якщо для ключа є незмінений готовий файл і він тепер лежить у output"""
+        row = self.conn.execute("SELECT output, size, mtime_ns FROM outputs WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return False
+        cached_path, size, mtime_ns = row
+        try:
+            cached_stat = os.stat(cached_path)
+        except OSError:
+            cached_stat = None
+        if cached_stat is None or cached_stat.st_size != size or cached_stat.st_mtime_ns != mtime_ns:
+            with self.conn:
+                self.conn.execute("DELETE FROM outputs WHERE key = ?", (key,))
+            return False
+
+        output = os.path.abspath(output)
+        if os.path.exists(output) and os.path.samefile(cached_path, output):
+            return True
+        if os.path.exists(output):
+            os.remove(output)
+        try:
+            os.link(cached_path, output)
+        except OSError:
+            # Інший диск або файлова система без жорстких посилань
+            shutil.copy2(cached_path, output)
+        return True
+
+    def store(self, key, output):
+        output_stat = os.stat(output)
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO outputs (key, output, size, mtime_ns, created) VALUES (?, ?, ?, ?, ?)",
+                (key, os.path.abspath(output), output_stat.st_size, output_stat.st_mtime_ns, time.time()))
+
+    def close(self):
+        self.conn.close()
+
+
+# Кеш відкривається один раз на процес пулу
+_process_caches = {}
+
+
+def get_process_cache(db_path):
+    cache = _process_caches.get(db_path)
+    if cache is None:
+        cache = _process_caches[db_path] = ConversionCache(db_path)
+    return cache
+
+
+def run_job(job_id, file_type, src, output, format, options, cache_path, events, cancelled):
+    """Виконується в процесі пулу: конвертує один файл (або бере його з кешу) і повідомляє про хід"""
+    if job_id in cancelled:
+        return "cancelled"
+    if os.path.abspath(src) == os.path.abspath(output):
+        raise ValueError(f"Файл не можна конвертувати сам у себе: {src}")
+
+    cache = get_process_cache(cache_path) if cache_path else None
+    key = None
+    if cache is not None:
+        key = cache.key(src, format, options)
+        if cache.restore(key, output):
+            return "cached"
+        # Старий вихід може бути жорстким посиланням на інший запис кешу - не пишемо поверх нього
+        if os.path.exists(output):
+            os.remove(output)
+
+    events.put(("job_progress", job_id, 0, None))
+
+    if file_type in ("video", "audio"):
+        last = [0]
+
+        def report(percent, eta):
+            # Не частіше ніж раз на відсоток, щоб не засипати чергу подіями
+            if int(percent) != last[0]:
+                last[0] = int(percent)
+                events.put(("job_progress", job_id, percent, eta))
+
+        try:
+            CONVERTERS[file_type](src, output, format, progress=report, cancelled=lambda: job_id in cancelled)
+        except ConversionCancelled:
+            return "cancelled"
+    else:
+        CONVERTERS[file_type](src, output, format, options)
+
+    if cache is not None:
+        cache.store(key, output)
+    events.put(("job_progress", job_id, 100, None))
+    return "completed"
+
+
+def stop_pool(pool):
+    """
+    Зупиняє пул, не чекаючи запущених завдань. Процеси пулу завершуються одразу:
+    інакше вони взяли б уже передані їм завдання з проксі зупиненого менеджера
+    """
+    processes = list((pool._processes or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+
+
+class ConversionScheduler:
+    """
+    Паралельна конвертація у пулах процесів:
+    зображення та аудіо - до max_jobs одночасно, відео - в окремому пулі з max_video_jobs.
+    Події надходять у progress_queue у форматі, який розуміє GUI:
+    ("status", ref, статус, текст) зі статусами queued/converting/completed/cached/error/cancelled,
+    ("job_progress", ref, відсоток, ETA або None),
+    ("progress", готово, всього), ("cache", влучання, промахи), ("done",).
+    Якщо задано cache_path, вже конвертовані файли беруться з ConversionCache.
+    """
+
+    def __init__(self, progress_queue, max_jobs=None, max_video_jobs=None, cache_path=None):
+        self.progress_queue = progress_queue
+        self.cache_path = cache_path
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.max_jobs = max(1, int(max_jobs or DEFAULT_MAX_JOBS))
+        self.max_video_jobs = max(1, min(self.max_jobs, int(max_video_jobs or DEFAULT_VIDEO_JOBS)))
+        self.jobs = {}
+        self.futures = {}
+        self.manager = None
+        self.cancelled = None
+        # cancel() приходить з потоку GUI і не повинен торкатися проксі вже зупиненого менеджера
+        self.lock = threading.Lock()
+
+    def run(self, jobs):
+        """
+        Конвертує завдання [{'src', 'output', 'type', 'format', 'options', 'ref'}] і блокує до завершення.
+        id завдання - його індекс у jobs; ref - будь-який об'єкт GUI, що повертається в подіях
+        """
+        self.manager = multiprocessing.Manager()
+        events = self.manager.Queue()
+        # Спільний словник скасованих id: процеси пулу перевіряють його перед стартом
+        self.cancelled = self.manager.dict()
+
+        cpu_pool = ProcessPoolExecutor(max_workers=self.max_jobs)
+        video_pool = ProcessPoolExecutor(max_workers=self.max_video_jobs)
+
+        def on_done(job_id, future):
+            # Підсумок іде через ту саму чергу, що й події процесу,
+            # тож він гарантовано приходить після них
+            try:
+                status, error = future.result(), None
+            except CancelledError:
+                status, error = "cancelled", None
+            except Exception as e:
+                status, error = "error", str(e)
+            try:
+                events.put(("finished", job_id, status, error))
+            except (EOFError, OSError):
+                pass  # run() перервано і менеджер уже зупинено
+
+        interrupted = False
+        try:
+            for job_id, job in enumerate(jobs):
+                job['id'] = job_id
+                self.jobs[job_id] = job
+                self._emit("status", job['ref'], "queued", "⏳ В черзі")
+            relay = threading.Thread(target=self._relay_events, args=(events, len(jobs), self.cancelled),
+                                     daemon=True)
+            relay.start()
+
+            for job_id, job in self.jobs.items():
+                pool = video_pool if job['type'] == "video" else cpu_pool
+                future = pool.submit(run_job, job_id, job['type'], job['src'], job['output'], job['format'],
+                                     job.get('options'), self.cache_path, events, self.cancelled)
+                self.futures[job_id] = future
+                future.add_done_callback(lambda f, job_id=job_id: on_done(job_id, f))
+            relay.join()
+        except KeyboardInterrupt:
+            # Поки менеджер живий, усі завдання позначаються скасованими: запущені
+            # конвертації відео/аудіо зупиняються самі, а на решту не чекаємо
+            interrupted = True
+            self.cancel_all()
+            raise
+        finally:
+            with self.lock:
+                self.cancelled = None
+                self.futures = {}
+            for pool in (cpu_pool, video_pool):
+                if interrupted:
+                    stop_pool(pool)
+                else:
+                    pool.shutdown(wait=True, cancel_futures=True)
+            self.manager.shutdown()
+            if interrupted:
+                # Недописані файли зупинених процесів
+                for job in self.jobs.values():
+                    if job.get('started') and not job.get('finished'):
+                        self._remove_partial(job['output'])
+            self.progress_queue.put(("done",))
+
+    def cancel(self, job_id):
+        """
+        Скасовує одне завдання: з черги воно просто зникає, а результат уже запущеного відкидається.
+        Після завершення run() нічого не робить
+        """
+        with self.lock:
+            if self.cancelled is None or job_id not in self.jobs:
+                return
+            self.cancelled[job_id] = True
+            future = self.futures.get(job_id)
+        if future is not None:
+            future.cancel()
+
+    def cancel_all(self):
+        for job_id in list(self.jobs):
+            self.cancel(job_id)
+
+    def _relay_events(self, events, total, cancelled):
+        """Переносить події з процесів пулу в progress_queue, замінюючи id завдання на ref"""
+        done = 0
+        while done < total:
+            try:
+                event = events.get()
+            except (EOFError, OSError):
+                return  # менеджер зупинено після переривання run()
+            kind, job_id = event[0], event[1]
+            job = self.jobs[job_id]
+
+            if kind == "finished":
+                _, _, status, error = event
+                job['finished'] = True
+                if status == "cancelled" or self._was_cancelled(cancelled, job_id):
+                    # Вихідний файл чіпаємо лише якщо завдання встигло почати його писати
+                    if job.get('started'):
+                        self._remove_partial(job['output'])
+                    self._emit("status", job['ref'], "cancelled", "⏹ Скасовано")
+                elif status == "error":
+                    self._emit("status", job['ref'], "error", "❌ Помилка")
+                    print(f"Помилка: {error}")
+                elif status == "cached":
+                    self.cache_hits += 1
+                    self._emit("status", job['ref'], "cached", "♻️ З кешу")
+                else:
+                    self._emit("status", job['ref'], "completed", "✅ Готово")
+                if status == "completed" and self.cache_path:
+                    self.cache_misses += 1
+                if self.cache_path:
+                    self.progress_queue.put(("cache", self.cache_hits, self.cache_misses))
+                done += 1
+                self.progress_queue.put(("progress", done, total))
+                continue
+
+            if kind == "job_progress" and event[2] == 0:
+                job['started'] = True
+                self._emit("status", job['ref'], "converting", "🔄 Конвертація...")
+            self.progress_queue.put((kind, job['ref']) + tuple(event[2:]))
+
+    @staticmethod
+    def _was_cancelled(cancelled, job_id):
+        try:
+            return job_id in cancelled
+        except (EOFError, OSError):
+            # Менеджер зупинено лише після переривання run(), коли скасовано все
+            return True
+
+    def _emit(self, kind, ref, status, text):
+        self.progress_queue.put((kind, ref, status, text))
+
+    @staticmethod
+    def _remove_partial(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -1,11 +1,103 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, colorchooser
-from PIL import Image, ImageTk, ImageOps, ImageFilter, ImageEnhance, ImageDraw
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageTk, ImageDraw
 import cv2
 import numpy as np
 
+from image_tiles import TiledImage
+from edit_history import EditHistory
+from edit_stack import EditStack, Node, render_tiled
+from live_preview import LivePreview
+from pixel_art import (DITHER_MODES, FIXED_PALETTES, PALETTE_CACHE, PALETTE_METHODS,
+                       make_palette, pixel_grid, quantize)
+from paint_engine import StrokeEngine, draw_polyline, union_box
+
 WINDOW_WIDTH = 1200
 WINDOW_HEIGHT = 700
+PREVIEW_SIZE = (WINDOW_WIDTH - 50, WINDOW_HEIGHT - 200)
+# Як часто Tk перевіряє, чи завершилася фонова операція
+OPERATION_POLL_MS = 50
+# Пам'ять під undo/redo; глибина історії визначається нею, а не кількістю кроків
+HISTORY_BUDGET = 512 * 1024 * 1024
+
+
+def full_resolution(operation):
+    """
+    Обгортка для операцій з ресемплінгом усього кадру (зміна розміру, поворот):
+    їх не розбити на тайли без швів, тож вони працюють на зібраному зображенні
+    """
+    def run(document, *args):
+        return TiledImage.from_image(operation(document.to_image(), *args))
+    return run
+
+
+@full_resolution
+def resize_document(img, size):
+    return img.resize(size, Image.Resampling.LANCZOS)
+
+
+@full_resolution
+def rotate_document(img, angle):
+    return img.rotate(angle, expand=True)
+
+
+@full_resolution
+def upscale_document(img, scale):
+    # Конвертація PIL -> OpenCV
+    img_cv = cv2.cvtColor(np.array(img.convert("RGB")), cv2.COLOR_RGB2BGR)
+
+    # Upscaling через EDSR або Bicubic
+    h, w = img_cv.shape[:2]
+    upscaled = cv2.resize(img_cv, (w * scale, h * scale), interpolation=cv2.INTER_CUBIC)
+
+    # Конвертація назад у PIL
+    return Image.fromarray(cv2.cvtColor(upscaled, cv2.COLOR_BGR2RGB))
+
+
+def crop_document(document, box):
+    left, top, right, bottom = box
+    box = (max(0, left), max(0, top), min(document.width, right), min(document.height, bottom))
+    if box[0] >= box[2] or box[1] >= box[3]:
+        raise ValueError("Область обрізання порожня")
+    return document.cropped(box)
+
+
+def pixel_art_document(document, pixel_size, num_colors, palette, dither):
+    """
+    Піксель-арт документа. Сітка зменшується по тайлах; палітра рахується з тієї самої
+    зменшеної копії, що й у прев'ю, тож кольори збігаються з показаними
+    """
+    source = None if palette in FIXED_PALETTES else document.preview(*PREVIEW_SIZE)
+    colors = make_palette(source, num_colors, palette)
+    size = (max(1, document.width // pixel_size), max(1, document.height // pixel_size))
+    # Зменшення по тайлах: повне зображення не збирається
+    grid = document.resized(size, Image.Resampling.BOX)
+    return TiledImage.from_image(quantize(grid, colors, dither))
+
+
+def paste_document(document, img, box):
+    """Новий документ зі вставленою областю; решта тайлів спільна зі старим"""
+    result = document.copy()
+    result.paste(img, box)
+    return result
+
+
+# Операції як команди історії: (застосувати, скасувати). Без функції скасування
+# зберігається попередній стан, а redo повторює операцію
+COMMANDS = {
+    "resize": (resize_document, None),
+    "rotate": (rotate_document, None),
+    # Поворот на кратний 90° кут точний в обидва боки, тож пікселі не зберігаються
+    "rotate90": (rotate_document, lambda document, angle: rotate_document(document, -angle)),
+    "upscale": (upscale_document, None),
+    "crop": (crop_document, None),
+    "mirror": (TiledImage.mirrored, TiledImage.mirrored),
+    "flip": (TiledImage.flipped, TiledImage.flipped),
+    # Зведення шарів корекції: увесь стек одним проходом по тайлах
+    "adjust": (render_tiled, None),
+    "pixel_art": (pixel_art_document, None),
+}
 
 
 class PhotoEditorPro:
@@ -15,46 +107,123 @@ class PhotoEditorPro:
         self.root.geometry(f"{WINDOW_WIDTH}x{WINDOW_HEIGHT}")
         self.root.resizable(True, False)
 
-        self.original_img = None
-        self.current_img = None
+        # Документ - TiledImage; операції створюють новий документ, не змінюючи старий
+        self.original = None
+        self.document = None
         self.displayed_img = None
-        self.history = []
-        self.history_position = -1
+        self.displayed_pixel = None
+        # Зменшена копія документа для прев'ю і документ, з якого її зроблено
+        self.proxy = None
+        self.proxy_source = None
+        # Шари корекції (вузли стеку) поверх документа: не змінюють його до зведення
+        self.adjustments = []
+        # Що повторює redo, у зворотному порядку скасування: вузол шару або None - крок історії.
+        # Шари не записуються в історію, тож undo спершу прибирає найновіший шар
+        self.redo_steps = []
+        self.history = EditHistory(HISTORY_BUDGET, commands=COMMANDS, from_image=TiledImage.from_image)
+
+        # Операції виконуються поза потоком Tk, по одній
+        self.worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="editor")
+        self.busy = False
 
         # Для Paint
         self.drawing = False
-        self.last_x = None
-        self.last_y = None
+        # Масштаб canvas -> зображення рахується раз на мазок, а не на кожну подію
+        self.paint_scale = (1.0, 1.0)
         self.brush_color = "#000000"
         self.brush_size = 5
         self.canvas_img = None
         self.draw_obj = None
+        self.paint_base = None
+        self.paint_bbox = None
+        self.strokes = StrokeEngine(self.root, self.paint_stroke)
+
+        # Прев'ю шарів рендериться на проксі у фоні, повна роздільність - при зведенні.
+        # У кожного потоку прев'ю свій стек з кешем сегментів
+        self.preview_stack = EditStack()
+        self.pixel_stack = EditStack()
+        self.adjust_preview = LivePreview(self.root, self.preview_stack.render,
+                                          lambda img: self.show_image(self.preview_label, img, "displayed_img"))
+        self.pixel_preview = LivePreview(self.root, self.render_pixel_preview,
+                                         lambda img: self.show_image(self.pixel_preview_label, img, "displayed_pixel"))
 
         self._build_ui()
 
     # ==================== ОСНОВНІ ФУНКЦІЇ ====================
 
-    def add_to_history(self, img):
-        """Додає зображення в історію для undo/redo"""
-        if self.history_position < len(self.history) - 1:
-            self.history = self.history[:self.history_position + 1]
-        self.history.append(img.copy())
-        self.history_position += 1
-        if len(self.history) > 20:  # Обмеження історії
-            self.history.pop(0)
-            self.history_position -= 1
-
     def undo(self):
-        if self.history_position > 0:
-            self.history_position -= 1
-            self.current_img = self.history[self.history_position].copy()
+        """Прибирає найновіший шар корекції, а коли шарів немає - скасовує крок історії"""
+        if self.busy:
+            return
+        if self.adjustments:
+            self.redo_steps.append(self.adjustments.pop())
             self.update_preview()
+        elif self.history.can_undo:
+            self.redo_steps.append(None)
+            self.run_task(self.history.undo, on_done=self.sync_paint_canvas)
 
     def redo(self):
-        if self.history_position < len(self.history) - 1:
-            self.history_position += 1
-            self.current_img = self.history[self.history_position].copy()
+        if self.busy:
+            return
+        step = self.redo_steps.pop() if self.redo_steps else None
+        if step is not None:
+            self.adjustments.append(step)
             self.update_preview()
+        elif self.history.can_redo:
+            self.run_task(self.history.redo, on_done=self.sync_paint_canvas)
+
+    def sync_paint_canvas(self):
+        """Після undo/redo полотно Paint має показувати той самий стан, що й документ"""
+        if self.notebook.index("current") == 2:
+            self.init_paint_canvas()
+
+    def run_operation(self, name, *params, on_done=None, on_success=None):
+        """Застосовує команду name з COMMANDS і записує її в історію; шари корекції спершу зводяться"""
+        self.redo_steps.clear()
+        if self.adjustments and name != "adjust":
+            self.flatten_adjustments(on_done=lambda: self.run_operation(name, *params, on_done=on_done,
+                                                                          on_success=on_success))
+            return
+        apply, _ = self.history.commands[name]
+
+        def task(document):
+            result = apply(document, *params)
+            self.history.commit_command(result, name, *params)
+            return result
+
+        self.run_task(task, on_done=on_done, on_success=on_success)
+
+    def run_task(self, task, on_done=None, on_success=None):
+        """
+        Виконує task(document) -> новий документ у фоновому потоці;
+        тайли обробляються паралельно, а інтерфейс лишається чутливим.
+        Поки задача працює, історію змінює лише вона.
+        on_success викликається з новим документом до оновлення прев'ю, on_done - після
+        """
+        if not self.document or self.busy:
+            return
+        self.busy = True
+        self.info_label.config(text="⏳ Обробка...")
+        future = self.worker.submit(task, self.document)
+        self.root.after(OPERATION_POLL_MS, self._poll_operation, future, on_done, on_success)
+
+    def _poll_operation(self, future, on_done, on_success=None):
+        if not future.done():
+            self.root.after(OPERATION_POLL_MS, self._poll_operation, future, on_done, on_success)
+            return
+        self.busy = False
+        try:
+            document = future.result()
+        except Exception as e:
+            self.update_info_label()
+            messagebox.showerror("Помилка", str(e))
+            return
+        self.document = document
+        if on_success:
+            on_success()
+        self.update_preview()
+        if on_done:
+            on_done()
 
     @staticmethod
     def resize_for_display(img, max_w, max_h):
@@ -65,17 +234,39 @@ class PhotoEditorPro:
         return img.resize(new_size, Image.Resampling.LANCZOS)
 
     def update_preview(self):
-        if not self.current_img:
+        if not self.document:
             return
 
-        display_img = self.resize_for_display(self.current_img, WINDOW_WIDTH - 50, WINDOW_HEIGHT - 200)
-        self.displayed_img = ImageTk.PhotoImage(display_img)
-        self.preview_label.config(image=self.displayed_img)
+        if self.adjustments:
+            self.adjust_preview.request(self.get_proxy(), list(self.adjustments))
+        else:
+            self.adjust_preview.cancel()
+            self.show_image(self.preview_label, self.get_proxy(), "displayed_img")
         self.update_info_label()
+        self.update_layers_list()
+        if self.notebook.index("current") == 1:
+            self.preview_pixel_art()
+
+    def get_proxy(self):
+        """Зменшена копія документа; перебудовується лише після зміни документа"""
+        if self.proxy_source is not self.document:
+            self.proxy = self.document.preview(*PREVIEW_SIZE)
+            self.proxy_source = self.document
+        return self.proxy
+
+    def show_image(self, label, img, attr):
+        # Посилання на PhotoImage треба тримати, інакше Tk покаже порожнє місце
+        photo = ImageTk.PhotoImage(img)
+        setattr(self, attr, photo)
+        label.config(image=photo)
+
+    def render_pixel_preview(self, proxy, nodes):
+        """Шари корекції і піксель-арт на проксі; виконується у фоновому потоці"""
+        return self.pixel_stack.render(proxy, nodes).resize(proxy.size, Image.Resampling.NEAREST)
 
     def update_info_label(self):
-        if self.current_img:
-            info = f"Розмір: {self.current_img.width}x{self.current_img.height} | Режим: {self.current_img.mode}"
+        if self.document:
+            info = f"Розмір: {self.document.width}x{self.document.height} | Режим: {self.document.mode}"
             self.info_label.config(text=info)
 
     # ==================== РОБОТА З ФАЙЛАМИ ====================
@@ -85,14 +276,15 @@ class PhotoEditorPro:
             filetypes=[("Зображення", "*.png;*.jpg;*.jpeg;*.bmp;*.gif;*.webp")]
         )
         if path:
-            self.original_img = Image.open(path)
-            self.current_img = self.original_img.copy()
-            self.history = [self.current_img.copy()]
-            self.history_position = 0
+            self.original = TiledImage.open(path)
+            self.document = self.original
+            self.adjustments = []
+            self.redo_steps.clear()
+            self.history.reset(self.document)
             self.update_preview()
 
     def save_image(self):
-        if not self.current_img:
+        if not self.document:
             messagebox.showwarning("Увага", "Немає зображення для збереження!")
             return
         path = filedialog.asksaveasfilename(
@@ -100,20 +292,66 @@ class PhotoEditorPro:
             filetypes=[("PNG", "*.png"), ("JPEG", "*.jpg"), ("BMP", "*.bmp")]
         )
         if path:
-            self.current_img.save(path)
+            # Шари корекції рендеряться у файл, але документ лишається незведеним
+            document = render_tiled(self.document, self.adjustments) if self.adjustments else self.document
+            img = document.to_image()
+            if path.lower().endswith((".jpg", ".jpeg")) and img.mode != "RGB":
+                img = img.convert("RGB")
+            img.save(path)
             messagebox.showinfo("Успіх", f"Збережено: {path}")
 
     def reset_image(self):
-        if self.original_img:
-            self.current_img = self.original_img.copy()
-            self.history = [self.current_img.copy()]
-            self.history_position = 0
+        if self.original and not self.busy:
+            self.document = self.original
+            self.adjustments = []
+            self.redo_steps.clear()
+            self.history.reset(self.document)
+            self.update_preview()
+
+    # ==================== ШАРИ КОРЕКЦІЇ ====================
+
+    def add_adjustment(self, node):
+        if self.document:
+            self.adjustments.append(node)
+            self.redo_steps.clear()
             self.update_preview()
 
+    def remove_adjustment(self):
+        """Прибирає виділений шар (без виділення - останній); решта стеку лишається в кеші"""
+        # Під час зведення шари, що зводяться, ще в списку - їх не чіпаємо
+        if not self.adjustments or self.busy:
+            return
+        selection = self.layers_list.curselection()
+        del self.adjustments[selection[0] if selection else -1]
+        self.redo_steps.clear()
+        self.update_preview()
+
+    def flatten_adjustments(self, on_done=None):
+        """Зводить шари корекції в документ одним кроком історії"""
+        if not self.adjustments:
+            if on_done:
+                on_done()
+            return
+        if not self.document or self.busy:
+            return
+        nodes = tuple(self.adjustments)
+
+        def flattened():
+            # Шари прибираються лише після успішного зведення: при помилці вони лишаються.
+            # Додані за час зведення стоять після зведених і зберігаються
+            del self.adjustments[:len(nodes)]
+
+        self.run_operation("adjust", nodes, on_done=on_done, on_success=flattened)
+
+    def update_layers_list(self):
+        self.layers_list.delete(0, "end")
+        for node in self.adjustments:
+            self.layers_list.insert("end", node.label)
+
     # ==================== ВКЛАДКА 1: ОСНОВНИЙ РЕДАКТОР ====================
 
     def resize_image(self):
-        if not self.current_img:
+        if not self.document:
             return
 
         dialog = tk.Toplevel(self.root)
@@ -122,12 +360,12 @@ class PhotoEditorPro:
 
         tk.Label(dialog, text="Ширина:").pack(pady=5)
         width_entry = tk.Entry(dialog)
-        width_entry.insert(0, str(self.current_img.width))
+        width_entry.insert(0, str(self.document.width))
         width_entry.pack()
 
         tk.Label(dialog, text="Висота:").pack(pady=5)
         height_entry = tk.Entry(dialog)
-        height_entry.insert(0, str(self.current_img.height))
+        height_entry.insert(0, str(self.document.height))
         height_entry.pack()
 
         keep_ratio = tk.BooleanVar(value=True)
@@ -137,18 +375,17 @@ class PhotoEditorPro:
             try:
                 w = int(width_entry.get())
                 h = int(height_entry.get())
-                self.add_to_history(self.current_img)
-                self.current_img = self.current_img.resize((w, h), Image.Resampling.LANCZOS)
-                self.update_preview()
-                dialog.destroy()
-            except:
+            except ValueError:
                 messagebox.showerror("Помилка", "Невірні значення!")
+                return
+            self.run_operation("resize", (w, h))
+            dialog.destroy()
 
         tk.Button(dialog, text="Застосувати", command=apply_resize).pack(pady=10)
 
     def upscale_image(self):
         """AI upscaling через OpenCV"""
-        if not self.current_img:
+        if not self.document:
             return
 
         dialog = tk.Toplevel(self.root)
@@ -160,30 +397,15 @@ class PhotoEditorPro:
         tk.Spinbox(dialog, from_=2, to=4, textvariable=scale_var).pack()
 
         def apply_upscale():
-            try:
-                scale = scale_var.get()
-                self.add_to_history(self.current_img)
-
-                # Конвертація PIL -> OpenCV
-                img_cv = cv2.cvtColor(np.array(self.current_img), cv2.COLOR_RGB2BGR)
-
-                # Upscaling через EDSR або Bicubic
-                h, w = img_cv.shape[:2]
-                upscaled = cv2.resize(img_cv, (w * scale, h * scale),
-                                      interpolation=cv2.INTER_CUBIC)
-
-                # Конвертація назад у PIL
-                self.current_img = Image.fromarray(cv2.cvtColor(upscaled, cv2.COLOR_BGR2RGB))
-                self.update_preview()
-                dialog.destroy()
-                messagebox.showinfo("Готово", f"Зображення збільшено в {scale}x")
-            except Exception as e:
-                messagebox.showerror("Помилка", str(e))
+            scale = scale_var.get()
+            self.run_operation("upscale", scale,
+                               on_done=lambda: messagebox.showinfo("Готово", f"Зображення збільшено в {scale}x"))
+            dialog.destroy()
 
         tk.Button(dialog, text="Збільшити", command=apply_upscale).pack(pady=10)
 
     def crop_image(self):
-        if not self.current_img:
+        if not self.document:
             return
 
         dialog = tk.Toplevel(self.root)
@@ -202,29 +424,28 @@ class PhotoEditorPro:
 
         tk.Label(dialog, text="Право:").grid(row=2, column=0, padx=5, pady=5)
         right_entry = tk.Entry(dialog)
-        right_entry.insert(0, str(self.current_img.width))
+        right_entry.insert(0, str(self.document.width))
         right_entry.grid(row=2, column=1)
 
         tk.Label(dialog, text="Низ:").grid(row=3, column=0, padx=5, pady=5)
         bottom_entry = tk.Entry(dialog)
-        bottom_entry.insert(0, str(self.current_img.height))
+        bottom_entry.insert(0, str(self.document.height))
         bottom_entry.grid(row=3, column=1)
 
         def apply_crop():
             try:
                 box = (int(left_entry.get()), int(top_entry.get()),
                        int(right_entry.get()), int(bottom_entry.get()))
-                self.add_to_history(self.current_img)
-                self.current_img = self.current_img.crop(box)
-                self.update_preview()
-                dialog.destroy()
-            except:
+            except ValueError:
                 messagebox.showerror("Помилка", "Невірні координати!")
+                return
+            self.run_operation("crop", box)
+            dialog.destroy()
 
         tk.Button(dialog, text="Обрізати", command=apply_crop).grid(row=4, column=0, columnspan=2, pady=10)
 
     def rotate_image(self):
-        if not self.current_img:
+        if not self.document:
             return
 
         dialog = tk.Toplevel(self.root)
@@ -236,154 +457,108 @@ class PhotoEditorPro:
         tk.Scale(dialog, from_=-180, to=180, orient="horizontal", variable=angle_var).pack(fill="x", padx=20)
 
         def apply_rotate():
-            self.add_to_history(self.current_img)
-            self.current_img = self.current_img.rotate(angle_var.get(), expand=True)
-            self.update_preview()
+            angle = angle_var.get()
+            self.run_operation("rotate90" if angle % 90 == 0 else "rotate", angle)
             dialog.destroy()
 
         tk.Button(dialog, text="Повернути", command=apply_rotate).pack(pady=10)
 
     def flip_horizontal(self):
-        if self.current_img:
-            self.add_to_history(self.current_img)
-            self.current_img = ImageOps.mirror(self.current_img)
-            self.update_preview()
+        self.run_operation("mirror")
 
     def flip_vertical(self):
-        if self.current_img:
-            self.add_to_history(self.current_img)
-            self.current_img = ImageOps.flip(self.current_img)
-            self.update_preview()
+        self.run_operation("flip")
 
-    def adjust_brightness(self):
-        if not self.current_img:
+    def adjust_dialog(self, title, kind, from_):
+        """Діалог корекції з живим прев'ю на проксі; «Застосувати» додає шар корекції"""
+        if not self.document:
             return
 
         dialog = tk.Toplevel(self.root)
-        dialog.title("Яскравість")
+        dialog.title(title)
         dialog.geometry("300x100")
 
-        brightness_var = tk.DoubleVar(value=1.0)
-        tk.Scale(dialog, from_=0.1, to=3.0, resolution=0.1, orient="horizontal",
-                 variable=brightness_var, label="Яскравість").pack(fill="x", padx=20)
+        proxy = self.get_proxy()
+        value_var = tk.DoubleVar(value=1.0)
+        # Попередні шари беруться з кешу стеку, рахується лише новий
+        tk.Scale(dialog, from_=from_, to=3.0, resolution=0.1, orient="horizontal",
+                 variable=value_var, label=title,
+                 command=lambda v: self.adjust_preview.request(
+                     proxy, self.adjustments + [Node(kind, float(v))])).pack(fill="x", padx=20)
 
-        def apply_brightness():
-            self.add_to_history(self.current_img)
-            enhancer = ImageEnhance.Brightness(self.current_img)
-            self.current_img = enhancer.enhance(brightness_var.get())
-            self.update_preview()
+        def apply_adjustment():
+            self.add_adjustment(Node(kind, value_var.get()))
             dialog.destroy()
 
-        tk.Button(dialog, text="Застосувати", command=apply_brightness).pack(pady=10)
-
-    def adjust_contrast(self):
-        if not self.current_img:
-            return
-
-        dialog = tk.Toplevel(self.root)
-        dialog.title("Контраст")
-        dialog.geometry("300x100")
-
-        contrast_var = tk.DoubleVar(value=1.0)
-        tk.Scale(dialog, from_=0.1, to=3.0, resolution=0.1, orient="horizontal",
-                 variable=contrast_var, label="Контраст").pack(fill="x", padx=20)
-
-        def apply_contrast():
-            self.add_to_history(self.current_img)
-            enhancer = ImageEnhance.Contrast(self.current_img)
-            self.current_img = enhancer.enhance(contrast_var.get())
+        def close():
+            # Без застосування прев'ю повертається до документа
+            self.adjust_preview.cancel()
             self.update_preview()
             dialog.destroy()
 
-        tk.Button(dialog, text="Застосувати", command=apply_contrast).pack(pady=10)
-
-    def adjust_saturation(self):
-        if not self.current_img:
-            return
+        dialog.protocol("WM_DELETE_WINDOW", close)
+        tk.Button(dialog, text="Застосувати", command=apply_adjustment).pack(pady=10)
 
-        dialog = tk.Toplevel(self.root)
-        dialog.title("Насиченість")
-        dialog.geometry("300x100")
-
-        saturation_var = tk.DoubleVar(value=1.0)
-        tk.Scale(dialog, from_=0.0, to=3.0, resolution=0.1, orient="horizontal",
-                 variable=saturation_var, label="Насиченість").pack(fill="x", padx=20)
+    def adjust_brightness(self):
+        self.adjust_dialog("Яскравість", "brightness", 0.1)
 
-        def apply_saturation():
-            self.add_to_history(self.current_img)
-            enhancer = ImageEnhance.Color(self.current_img)
-            self.current_img = enhancer.enhance(saturation_var.get())
-            self.update_preview()
-            dialog.destroy()
+    def adjust_contrast(self):
+        self.adjust_dialog("Контраст", "contrast", 0.1)
 
-        tk.Button(dialog, text="Застосувати", command=apply_saturation).pack(pady=10)
+    def adjust_saturation(self):
+        self.adjust_dialog("Насиченість", "saturation", 0.0)
 
     def apply_blur(self):
-        if self.current_img:
-            self.add_to_history(self.current_img)
-            self.current_img = self.current_img.filter(ImageFilter.BLUR)
-            self.update_preview()
+        self.add_adjustment(Node("blur"))
 
     def apply_sharpen(self):
-        if self.current_img:
-            self.add_to_history(self.current_img)
-            self.current_img = self.current_img.filter(ImageFilter.SHARPEN)
-            self.update_preview()
+        self.add_adjustment(Node("sharpen"))
 
     def apply_edge_enhance(self):
-        if self.current_img:
-            self.add_to_history(self.current_img)
-            self.current_img = self.current_img.filter(ImageFilter.EDGE_ENHANCE)
-            self.update_preview()
+        self.add_adjustment(Node("edge_enhance"))
 
     def apply_emboss(self):
-        if self.current_img:
-            self.add_to_history(self.current_img)
-            self.current_img = self.current_img.filter(ImageFilter.EMBOSS)
-            self.update_preview()
+        self.add_adjustment(Node("emboss"))
 
     def convert_grayscale(self):
-        if self.current_img:
-            self.add_to_history(self.current_img)
-            self.current_img = self.current_img.convert("L").convert("RGB")
-            self.update_preview()
+        self.add_adjustment(Node("grayscale"))
 
     def invert_colors(self):
-        if self.current_img:
-            self.add_to_history(self.current_img)
-            self.current_img = ImageOps.invert(self.current_img)
-            self.update_preview()
+        self.add_adjustment(Node("invert"))
 
     # ==================== ВКЛАДКА 2: PIXEL ART ====================
 
     @staticmethod
-    def to_pixel_art(img, pixel_size=16, num_colors=16):
-        new_width = max(1, img.width // pixel_size)
-        new_height = max(1, img.height // pixel_size)
-        pixel_art = img.resize((new_width, new_height), resample=Image.Resampling.BOX)
-        pixel_art = pixel_art.convert('P', palette=Image.ADAPTIVE, colors=num_colors)
-        return pixel_art.convert("RGB")
+    def pixel_art_grid(img, full_size, pixel_size, num_colors, palette, dither):
+        """Вузол стеку для прев'ю: сітка піксель-арту з проксі; палітра кешується для проксі"""
+        colors = PALETTE_CACHE.get(img, num_colors, palette)
+        return quantize(pixel_grid(img, pixel_size, full_size), colors, dither)
 
-    def apply_pixel_art(self):
-        if not self.current_img:
-            return
+    def pixel_art_settings(self):
+        return (self.pixel_size_scale.get(), self.num_colors_scale.get(),
+                self.palette_var.get(), self.dither_var.get())
 
-        pixel_size = self.pixel_size_scale.get()
-        num_colors = self.num_colors_scale.get()
+    def preview_pixel_art(self):
+        if self.document:
+            node = Node(self.pixel_art_grid, self.document.size, *self.pixel_art_settings())
+            self.pixel_preview.request(self.get_proxy(), self.adjustments + [node])
 
-        self.add_to_history(self.current_img)
-        self.current_img = self.to_pixel_art(self.current_img, pixel_size, num_colors)
-        self.update_preview()
+    def apply_pixel_art(self):
+        self.pixel_preview.cancel()
+        self.run_operation("pixel_art", *self.pixel_art_settings())
 
     # ==================== ВКЛАДКА 3: PAINT ====================
 
     def init_paint_canvas(self):
-        if not self.current_img:
+        if not self.document:
             messagebox.showwarning("Увага", "Спочатку відкрийте зображення!")
             return
 
-        self.canvas_img = self.current_img.copy()
+        # Для малювання потрібне зображення цілком
+        self.paint_base = self.document
+        self.canvas_img = self.document.to_image()
         self.draw_obj = ImageDraw.Draw(self.canvas_img)
+        self.paint_bbox = None
 
         # Очистити canvas і налаштувати
         self.paint_canvas.delete("all")
@@ -396,40 +571,50 @@ class PhotoEditorPro:
         self.paint_canvas.config(width=display_img.width, height=display_img.height)
 
     def start_draw(self, event):
+        if not self.canvas_img:
+            return
         self.drawing = True
-        self.last_x = event.x
-        self.last_y = event.y
+        self.paint_scale = (self.canvas_img.width / self.paint_canvas.winfo_width(),
+                            self.canvas_img.height / self.paint_canvas.winfo_height())
+        self.strokes.begin(event.x, event.y)
 
     def draw(self, event):
-        if self.drawing and self.canvas_img:
-            # Масштабування координат
-            scale_x = self.canvas_img.width / self.paint_canvas.winfo_width()
-            scale_y = self.canvas_img.height / self.paint_canvas.winfo_height()
-
-            x = int(event.x * scale_x)
-            y = int(event.y * scale_y)
-
-            if self.last_x and self.last_y:
-                prev_x = int(self.last_x * scale_x)
-                prev_y = int(self.last_y * scale_y)
-
-                # Малювання на оригінальному зображенні
-                self.draw_obj.line([prev_x, prev_y, x, y],
-                                   fill=self.brush_color, width=self.brush_size)
-
-                # Малювання на canvas
-                self.paint_canvas.create_line(self.last_x, self.last_y, event.x, event.y,
-                                              fill=self.brush_color, width=self.brush_size)
-
-            self.last_x = event.x
-            self.last_y = event.y
+        if self.drawing:
+            self.strokes.add(event.x, event.y)
+
+    def paint_stroke(self, points):
+        """Пачка згладжених точок мазка: одна операція на зображенні і один елемент canvas"""
+        scale_x, scale_y = self.paint_scale
+        # Малювання на оригінальному зображенні
+        box = draw_polyline(self.draw_obj, [(x * scale_x, y * scale_y) for x, y in points],
+                            self.brush_color, self.brush_size)
+        # Накопичує область мазка, щоб у документ потрапили лише змінені тайли
+        self.paint_bbox = union_box(self.paint_bbox, box)
+
+        # Малювання на canvas
+        coords = [c for point in (points if len(points) > 1 else points * 2) for c in point]
+        self.paint_canvas.create_line(*coords, fill=self.brush_color, width=self.brush_size,
+                                      capstyle="round", joinstyle="round")
 
     def stop_draw(self, event):
+        if not self.drawing:
+            return
         self.drawing = False
-        self.last_x = None
-        self.last_y = None
-        if self.canvas_img:
-            self.current_img = self.canvas_img.copy()
+        self.strokes.end(event.x, event.y)
+        self.commit_paint()
+
+    def commit_paint(self):
+        """Переносить намальоване в документ; кожен мазок - окремий крок історії"""
+        if not self.canvas_img or not self.paint_bbox or self.busy:
+            return
+        box = (max(0, self.paint_bbox[0]), max(0, self.paint_bbox[1]),
+               min(self.canvas_img.width, self.paint_bbox[2]), min(self.canvas_img.height, self.paint_bbox[3]))
+        self.paint_bbox = None
+        if box[0] >= box[2] or box[1] >= box[3]:
+            return
+        self.document = paste_document(self.document, self.canvas_img.crop(box), box)
+        self.history.commit(self.document, box)
+        self.redo_steps.clear()
 
     def choose_color(self):
         color = colorchooser.askcolor(title="Виберіть колір")[1]
@@ -438,14 +623,18 @@ class PhotoEditorPro:
             self.color_display.config(bg=color)
 
     def clear_canvas(self):
-        if self.canvas_img:
-            self.add_to_history(self.current_img)
+        """Прибирає все намальоване з моменту відкриття вкладки"""
+        if self.canvas_img and not self.busy:
+            if self.document is not self.paint_base:
+                self.document = self.paint_base
+                self.history.commit(self.document)
+                self.redo_steps.clear()
+                self.update_preview()
             self.init_paint_canvas()
 
     def apply_paint_changes(self):
         if self.canvas_img:
-            self.add_to_history(self.current_img)
-            self.current_img = self.canvas_img.copy()
+            self.commit_paint()
             self.update_preview()
             messagebox.showinfo("Успіх", "Зміни застосовано!")
 
@@ -498,6 +687,12 @@ class PhotoEditorPro:
         tk.Button(left_panel, text="Edge Enhance", command=self.apply_edge_enhance, width=20).pack(pady=3)
         tk.Button(left_panel, text="Emboss", command=self.apply_emboss, width=20).pack(pady=3)
 
+        tk.Label(left_panel, text="📚 ШАРИ КОРЕКЦІЇ", font=("Arial", 11, "bold"), bg="#f0f0f0").pack(pady=10)
+        self.layers_list = tk.Listbox(left_panel, height=4, width=24)
+        self.layers_list.pack(pady=3)
+        tk.Button(left_panel, text="Видалити шар", command=self.remove_adjustment, width=20).pack(pady=3)
+        tk.Button(left_panel, text="Звести шари", command=self.flatten_adjustments, width=20).pack(pady=3)
+
         # Панель перегляду
         preview_frame = tk.Frame(tab1)
         preview_frame.pack(side="right", fill="both", expand=True, padx=5, pady=5)
@@ -516,18 +711,33 @@ class PhotoEditorPro:
         tk.Label(control_frame, text="PIXEL ART КОНВЕРТЕР", font=("Arial", 12, "bold")).pack(pady=10)
 
         self.pixel_size_scale = tk.Scale(control_frame, from_=1, to=64, orient="horizontal",
-                                         label="Розмір пікселя", length=200)
+                                         label="Розмір пікселя", length=200,
+                                         command=lambda v: self.preview_pixel_art())
         self.pixel_size_scale.set(16)
         self.pixel_size_scale.pack(pady=10)
 
         self.num_colors_scale = tk.Scale(control_frame, from_=2, to=256, orient="horizontal",
-                                         label="Кількість кольорів", length=200)
+                                         label="Кількість кольорів", length=200,
+                                         command=lambda v: self.preview_pixel_art())
         self.num_colors_scale.set(16)
         self.num_colors_scale.pack(pady=10)
 
+        tk.Label(control_frame, text="Палітра:").pack()
+        self.palette_var = tk.StringVar(value=PALETTE_METHODS[0])
+        tk.OptionMenu(control_frame, self.palette_var, *PALETTE_METHODS,
+                      command=lambda v: self.preview_pixel_art()).pack(pady=5)
+
+        tk.Label(control_frame, text="Дизеринг:").pack()
+        self.dither_var = tk.StringVar(value=DITHER_MODES[0])
+        tk.OptionMenu(control_frame, self.dither_var, *DITHER_MODES,
+                      command=lambda v: self.preview_pixel_art()).pack(pady=5)
+
         tk.Button(control_frame, text="Застосувати Pixel Art",
                   command=self.apply_pixel_art, width=20, height=2).pack(pady=20)
 
+        self.pixel_preview_label = tk.Label(tab2, text="Прев'ю Pixel Art", font=("Arial", 14), bg="#e0e0e0")
+        self.pixel_preview_label.pack(side="right", fill="both", expand=True, padx=5, pady=5)
+
         # ВКЛАДКА 3: Paint
         tab3 = ttk.Frame(self.notebook)
         self.notebook.add(tab3, text="🖌️ Paint")
@@ -563,9 +773,18 @@ class PhotoEditorPro:
         self.paint_canvas.bind("<B1-Motion>", self.draw)
         self.paint_canvas.bind("<ButtonRelease-1>", self.stop_draw)
 
-        # Ініціалізувати paint canvas при переключенні вкладки
-        self.notebook.bind("<<NotebookTabChanged>>", lambda e:
-        self.init_paint_canvas() if self.notebook.index("current") == 2 and self.current_img else None)
+        # Прев'ю Pixel Art і paint canvas готуються при переключенні вкладки
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+
+    def on_tab_changed(self, event):
+        if not self.document:
+            return
+        tab = self.notebook.index("current")
+        if tab == 1:
+            self.preview_pixel_art()
+        elif tab == 2:
+            # Малювання йде по пікселях документа, тож шари корекції спершу зводяться
+            self.flatten_adjustments(on_done=self.init_paint_canvas)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,351 @@
+"""
+Рушій малювалки: заливка областей, згладжені мазки і відображення полотна брудними
+прямокутниками.
+
+Заливка не обходить пікселі по одному. Спершу NumPy будує маску пікселів, близьких
+до кольору під курсором, і розбиває її рядки на відрізки (span). Відрізки сусідніх
+рядків, що перекриваються, з'єднуються, і компоненти зв'язності шукаються для всіх
+відрізків разом. Пам'ять - кілька байтів на піксель плюс масиви відрізків, незалежно
+від площі заливки; на суцільному полотні відрізків лише по одному на рядок.
+"""
+import numpy as np
+from PIL import Image, ImageColor, ImageTk
+
+# Маска будується смугами, щоб проміжні масиви різниць не займали кількох копій полотна
+MASK_BAND_ROWS = 512
+
+
+def color_mask(pixels, target, tolerance=0):
+    """Пікселі, кожен канал яких відрізняється від target не більше ніж на tolerance"""
+    if pixels.ndim == 2:
+        pixels = pixels[..., np.newaxis]
+    target = np.atleast_1d(target).astype(int)
+    # |c - t| <= tolerance як діапазон у uint8: без переходу до ширшого типу і без копій каналів
+    low = np.clip(target - tolerance, 0, 255).astype(np.uint8)
+    high = np.clip(target + tolerance, 0, 255).astype(np.uint8)
+    mask = np.empty(pixels.shape[:2], dtype=bool)
+    for top in range(0, pixels.shape[0], MASK_BAND_ROWS):
+        band = pixels[top:top + MASK_BAND_ROWS]
+        close = mask[top:top + MASK_BAND_ROWS]
+        close[:] = True
+        for channel in range(band.shape[2]):
+            values = band[..., channel]
+            if low[channel] == high[channel]:
+                close &= values == low[channel]
+            else:
+                close &= (values >= low[channel]) & (values <= high[channel])
+    return mask
+
+
+def mask_spans(mask):
+    """
+    Горизонтальні відрізки маски: рядок, початок, кінець (не включно). Відрізки
+    відсортовані за (рядок, початок), тож ключ рядок * stride + x зростає монотонно
+    """
+    height, width = mask.shape
+    padded = np.zeros((height, width + 2), dtype=bool)
+    padded[:, 1:-1] = mask
+    # Межі відрізків у кожному рядку чергуються: початок, кінець, початок...
+    changes = np.flatnonzero(padded[:, 1:] != padded[:, :-1])
+    rows, starts = np.divmod(changes[0::2], width + 1)
+    return rows, starts, changes[1::2] - rows * (width + 1)
+
+
+def span_edges(rows, starts, ends, stride, reach):
+    """
+    Пари відрізків сусідніх рядків, що перекриваються. Для всіх відрізків одразу:
+    бінарним пошуком знаходиться діапазон перекритих відрізків рядка нижче
+    """
+    below = (rows + 1) * stride
+    first = np.searchsorted(ends + rows * stride, below + starts - reach, side="right")
+    last = np.searchsorted(starts + rows * stride, below + ends + reach, side="left")
+    counts = np.maximum(last - first, 0)
+    upper = np.repeat(np.arange(len(rows)), counts)
+    # Для кожного ребра - зсув усередині діапазону свого відрізка
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    lower = np.repeat(first, counts) + offsets
+    return upper, lower
+
+
+def span_labels(count, upper, lower):
+    """
+    Компоненти зв'язності графа відрізків: кожен корінь чіпляється до меншого сусіднього
+    кореня, після чого шляхи стискаються. Ребра всередині вже злитих компонент відкидаються,
+    тож кожен раунд коротший за попередній
+    """
+    parent = np.arange(count)
+    while len(upper):
+        root_a, root_b = parent[upper], parent[lower]
+        pending = root_a != root_b
+        upper, lower = upper[pending], lower[pending]
+        root_a, root_b = root_a[pending], root_b[pending]
+        np.minimum.at(parent, np.maximum(root_a, root_b), np.minimum(root_a, root_b))
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+    return parent
+
+
+def connected_spans(spans, width, x, y, connectivity=4):
+    """Булевий масив: які з відрізків spans з'єднані з пікселем (x, y)"""
+    rows, starts, ends = spans
+    stride = width + 2
+    # При 8-зв'язності відрізки сусідніх рядків торкаються ще й кутами
+    reach = 1 if connectivity == 8 else 0
+    labels = span_labels(len(rows), *span_edges(rows, starts, ends, stride, reach))
+    seed = np.searchsorted(rows * stride + starts, y * stride + x, side="right") - 1
+    return labels == labels[seed]
+
+
+def spans_to_mask(shape, rows, starts, ends):
+    """Маска з відрізків: +1 на початку, -1 після кінця і накопичена сума по рядку"""
+    height, width = shape
+    delta = np.zeros((height, width + 1), dtype=np.int8)
+    delta[rows, starts] = 1
+    delta[rows, ends] = -1
+    return np.cumsum(delta[:, :width], axis=1, dtype=np.int8).view(bool)
+
+
+def flood_fill(image, x, y, color, tolerance=0, connectivity=4):
+    """
+    Заливає на місці область image, зв'язану з (x, y), кольором color (hex або кортеж).
+    Повертає межі зміненої області для історії або None, якщо нічого не змінилося
+    """
+    if x < 0 or y < 0 or x >= image.width or y >= image.height:
+        return None
+    if isinstance(color, str):
+        color = ImageColor.getcolor(color, image.mode)
+    pixels = np.asarray(image)
+    target = pixels[y, x]
+    if tolerance == 0 and np.array_equal(target, color):
+        return None
+
+    mask = color_mask(pixels, target, tolerance)
+    rows, starts, ends = spans = mask_spans(mask)
+    found = connected_spans(spans, image.width, x, y, connectivity)
+    box = (int(starts[found].min()), int(rows[found].min()), int(ends[found].max()), int(rows[found].max()) + 1)
+    x0, y0, x1, y1 = box
+
+    # Маска заливки - маска кольору в межах області без відрізків інших компонент.
+    # Для суцільної області (найчастіший випадок) нічого не перебудовується
+    fill = mask[y0:y1, x0:x1]
+    others = ~found & (rows >= y0) & (rows < y1) & (ends > x0) & (starts < x1)
+    if others.any():
+        starts, ends = np.clip(starts[others], x0, x1) - x0, np.clip(ends[others], x0, x1) - x0
+        fill = fill & ~spans_to_mask(fill.shape, rows[others] - y0, starts, ends)
+    # Маска режиму "1": Pillow копіює колір за нею без змішування, на відміну від маски L
+    image.paste(color, box, Image.fromarray(fill))
+    return box
+
+
+# ==================== МАЗКИ ====================
+
+# Точки мазка збираються і малюються пачкою раз на кадр (~60 кадрів/с)
+STROKE_FRAME_MS = 16
+# Точки, ближчі за стільки пікселів до попередньої, - тремтіння пера, а не рух
+MIN_POINT_DISTANCE = 1.0
+# Крок дискретизації кривої між точками, пікселів
+CURVE_STEP = 2.0
+
+
+def catmull_rom(controls, segments):
+    """
+    Точки кривої Кетмелла-Рома на відрізках segments (індекси i - між controls[i + 1]
+    і controls[i + 2]) для всіх відрізків разом. Кількість проміжних точок залежить
+    від довжини відрізка; крива проходить через усі вихідні точки
+    """
+    p0, p1, p2, p3 = (controls[segments + k] for k in range(4))
+    lengths = np.hypot(*(p2 - p1).T)
+    counts = np.maximum(1, np.ceil(lengths / CURVE_STEP).astype(int))
+    owner = np.repeat(np.arange(len(segments)), counts)
+    # t у (0, 1]: початок відрізка - це кінець попереднього
+    t = ((np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + 1)
+         / np.repeat(counts, counts))[:, np.newaxis]
+    p0, p1, p2, p3 = p0[owner], p1[owner], p2[owner], p3[owner]
+    return 0.5 * (2 * p1 + (p2 - p0) * t + (2 * p0 - 5 * p1 + 4 * p2 - p3) * t ** 2
+                  + (3 * p1 - p0 - 3 * p2 + p3) * t ** 3)
+
+
+class StrokeBuffer:
+    """
+    Сирі точки мазка. take() віддає згладжену криву для відрізків, які вже можна
+    побудувати: відрізку потрібна ще одна точка після нього, тож останній
+    домальовується лише з final=True
+    """
+
+    def __init__(self, min_distance=MIN_POINT_DISTANCE):
+        self.min_distance = min_distance
+        self.points = []
+        self.emitted = 0
+
+    def add(self, x, y):
+        if self.points:
+            last_x, last_y = self.points[-1]
+            if abs(x - last_x) < self.min_distance and abs(y - last_y) < self.min_distance:
+                return False
+        self.points.append((x, y))
+        return True
+
+    def take(self, final=False):
+        count = len(self.points)
+        if count == 1 and final and self.emitted == 0:
+            # Клік без руху - одна точка
+            self.emitted = 1
+            return [self.points[0]]
+        end = count - 1 if final else count - 2
+        if end <= self.emitted:
+            return []
+        points = np.array(self.points, dtype=float)
+        # Крайні точки дублюються як контрольні для першого і останнього відрізка
+        controls = np.vstack([points[:1], points, points[-1:]])
+        curve = catmull_rom(controls, np.arange(self.emitted, end))
+        start = self.emitted
+        self.emitted = end
+        return [tuple(points[start])] + [tuple(p) for p in curve]
+
+
+def draw_polyline(draw, points, fill, width):
+    """
+    Уся ламана мазка одним викликом ImageDraw із заокругленими з'єднаннями; кінці -
+    кружками, як capstyle ROUND на полотні Tk. Повертає область, яку зачеплено
+    """
+    if len(points) > 1:
+        draw.line(points, fill=fill, width=width, joint="curve")
+    radius = width / 2
+    for x, y in {points[0], points[-1]}:
+        if width > 2:
+            draw.ellipse([x - radius, y - radius, x + radius, y + radius], fill=fill)
+        elif len(points) == 1:
+            draw.point((x, y), fill=fill)
+    xs, ys = [p[0] for p in points], [p[1] for p in points]
+    pad = width // 2 + 2
+    return int(min(xs)) - pad, int(min(ys)) - pad, int(max(xs)) + pad + 1, int(max(ys)) + pad + 1
+
+
+class StrokeEngine:
+    """
+    Збирає точки з подій миші чи планшета і віддає їх згладженими пачками не частіше
+    одного разу за кадр. Обробник руху лише додає точку в буфер; усі виклики Tk і
+    малювання відбуваються в on_batch(points) раз на кадр, хоч скільки подій прийшло
+    """
+
+    def __init__(self, widget, on_batch, frame_ms=STROKE_FRAME_MS, min_distance=MIN_POINT_DISTANCE):
+        self.widget = widget
+        self.on_batch = on_batch
+        self.frame_ms = frame_ms
+        self.min_distance = min_distance
+        self.buffer = None
+        self.timer = None
+
+    @property
+    def active(self):
+        return self.buffer is not None
+
+    def begin(self, x, y):
+        self.buffer = StrokeBuffer(self.min_distance)
+        self.buffer.add(x, y)
+
+    def add(self, x, y):
+        if self.buffer is not None and self.buffer.add(x, y) and self.timer is None:
+            self.timer = self.widget.after(self.frame_ms, self._frame)
+
+    def end(self, x=None, y=None):
+        """Завершує мазок: домальовує останній відрізок одразу, без очікування кадру"""
+        if self.buffer is None:
+            return
+        if x is not None:
+            self.buffer.add(x, y)
+        if self.timer is not None:
+            self.widget.after_cancel(self.timer)
+            self.timer = None
+        points = self.buffer.take(final=True)
+        self.buffer = None
+        if points:
+            self.on_batch(points)
+
+    def _frame(self):
+        self.timer = None
+        if self.buffer is not None:
+            points = self.buffer.take()
+            if points:
+                self.on_batch(points)
+
+
+# ==================== ВІДОБРАЖЕННЯ ====================
+
+# Скільки векторних елементів мазка тримає полотно, перш ніж їх замінить бітмап
+FLATTEN_ITEMS = 64
+
+
+def union_box(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
+
+
+class CanvasRenderer:
+    """
+    Показує PIL-зображення на tk.Canvas одним постійним PhotoImage. Змінені області
+    накопичуються як брудний прямокутник і копіюються в PhotoImage лише вони.
+    Лінії мазка, додані для миттєвого відгуку, періодично замінюються бітмапом,
+    тож кількість елементів полотна не росте, скільки б не тривало малювання
+    """
+
+    def __init__(self, canvas, flatten_items=FLATTEN_ITEMS):
+        self.canvas = canvas
+        self.flatten_items = flatten_items
+        self.image = None
+        self.photo = None
+        self.item = None
+        self.dirty = None
+        self.stroke_items = []
+
+    def invalidate(self, box=None):
+        """Позначає область зображення зміненою; None - усе зображення"""
+        if box is None:
+            box = (0, 0) + self.image.size
+        self.dirty = union_box(self.dirty, box)
+
+    def add_stroke_item(self, item, box):
+        """Тимчасовий елемент полотна, уже намальований у зображенні в області box"""
+        self.stroke_items.append(item)
+        self.invalidate(box)
+        if len(self.stroke_items) >= self.flatten_items:
+            self.flush()
+
+    def refresh(self, image, box=None):
+        """Показує image: повністю, якщо це нове зображення іншого розміру, інакше лише box"""
+        if self.photo is None or image.size != self.image.size:
+            self.image = image
+            self.dirty = None
+            self.photo = ImageTk.PhotoImage(image)
+            if self.item is None:
+                self.item = self.canvas.create_image(0, 0, anchor="nw", image=self.photo)
+            else:
+                self.canvas.itemconfigure(self.item, image=self.photo)
+            self._drop_stroke_items()
+            return
+        self.image = image
+        self.invalidate(box)
+        self.flush()
+
+    def flush(self):
+        """Копіює брудну область у PhotoImage і прибирає тимчасові елементи мазка"""
+        if self.dirty is not None:
+            x0, y0, x1, y1 = self.dirty
+            box = (max(0, x0), max(0, y0), min(self.image.width, x1), min(self.image.height, y1))
+            self.dirty = None
+            if box[0] < box[2] and box[1] < box[3]:
+                region = ImageTk.PhotoImage(self.image.crop(box))
+                # Tk копіює між фото лише прямокутник, решта PhotoImage не чіпається
+                self.canvas.tk.call(str(self.photo), "copy", str(region), "-to", box[0], box[1])
+        self._drop_stroke_items()
+
+    def _drop_stroke_items(self):
+        if self.stroke_items:
+            self.canvas.delete(*self.stroke_items)
+            self.stroke_items = []
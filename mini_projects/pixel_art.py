@@ -0,0 +1,284 @@
+"""
+Спільний рушій піксель-арту для pixel_arting.py, pixel_arting_v2.py і фоторедактора.
+
+Зображення зменшується до сітки BOX-ресемплінгом, після чого кожна клітинка
+отримує найближчий колір палітри. Палітра (median cut, k-means або фіксована
+PICO-8 / GameBoy) рахується з невеликої вибірки джерела і кешується, тому зміна
+розміру пікселя не перераховує її. Дизеринг - дифузія помилки Флойда-Стейнберга
+або впорядкований (матриця Байєра). Папки спрайтів конвертуються в пулі процесів,
+за потреби - зі спільною для всієї партії палітрою (див. pixel_art_cli.py).
+"""
+import os
+import weakref
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+from PIL import Image
+
+from edit_stack import EditStack, Node
+
+# Фіксовані палітри; для них кількість кольорів не враховується
+FIXED_PALETTES = {
+    "pico8": ["#000000", "#1d2b53", "#7e2553", "#008751", "#ab5236", "#5f574f", "#c2c3c7", "#fff1e8",
+              "#ff004d", "#ffa300", "#ffec27", "#00e436", "#29adff", "#83769c", "#ff77a8", "#ffccaa"],
+    "gameboy": ["#0f380f", "#306230", "#8bac0f", "#9bbc0f"],
+}
+PALETTE_METHODS = ["median_cut", "kmeans"] + list(FIXED_PALETTES)
+DITHER_MODES = ["none", "floyd_steinberg", "ordered"]
+
+# Палітра рахується з вибірки не більше стількох пікселів: кольори від цього майже не змінюються
+PALETTE_SAMPLE_PIXELS = 256 * 256
+KMEANS_ITERATIONS = 8
+PALETTE_CACHE_SIZE = 32
+# Стільки пікселів кожного файлу йде у вибірку спільної палітри партії
+SHARED_SAMPLE_PIXELS = 64 * 64
+
+# Ефекти після піксель-арту; сусідні точкові зливаються в один прохід LUT, фільтри - в один сегмент
+EFFECTS = {
+    "grayscale": Node("grayscale"),
+    "invert": Node("invert"),
+    "outline": Node("contour"),
+    "blur": Node("blur"),
+    "sharpen": Node("sharpen"),
+    "edge": Node("edge_enhance"),
+    "emboss": Node("emboss"),
+    "solarize": Node("solarize", 128),
+    "posterize": Node("posterize", 3),
+    "mirror": Node("mirror"),
+    "flip": Node("flip"),
+}
+
+# Матриця Байєра 4x4, нормована в [-0.5, 0.5)
+BAYER_4X4 = (np.array([[0, 8, 2, 10],
+                       [12, 4, 14, 6],
+                       [3, 11, 1, 9],
+                       [15, 7, 13, 5]], dtype=np.float32) + 0.5) / 16 - 0.5
+
+
+def hex_to_rgb(color):
+    color = color.lstrip("#")
+    return tuple(int(color[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def rgb_source(img):
+    """
+    RGB або RGBA для будь-якого режиму. Палітрові спрайти (P з info['transparency'])
+    і LA стають RGBA, тож прозорість не губиться, а зменшення йде BOX, а не NEAREST
+    """
+    if img.mode in ("RGB", "RGBA"):
+        return img
+    has_alpha = "A" in img.getbands() or "transparency" in img.info
+    return img.convert("RGBA" if has_alpha else "RGB")
+
+
+def palette_sample(img, max_pixels=PALETTE_SAMPLE_PIXELS):
+    """RGB-вибірка джерела для побудови палітри"""
+    img = rgb_source(img)
+    pixels = img.width * img.height
+    if pixels > max_pixels:
+        ratio = (max_pixels / pixels) ** 0.5
+        img = img.resize((max(1, int(img.width * ratio)), max(1, int(img.height * ratio))),
+                         Image.Resampling.BOX)
+    if img.mode == "RGBA":
+        # Прозорі пікселі не повинні забирати кольори палітри
+        data = np.asarray(img)
+        opaque = data[..., 3] >= 128
+        data = data[..., :3][opaque] if opaque.any() else data[..., :3].reshape(-1, 3)
+        return Image.fromarray(data.reshape(1, -1, 3))
+    return img
+
+
+def median_cut(sample, colors):
+    quantized = sample.quantize(colors, method=Image.Quantize.MEDIANCUT, dither=Image.Dither.NONE)
+    used = sorted(index for _, index in quantized.getcolors(256))
+    palette = np.array(quantized.getpalette()[:3 * 256], dtype=np.uint8).reshape(-1, 3)
+    return palette[used]
+
+
+def kmeans(sample, colors, iterations=KMEANS_ITERATIONS):
+    """K-means (Ллойд) по вибірці; центри стартують з median cut, тож сходиться за кілька ітерацій"""
+    pixels = np.asarray(sample, dtype=np.float32).reshape(-1, 3)
+    centers = median_cut(sample, colors).astype(np.float32)
+    for _ in range(iterations):
+        # |p - c|^2 = |p|^2 - 2 p.c + |c|^2; |p|^2 на вибір центру не впливає
+        labels = np.argmin((centers ** 2).sum(axis=1) - 2 * pixels @ centers.T, axis=1)
+        counts = np.bincount(labels, minlength=len(centers))
+        sums = np.zeros_like(centers)
+        np.add.at(sums, labels, pixels)
+        moved = counts > 0
+        new_centers = centers.copy()
+        new_centers[moved] = sums[moved] / counts[moved, np.newaxis]
+        if np.abs(new_centers - centers).max() < 0.5:
+            centers = new_centers
+            break
+        centers = new_centers
+    return np.clip(np.rint(centers), 0, 255).astype(np.uint8)
+
+
+def make_palette(img, num_colors=16, method="median_cut"):
+    """Палітра (N, 3) uint8 для img; для фіксованих палітр img не потрібне"""
+    if method in FIXED_PALETTES:
+        return np.array([hex_to_rgb(color) for color in FIXED_PALETTES[method]], dtype=np.uint8)
+    sample = palette_sample(img)
+    if method == "kmeans":
+        return kmeans(sample, num_colors)
+    if method == "median_cut":
+        return median_cut(sample, num_colors)
+    raise ValueError(f"Невідомий метод палітри: {method}")
+
+
+class PaletteCache:
+    """
+    Палітри, прив'язані до зображення-джерела: поки джерело те саме, палітра не
+    перераховується, хоч би як змінювався розмір пікселя. Джерело не утримується
+    """
+
+    def __init__(self, size=PALETTE_CACHE_SIZE):
+        self.size = size
+        self.entries = {}
+
+    def get(self, img, num_colors=16, method="median_cut"):
+        if method in FIXED_PALETTES:
+            num_colors = None
+        key = (id(img), num_colors, method)
+        entry = self.entries.get(key)
+        # id може дістатися новому зображенню, тож перевіряється і слабке посилання
+        if entry is not None and entry[0]() is img:
+            return entry[1]
+        palette = make_palette(img, num_colors, method)
+        if len(self.entries) >= self.size:
+            self.entries.pop(next(iter(self.entries)))
+        self.entries[key] = (weakref.ref(img), palette)
+        return palette
+
+
+PALETTE_CACHE = PaletteCache()
+
+
+def palette_image(palette):
+    image = Image.new("P", (1, 1))
+    image.putpalette(palette.tobytes())
+    return image
+
+
+def ordered_dither(img, palette):
+    """Впорядкований дизеринг: до пікселів додається поріг Байєра на відстань між кольорами палітри"""
+    data = np.asarray(img, dtype=np.float32)
+    height, width = data.shape[:2]
+    spread = 255 / max(1, round(len(palette) ** (1 / 3)))
+    threshold = np.tile(BAYER_4X4, (height // 4 + 1, width // 4 + 1))[:height, :width, np.newaxis]
+    return Image.fromarray(np.clip(data + threshold * spread, 0, 255).astype(np.uint8))
+
+
+def apply_palette(img, palette, dither="none"):
+    """Кожен піксель RGB-зображення - найближчий колір палітри"""
+    if dither == "ordered":
+        img = ordered_dither(img, palette)
+    mode = Image.Dither.FLOYDSTEINBERG if dither == "floyd_steinberg" else Image.Dither.NONE
+    return img.quantize(palette=palette_image(palette), dither=mode).convert("RGB")
+
+
+def pixel_grid(img, pixel_size, full_size=None):
+    """
+    Зменшення до сітки піксель-арту: колір клітинки - середнє її пікселів.
+    full_size - розмір оригіналу, якщо img - його проксі: сітка тоді та сама, що й для
+    оригіналу, а якщо вона не менша за проксі, пікселі дрібніші за екранні і береться сам img
+    """
+    img = rgb_source(img)
+    full_size = full_size or img.size
+    size = (max(1, full_size[0] // pixel_size), max(1, full_size[1] // pixel_size))
+    return img.resize(size, Image.Resampling.BOX) if size[0] < img.width else img
+
+
+def quantize(grid, palette, dither="none"):
+    """Сітка -> кольори палітри; прозорість стає бінарною, як у спрайтах"""
+    alpha = grid.getchannel("A") if "A" in grid.getbands() else None
+    result = apply_palette(grid.convert("RGB"), palette, dither)
+    if alpha is not None:
+        result.putalpha(alpha.point(lambda a: 255 if a >= 128 else 0))
+    return result
+
+
+def to_pixel_art(img, pixel_size=16, num_colors=16, palette="median_cut", dither="none",
+                 source=None, cache=PALETTE_CACHE):
+    """
+    Піксель-арт розміром сітки. palette - метод або готовий масив (N, 3);
+    source - зображення, з якого рахувати палітру (за замовчуванням img), щоб прев'ю
+    на проксі і збереження оригіналу мали однакові кольори
+    """
+    if isinstance(palette, str):
+        palette = cache.get(source if source is not None else img, num_colors, palette)
+    return quantize(pixel_grid(img, pixel_size), palette, dither)
+
+
+# ==================== ПАКЕТНА ОБРОБКА ====================
+
+def effect_nodes(effects):
+    """Назви ефектів -> вузли стеку в заданому порядку"""
+    return [EFFECTS[name] for name in effects]
+
+
+def convert_file(path, target, pixel_size=16, num_colors=16, palette="median_cut", dither="none",
+                 effects=()):
+    """Конвертує один файл у PNG target; виконується в процесі пулу"""
+    with Image.open(path) as img:
+        img.load()
+        result = to_pixel_art(img, pixel_size, num_colors, palette, dither)
+    if effects:
+        result = EditStack().render(result, effect_nodes(effects))
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    result.save(target)
+    return target
+
+
+def sample_file(path, max_pixels=SHARED_SAMPLE_PIXELS):
+    """Невелика вибірка пікселів файлу (N, 3) для спільної палітри"""
+    with Image.open(path) as img:
+        # JPEG одразу декодується зменшеним - повна роздільність для вибірки не потрібна
+        img.draft("RGB", (128, 128))
+        return np.asarray(palette_sample(img, max_pixels).convert("RGB")).reshape(-1, 3)
+
+
+def run_pool(func, items, jobs=None, **options):
+    """
+    func(*елемент, **options) для кожного елемента в пулі процесів. Генерує
+    (елемент, результат або виняток) у порядку завершення, щоб виклик міг показувати прогрес
+    """
+    with ProcessPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        futures = {pool.submit(func, *(item if isinstance(item, tuple) else (item,)), **options): item
+                   for item in items}
+        try:
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result()
+                except Exception as e:
+                    yield futures[future], e
+        finally:
+            # Перерваний генератор (Ctrl+C, break) не чекає решти черги
+            for future in futures:
+                future.cancel()
+
+
+def shared_palette(paths, num_colors=16, method="median_cut", jobs=None):
+    """
+    Одна палітра для всієї партії: вибірки файлів рахуються в пулі й об'єднуються,
+    тож спрайти одного набору отримують однакові кольори
+    """
+    if method in FIXED_PALETTES:
+        return make_palette(None, num_colors, method)
+    samples = [result for _, result in run_pool(sample_file, paths, jobs)
+               if not isinstance(result, Exception)]
+    if not samples:
+        raise ValueError("Жоден файл не вдалося прочитати для палітри")
+    pixels = np.concatenate(samples)
+    if len(pixels) > PALETTE_SAMPLE_PIXELS:
+        pixels = pixels[np.random.default_rng(0).choice(len(pixels), PALETTE_SAMPLE_PIXELS, replace=False)]
+    return make_palette(Image.fromarray(np.ascontiguousarray(pixels).reshape(1, -1, 3)), num_colors, method)
+
+
+def convert_batch(tasks, jobs=None, **options):
+    """
+    Конвертує пари (джерело, ціль) у пулі процесів; options - як у convert_file.
+    Генерує ((джерело, ціль), шлях або виняток) у порядку завершення
+    """
+    return run_pool(convert_file, tasks, jobs, **options)
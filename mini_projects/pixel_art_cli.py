@@ -0,0 +1,231 @@
+"""
+Пакетний конвертер піксель-арту без графічного інтерфейсу.
+
+Приймає файли, шаблони (glob) або папки ігрових ресурсів і конвертує їх у пулі
+процесів тим самим рушієм, що й pixel_arting_v2.py (pixel_art.py). Структура
+вкладених папок зберігається: для папки - від неї самої, для шаблону - від його
+частини без символів glob, для окремих файлів - від їхньої спільної папки. Якщо два
+джерела дають один вихідний файл (hero.png і hero.gif), до назв додається
+розширення джерела. З --shared-palette палітра рахується один раз з вибірки всіх
+файлів, тож увесь набір спрайтів має однакові кольори.
+
+    python pixel_art_cli.py sprites -o pixel --pixel-size 4 --colors 16
+    python pixel_art_cli.py assets -r --palette pico8 --dither ordered --effects outline posterize
+    python pixel_art_cli.py "tiles/*.png" --shared-palette --palette kmeans --colors 32 -j 8
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+import multiprocessing
+
+from pixel_art import DITHER_MODES, EFFECTS, PALETTE_METHODS, convert_batch, shared_palette
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".bmp", ".gif", ".webp", ".tga", ".tif", ".tiff"}
+PROGRESS_WIDTH = 30
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетна конвертація зображень у піксель-арт")
+    parser.add_argument('inputs', nargs='+', help="файли, шаблони glob або папки")
+    parser.add_argument('-o', '--output-dir', default="pixel_art", help="папка для результатів")
+    parser.add_argument('-r', '--recursive', action='store_true', help="обходити папки рекурсивно")
+    parser.add_argument('-p', '--pixel-size', type=int, default=16, help="розмір пікселя (за замовчуванням 16)")
+    parser.add_argument('-c', '--colors', type=int, default=16, help="кількість кольорів (1-256)")
+    parser.add_argument('--palette', choices=PALETTE_METHODS, default=PALETTE_METHODS[0],
+                        help="метод або фіксована палітра")
+    parser.add_argument('--dither', choices=DITHER_MODES, default=DITHER_MODES[0], help="дизеринг")
+    parser.add_argument('--effects', nargs='+', choices=list(EFFECTS), default=[], metavar='EFFECT',
+                        help=f"ланцюжок ефектів у порядку застосування: {', '.join(EFFECTS)}")
+    parser.add_argument('--shared-palette', action='store_true',
+                        help="одна палітра для всієї партії замість окремої для кожного файлу")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help="паралельних процесів")
+    parser.add_argument('-q', '--quiet', action='store_true', help="виводити лише помилки та підсумок")
+    args = parser.parse_args(argv)
+    if args.pixel_size < 1:
+        parser.error("розмір пікселя має бути не менше 1")
+    if not 1 <= args.colors <= 256:
+        parser.error("кількість кольорів має бути від 1 до 256")
+    return args
+
+
+def is_image(path):
+    return os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS
+
+
+def glob_root(pattern):
+    """Частина шаблону до першого компонента з символами glob: tiles/**/*.png -> tiles"""
+    parts = []
+    for part in os.path.normpath(pattern).split(os.sep):
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    return os.path.abspath(os.sep.join(parts) or os.curdir)
+
+
+def iter_sources(inputs, recursive, exclude_dir=None):
+    """
+    Повертає (файл, корінь) для зображень; корінь потрібен, щоб зберегти структуру
+    вкладених папок у папці виводу. Для файлів, заданих напряму, корінь - None:
+    його визначає with_common_root
+    """
+    for pattern in inputs:
+        is_glob = glob.has_magic(pattern)
+        paths = glob.glob(pattern, recursive=recursive) if is_glob else [pattern]
+        for path in paths:
+            if os.path.isdir(path):
+                yield from iter_dir_sources(path, recursive, exclude_dir)
+            elif os.path.isfile(path) and is_image(path):
+                yield os.path.abspath(path), glob_root(pattern) if is_glob else None
+
+
+def with_common_root(sources):
+    """Файлам, заданим напряму, дає спільну папку як корінь: a/x.png і b/x.png не зливаються в один x.png"""
+    loose = [os.path.dirname(src) for src, root in sources if root is None]
+    if not loose:
+        return sources
+    common = os.path.commonpath(loose)
+    return [(src, common if root is None else root) for src, root in sources]
+
+
+def iter_dir_sources(root, recursive, exclude_dir=None):
+    root = os.path.abspath(root)
+    stack = [root]
+    while stack:
+        dir_path = stack.pop()
+        try:
+            with os.scandir(dir_path) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                # Папку виводу всередині вхідної не обходимо, інакше результати конвертуються знову
+                if recursive and entry.path != exclude_dir:
+                    stack.append(entry.path)
+            elif entry.is_file() and is_image(entry.name):
+                yield entry.path, root
+
+
+def target_path(src, root, output_dir, suffix=""):
+    rel_dir = os.path.relpath(os.path.dirname(src), root)
+    base_name = os.path.splitext(os.path.basename(src))[0]
+    return os.path.normpath(os.path.join(output_dir, rel_dir, f"{base_name}{suffix}.png"))
+
+
+def make_tasks(sources, output_dir):
+    """
+    Пари (джерело, ціль). Процеси пулу пишуть паралельно, тож два джерела з однією
+    ціллю перезаписували б одне одного: такі цілі отримують розширення джерела
+    (hero_png.png, hero_gif.png), а якщо й цього мало - ще й номер.
+    Повертає завдання і список перейменованих джерел
+    """
+    groups = {}
+    for src, root in sources:
+        groups.setdefault(os.path.normcase(target_path(src, root, output_dir)), []).append((src, root))
+
+    tasks = []
+    renamed = []
+    used = set()
+    for key, group in groups.items():
+        if len(group) == 1:
+            src, root = group[0]
+            tasks.append((src, target_path(src, root, output_dir)))
+            used.add(key)
+            continue
+        for src, root in sorted(group):
+            suffix = "_" + os.path.splitext(src)[1].lstrip(".").lower()
+            target = target_path(src, root, output_dir, suffix)
+            number = 2
+            while os.path.normcase(target) in used or os.path.normcase(target) in groups:
+                target = target_path(src, root, output_dir, f"{suffix}_{number}")
+                number += 1
+            used.add(os.path.normcase(target))
+            tasks.append((src, target))
+            renamed.append(src)
+    return tasks, renamed
+
+
+class ProgressBar:
+    """Рядок прогресу в stderr, що перемальовується на місці"""
+
+    def __init__(self, total, label, quiet=False):
+        self.total = total
+        self.label = label
+        self.quiet = quiet
+        self.done = 0
+        self.start = time.perf_counter()
+        self.line = ""
+
+    def step(self):
+        self.done += 1
+        if self.quiet:
+            return
+        filled = PROGRESS_WIDTH * self.done // self.total
+        elapsed = time.perf_counter() - self.start
+        eta = elapsed / self.done * (self.total - self.done)
+        self.line = (f"{self.label} [{'#' * filled}{'.' * (PROGRESS_WIDTH - filled)}] "
+                     f"{self.done}/{self.total} | залишилось ~{eta:.0f} с")
+        print(f"\r{self.line}", end="", file=sys.stderr, flush=True)
+
+    def error(self, text):
+        # Помилка затирає смугу прогресу і лишається окремим рядком, смуга малюється під нею
+        print(f"\r{text.ljust(len(self.line))}", file=sys.stderr, flush=True)
+
+    def close(self):
+        if not self.quiet:
+            print(file=sys.stderr)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    output_dir = os.path.abspath(args.output_dir)
+    start = time.perf_counter()
+    try:
+        # Той самий файл, заданий кількома входами, конвертується один раз - з першим коренем
+        roots = {}
+        for src, root in iter_sources(args.inputs, args.recursive, output_dir):
+            roots.setdefault(src, root)
+        sources = with_common_root(list(roots.items()))
+        if not sources:
+            print("❌ Не знайдено зображень", file=sys.stderr)
+            return 2
+        tasks, renamed = make_tasks(sources, output_dir)
+        for src in renamed:
+            print(f"⚠️ Однакова назва виходу, до неї додано розширення: {src}", file=sys.stderr)
+
+        palette = args.palette
+        if args.shared_palette:
+            if not args.quiet:
+                print(f"🎨 Спільна палітра з {len(tasks)} файлів...", file=sys.stderr, flush=True)
+            try:
+                palette = shared_palette([src for src, _ in tasks], args.colors, args.palette, args.jobs)
+            except ValueError as e:
+                print(f"❌ {e}", file=sys.stderr)
+                return 1
+
+        progress = ProgressBar(len(tasks), "🧱", args.quiet)
+        errors = 0
+        try:
+            for (src, _), result in convert_batch(tasks, args.jobs, pixel_size=args.pixel_size,
+                                                  num_colors=args.colors, palette=palette,
+                                                  dither=args.dither, effects=args.effects):
+                if isinstance(result, Exception):
+                    errors += 1
+                    progress.error(f"❌ {src}: {result}")
+                progress.step()
+        finally:
+            progress.close()
+    except KeyboardInterrupt:
+        print("\n⏹ Зупинено", file=sys.stderr)
+        return 130
+
+    print(f"📊 Конвертовано: {len(tasks) - errors} | помилок: {errors} | "
+          f"{time.perf_counter() - start:.1f} с -> {output_dir}", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
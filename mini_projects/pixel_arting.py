@@ -2,21 +2,11 @@ import tkinter as tk
 from tkinter import filedialog
 from PIL import Image, ImageTk
 
+from pixel_art import to_pixel_art
+
 WINDOW_WIDTH = 500
 WINDOW_HEIGHT = 500
 
-def to_pixel_art(img, pixel_size=16, num_colors=16):
-    # Обчислюємо новий розмір для стискання
-    new_width = max(1, img.width // pixel_size)
-    new_height = max(1, img.height // pixel_size)
-
-    # Стискаємо зображення
-    pixel_art = img.resize((new_width, new_height), resample=Image.Resampling.BOX)
-
-    # Квантизація кольорів
-    pixel_art = pixel_art.convert('P', palette=Image.ADAPTIVE, colors=num_colors)
-    return pixel_art
-
 
 def resize_for_display(img):
     # Масштабуємо для GUI, зберігаючи пропорції
@@ -27,10 +17,11 @@ def resize_for_display(img):
     return img.resize(new_size, Image.Resampling.LANCZOS)
 
 def open_image():
-    global original_img, displayed_img
+    global original_img, displayed_img, pixel_result
     path = filedialog.askopenfilename(filetypes=[("Image files", "*.png;*.jpg;*.jpeg")])
     if path:
         original_img = Image.open(path)
+        pixel_result = None
         img_for_display = resize_for_display(original_img)
         update_preview(img_for_display)
 
@@ -39,26 +30,43 @@ def update_preview(img):
     displayed_img = ImageTk.PhotoImage(img)
     preview_label.config(image=displayed_img)
 
+def read_settings():
+    try:
+        pixel_size = max(1, int(pixel_size_entry.get()))
+        num_colors = min(256, max(1, int(num_colors_entry.get())))  # обмежуємо від 1 до 256
+    except ValueError:
+        print("Помилка: введіть коректні числа")
+        return None
+    return pixel_size, num_colors
+
+
+def render_pixel_art(settings):
+    """Піксель-арт для settings; результат прев'ю перевикористовується, поки налаштування ті самі"""
+    global pixel_result
+    if pixel_result is None or pixel_result[0] != settings:
+        pixel_result = (settings, to_pixel_art(original_img, *settings))
+    return pixel_result[1]
+
+
 def apply_pixel_art():
     if original_img:
-        try:
-            pixel_size = max(1, int(pixel_size_entry.get()))
-            num_colors = min(256, max(1, int(num_colors_entry.get())))  # обмежуємо від 1 до 256
-        except ValueError:
-            print("Помилка: введіть коректні числа")
+        settings = read_settings()
+        if settings is None:
             return
 
-        pixel_img = to_pixel_art(original_img, pixel_size, num_colors)
+        pixel_img = render_pixel_art(settings)
         img_for_display = resize_for_display(pixel_img)
         update_preview(img_for_display)
 
 
 def save_image():
     if original_img:
+        settings = read_settings()
+        if settings is None:
+            return
         path = filedialog.asksaveasfilename(defaultextension=".png", filetypes=[("PNG files","*.png")])
         if path:
-            pixel_img = to_pixel_art(original_img, int(pixel_size_entry.get()), int(num_colors_entry.get()))
-            pixel_img.save(path)
+            render_pixel_art(settings).save(path)
             print(f"Збережено: {path}")
 
 # ---- GUI ----
@@ -93,5 +101,7 @@ preview_label.pack(pady=10, expand=True)
 
 original_img = None
 displayed_img = None
+# (налаштування, результат) останнього застосування - збереження не рахує його заново
+pixel_result = None
 
 root.mainloop()
\ No newline at end of file
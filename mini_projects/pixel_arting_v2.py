@@ -1,6 +1,10 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox
-from PIL import Image, ImageTk, ImageOps, ImageFilter, ImageEnhance
+from PIL import Image, ImageTk
+
+from edit_stack import EditStack, Node
+from live_preview import LivePreview, make_proxy
+from pixel_art import DITHER_MODES, EFFECTS, PALETTE_CACHE, PALETTE_METHODS, pixel_grid, quantize
 
 WINDOW_WIDTH = 900
 WINDOW_HEIGHT = 500
@@ -10,76 +14,51 @@ class PixelArtApp:
     def __init__(self, root):
         self.root = root
         self.root.title("Pixel Art Converter Pro Max")
-        self.root.geometry(f"{WINDOW_WIDTH}x{WINDOW_HEIGHT + 250}")
+        self.root.geometry(f"{WINDOW_WIDTH}x{WINDOW_HEIGHT + 290}")
         self.root.resizable(False, False)
 
         self.original_img = None
-        self.pixel_img = None
         self.displayed_original = None
         self.displayed_pixel = None
+        # Зменшена до розміру прев'ю копія оригіналу: повзунки працюють лише з нею
+        self.proxy = None
+        # Кеш сегментів стеку: зміна останнього ефекту не перераховує попередні.
+        # Прев'ю рендериться у фоновому потоці, збереження - в потоці Tk, тож стеки окремі
+        self.preview_stack = EditStack()
+        self.full_stack = EditStack()
 
         self._build_ui()
+        self.live_preview = LivePreview(self.root, self.render_preview, self.show_pixel_preview)
 
     # ----------------- Основні функції -----------------
-    @staticmethod
-    def to_pixel_art(img, pixel_size=16, num_colors=16):
-        new_width = max(1, img.width // pixel_size)
-        new_height = max(1, img.height // pixel_size)
-
-        pixel_art = img.resize((new_width, new_height), resample=Image.Resampling.BOX)
-        pixel_art = pixel_art.convert('P', palette=Image.ADAPTIVE, colors=num_colors)
-        return pixel_art
-
-    @staticmethod
-    def resize_for_display(img, max_w, max_h):
-        w_ratio = max_w / img.width
-        h_ratio = max_h / img.height
-        ratio = min(w_ratio, h_ratio)
-        new_size = (int(img.width * ratio), int(img.height * ratio))
-        return img.resize(new_size, Image.Resampling.LANCZOS)
+    def pixel_art_grid(self, img, full_size, pixel_size, num_colors, palette, dither):
+        """
+        Перший вузол стеку: сітка піксель-арту з img (оригіналу або проксі). Палітра
+        рахується з оригіналу і кешується, тож прев'ю і збереження мають ті самі кольори
+        """
+        colors = PALETTE_CACHE.get(self.original_img, num_colors, palette)
+        return quantize(pixel_grid(img, pixel_size, full_size), colors, dither)
+
+    def current_nodes(self):
+        nodes = [Node(self.pixel_art_grid, self.original_img.size, self.pixel_size_scale.get(),
+                      self.num_colors_scale.get(), self.palette_var.get(), self.dither_var.get())]
+        return nodes + [EFFECTS[name] for name, var in self.effects.items() if var.get()]
+
+    def render_full(self):
+        """Піксель-арт у повній роздільності - лише для збереження"""
+        return self.full_stack.render(self.original_img, self.current_nodes())
+
+    def render_preview(self, proxy, nodes):
+        """Той самий стек на проксі; виконується у фоновому потоці"""
+        return self.preview_stack.render(proxy, nodes).resize(proxy.size, Image.Resampling.NEAREST)
 
     def update_preview(self):
         if not self.original_img:
             return
+        self.live_preview.request(self.proxy, self.current_nodes())
 
-        # Базовий піксель-арт
-        pixel_size = self.pixel_size_scale.get()
-        num_colors = self.num_colors_scale.get()
-        self.pixel_img = self.to_pixel_art(self.original_img, pixel_size, num_colors)
-        self.pixel_img = self.pixel_img.convert("RGB")
-
-        # Додаткові ефекти
-        if self.var_grayscale.get():
-            self.pixel_img = self.pixel_img.convert("L").convert("RGB")
-        if self.var_invert.get():
-            self.pixel_img = ImageOps.invert(self.pixel_img)
-        if self.var_outline.get():
-            self.pixel_img = self.pixel_img.filter(ImageFilter.CONTOUR)
-        if self.var_blur.get():
-            self.pixel_img = self.pixel_img.filter(ImageFilter.BLUR)
-        if self.var_sharpen.get():
-            self.pixel_img = self.pixel_img.filter(ImageFilter.SHARPEN)
-        if self.var_edge.get():
-            self.pixel_img = self.pixel_img.filter(ImageFilter.EDGE_ENHANCE)
-        if self.var_emboss.get():
-            self.pixel_img = self.pixel_img.filter(ImageFilter.EMBOSS)
-        if self.var_solarize.get():
-            self.pixel_img = ImageOps.solarize(self.pixel_img, threshold=128)
-        if self.var_posterize.get():
-            self.pixel_img = ImageOps.posterize(self.pixel_img, bits=3)
-        if self.var_mirror.get():
-            self.pixel_img = ImageOps.mirror(self.pixel_img)
-        if self.var_flip.get():
-            self.pixel_img = ImageOps.flip(self.pixel_img)
-
-        # Масштабування для прев’ю
-        orig_disp = self.resize_for_display(self.original_img, WINDOW_WIDTH // 2, WINDOW_HEIGHT)
-        pix_disp = self.resize_for_display(self.pixel_img, WINDOW_WIDTH // 2, WINDOW_HEIGHT)
-
-        self.displayed_original = ImageTk.PhotoImage(orig_disp)
-        self.displayed_pixel = ImageTk.PhotoImage(pix_disp)
-
-        self.preview_original.config(image=self.displayed_original)
+    def show_pixel_preview(self, img):
+        self.displayed_pixel = ImageTk.PhotoImage(img)
         self.preview_pixel.config(image=self.displayed_pixel)
 
     # ----------------- Події -----------------
@@ -89,16 +68,22 @@ class PixelArtApp:
         )
         if path:
             self.original_img = Image.open(path)
+            self.original_img.load()
+            self.proxy = make_proxy(self.original_img.convert("RGB"), WINDOW_WIDTH // 2, WINDOW_HEIGHT)
+            # Оригінал у прев'ю не змінюється, тож показується один раз
+            self.displayed_original = ImageTk.PhotoImage(self.proxy)
+            self.preview_original.config(image=self.displayed_original)
             self.update_preview()
 
     def save_image(self):
-        if not self.pixel_img:
+        if not self.original_img:
             return
         path = filedialog.asksaveasfilename(
             defaultextension=".png", filetypes=[("PNG files", "*.png")]
         )
         if path:
-            self.pixel_img.save(path)
+            # Повна роздільність рахується лише тут; незмінені сегменти беруться з кешу стеку
+            self.render_full().save(path)
             messagebox.showinfo("Успіх", f"Збережено: {path}")
 
     def reset_image(self):
@@ -107,6 +92,8 @@ class PixelArtApp:
                 var.set(False)
             self.pixel_size_scale.set(16)
             self.num_colors_scale.set(16)
+            self.palette_var.set(PALETTE_METHODS[0])
+            self.dither_var.set(DITHER_MODES[0])
             self.update_preview()
 
     # ----------------- GUI -----------------
@@ -124,6 +111,20 @@ class PixelArtApp:
         self.num_colors_scale.set(16)
         self.num_colors_scale.pack(fill="x", padx=20)
 
+        # Палітра і дизеринг
+        palette_frame = tk.Frame(self.root)
+        palette_frame.pack(pady=5)
+
+        tk.Label(palette_frame, text="Палітра:").pack(side="left")
+        self.palette_var = tk.StringVar(value=PALETTE_METHODS[0])
+        tk.OptionMenu(palette_frame, self.palette_var, *PALETTE_METHODS,
+                      command=lambda e: self.update_preview()).pack(side="left", padx=5)
+
+        tk.Label(palette_frame, text="Дизеринг:").pack(side="left", padx=(15, 0))
+        self.dither_var = tk.StringVar(value=DITHER_MODES[0])
+        tk.OptionMenu(palette_frame, self.dither_var, *DITHER_MODES,
+                      command=lambda e: self.update_preview()).pack(side="left", padx=5)
+
         # Ефекти
         effects_frame = tk.LabelFrame(self.root, text="Ефекти")
         effects_frame.pack(pady=5, fill="x", padx=20)
@@ -140,12 +141,13 @@ class PixelArtApp:
         self.var_mirror = tk.BooleanVar()
         self.var_flip = tk.BooleanVar()
 
-        self.effects_vars = [
-            self.var_grayscale, self.var_invert, self.var_outline,
-            self.var_blur, self.var_sharpen, self.var_edge,
-            self.var_emboss, self.var_solarize, self.var_posterize,
-            self.var_mirror, self.var_flip
-        ]
+        self.effects = {
+            "grayscale": self.var_grayscale, "invert": self.var_invert, "outline": self.var_outline,
+            "blur": self.var_blur, "sharpen": self.var_sharpen, "edge": self.var_edge,
+            "emboss": self.var_emboss, "solarize": self.var_solarize, "posterize": self.var_posterize,
+            "mirror": self.var_mirror, "flip": self.var_flip
+        }
+        self.effects_vars = list(self.effects.values())
 
         effects = [
             ("Grayscale", self.var_grayscale),
@@ -1,13 +1,31 @@
 import os
 import sys
 from pathlib import Path
-from PIL import Image
-from moviepy.editor import VideoFileClip
-from pydub import AudioSegment
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 from threading import Thread
 import queue
+import multiprocessing
+
+from media_convert import (FORMATS, DEFAULT_MAX_JOBS, DEFAULT_VIDEO_JOBS, SCRIPT_DIR, CACHE_FILENAME,
+                           IMAGE_PROFILES, DEFAULT_IMAGE_PROFILE,
+                           ConversionScheduler, get_file_type)
+
+# Скільки рядків додавати в список за один тік, щоб інтерфейс не зависав на великих наборах
+ROW_BATCH = 1000
+PROGRESS_POLL_MS = 100
+PROGRESS_BAR_WIDTH = 10
+
+# Текст і тег кольору для кожного статусу файлу
+STATUS_STYLES = {
+    "pending": ("⏳ Очікує", "pending"),
+    "queued": ("⏳ В черзі", "pending"),
+    "converting": ("🔄 Конвертація...", "converting"),
+    "completed": ("✅ Готово", "done"),
+    "cached": ("♻️ З кешу", "done"),
+    "error": ("❌ Помилка", "failed"),
+    "cancelled": ("⏹ Скасовано", "failed"),
+}
 
 
 class MediaConverterGUI:
@@ -24,11 +42,13 @@ class MediaConverterGUI:
         self.files_data = []
 
         # Формати
-        self.formats = {
-            "image": ["PNG", "JPEG", "WEBP", "BMP", "TIFF"],
-            "video": ["MP4", "AVI", "MOV", "WEBM", "GIF"],
-            "audio": ["MP3", "WAV", "OGG", "AAC", "FLAC"]
-        }
+        self.formats = FORMATS
+
+        # Планувальник поточної конвертації (None, коли конвертація не йде)
+        self.scheduler = None
+        self.cache_text = ""
+        # Змінюється при очищенні списку, щоб відкладене додавання рядків старого списку зупинилося
+        self.rows_generation = 0
 
         self.setup_ui()
         self.check_progress_queue()
@@ -95,26 +115,97 @@ class MediaConverterGUI:
         )
         clear_btn.pack(side="left", padx=5)
 
-        # Фрейм для списку файлів
-        list_frame = tk.Frame(main_container, bg="white", relief="flat", bd=0)
-        list_frame.pack(fill="both", expand=True, pady=(0, 15))
+        self.cancel_btn = tk.Button(
+            button_frame,
+            text="⏹ Скасувати",
+            command=self.cancel_conversion,
+            font=("Segoe UI", 12, "bold"),
+            bg="#f59e0b",
+            fg="white",
+            relief="flat",
+            padx=30,
+            pady=12,
+            cursor="hand2",
+            activebackground="#d97706",
+            state="disabled"
+        )
+        self.cancel_btn.pack(side="left", padx=5)
 
-        # Canvas для прокрутки
-        self.canvas = tk.Canvas(list_frame, bg="white", highlightthickness=0)
-        scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.canvas.yview)
-        self.scrollable_frame = tk.Frame(self.canvas, bg="white")
+        # Формат для всіх файлів одного типу (або лише для вибраних рядків цього типу)
+        bulk_row = tk.Frame(main_container, bg="#f0f4f8")
+        bulk_row.pack(fill="x", pady=(0, 5))
 
-        self.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all"))
-        )
+        tk.Label(
+            bulk_row,
+            text="Конвертувати в:",
+            font=("Segoe UI", 10),
+            bg="#f0f4f8",
+            fg="#475569"
+        ).pack(side="left", padx=(0, 5))
+
+        self.type_formats = {}
+        for file_type, formats in self.formats.items():
+            tk.Label(
+                bulk_row,
+                text=f"{self.get_icon(file_type)} {file_type}",
+                font=("Segoe UI", 10),
+                bg="#f0f4f8"
+            ).pack(side="left", padx=(10, 3))
+
+            self.type_formats[file_type] = tk.StringVar(value=formats[0])
+            format_menu = ttk.Combobox(
+                bulk_row,
+                textvariable=self.type_formats[file_type],
+                values=formats,
+                state="readonly",
+                width=7,
+                font=("Segoe UI", 10)
+            )
+            format_menu.pack(side="left")
+            format_menu.bind("<<ComboboxSelected>>", lambda e, t=file_type: self.apply_type_format(t))
+
+        tk.Label(
+            bulk_row,
+            text="(подвійний клік - формат для вибраних, Delete - видалити)",
+            font=("Segoe UI", 9),
+            bg="#f0f4f8",
+            fg="#64748b"
+        ).pack(side="left", padx=10)
 
-        self.canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
-        self.canvas.configure(yscrollcommand=scrollbar.set)
+        # Фрейм для списку файлів
+        list_frame = tk.Frame(main_container, bg="white", relief="flat", bd=0)
+        list_frame.pack(fill="both", expand=True, pady=(0, 15))
 
-        self.canvas.pack(side="left", fill="both", expand=True)
+        # Treeview малює лише видимі рядки, тож тисячі файлів не створюють тисяч віджетів
+        columns = ("type", "size", "format", "status", "progress")
+        self.tree = ttk.Treeview(list_frame, columns=columns, selectmode="extended")
+        self.tree.heading("#0", text="Файл", anchor="w")
+        self.tree.heading("type", text="Тип")
+        self.tree.heading("size", text="Розмір")
+        self.tree.heading("format", text="Формат")
+        self.tree.heading("status", text="Статус")
+        self.tree.heading("progress", text="Прогрес")
+        self.tree.column("#0", width=300, anchor="w")
+        self.tree.column("type", width=70, anchor="center", stretch=False)
+        self.tree.column("size", width=90, anchor="e", stretch=False)
+        self.tree.column("format", width=70, anchor="center", stretch=False)
+        self.tree.column("status", width=150, anchor="w", stretch=False)
+        self.tree.column("progress", width=150, anchor="w", stretch=False)
+
+        self.tree.tag_configure("pending", background="#fef3c7")
+        self.tree.tag_configure("converting", background="#dbeafe")
+        self.tree.tag_configure("done", background="#dcfce7")
+        self.tree.tag_configure("failed", background="#fee2e2")
+
+        scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+
+        self.tree.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
 
+        self.tree.bind("<Delete>", lambda e: self.remove_selected())
+        self.tree.bind("<Double-1>", self.show_format_menu)
+
         # Фрейм налаштувань
         settings_frame = tk.LabelFrame(
             main_container,
@@ -163,6 +254,83 @@ class MediaConverterGUI:
         )
         browse_btn.pack(side="left", padx=5)
 
+        # Паралельність
+        jobs_row = tk.Frame(settings_frame, bg="white")
+        jobs_row.pack(fill="x", pady=5)
+
+        tk.Label(
+            jobs_row,
+            text="⚡ Паралельних завдань:",
+            font=("Segoe UI", 10),
+            bg="white"
+        ).pack(side="left", padx=(0, 10))
+
+        self.max_jobs = tk.IntVar(value=DEFAULT_MAX_JOBS)
+        tk.Spinbox(
+            jobs_row,
+            from_=1,
+            to=64,
+            textvariable=self.max_jobs,
+            font=("Segoe UI", 10),
+            width=5
+        ).pack(side="left", padx=5)
+
+        tk.Label(
+            jobs_row,
+            text="з них відео:",
+            font=("Segoe UI", 10),
+            bg="white"
+        ).pack(side="left", padx=(10, 5))
+
+        self.max_video_jobs = tk.IntVar(value=DEFAULT_VIDEO_JOBS)
+        tk.Spinbox(
+            jobs_row,
+            from_=1,
+            to=16,
+            textvariable=self.max_video_jobs,
+            font=("Segoe UI", 10),
+            width=5
+        ).pack(side="left", padx=5)
+
+        self.use_cache = tk.BooleanVar(value=True)
+        tk.Checkbutton(
+            jobs_row,
+            text="♻️ Не конвертувати повторно (кеш)",
+            variable=self.use_cache,
+            font=("Segoe UI", 10),
+            bg="white",
+            activebackground="white"
+        ).pack(side="left", padx=(20, 5))
+
+        # Профіль зображень
+        profile_row = tk.Frame(settings_frame, bg="white")
+        profile_row.pack(fill="x", pady=5)
+
+        tk.Label(
+            profile_row,
+            text="🖼️ Профіль зображень:",
+            font=("Segoe UI", 10),
+            bg="white"
+        ).pack(side="left", padx=(0, 10))
+
+        self.image_profile = tk.StringVar(value=DEFAULT_IMAGE_PROFILE)
+        ttk.Combobox(
+            profile_row,
+            textvariable=self.image_profile,
+            values=list(IMAGE_PROFILES),
+            state="readonly",
+            width=12,
+            font=("Segoe UI", 10)
+        ).pack(side="left", padx=5)
+
+        tk.Label(
+            profile_row,
+            text="original - як є, web - до 1920 px, thumbnail - до 320 px, archive - максимальна якість",
+            font=("Segoe UI", 9),
+            bg="white",
+            fg="#64748b"
+        ).pack(side="left", padx=10)
+
         # Кнопка конвертації
         self.convert_btn = tk.Button(
             main_container,
@@ -194,14 +362,7 @@ class MediaConverterGUI:
         status_bar.pack(fill="x", side="bottom")
 
     def get_file_type(self, filename):
-        ext = filename.lower().split(".")[-1]
-        if ext in ["png", "jpg", "jpeg", "jfif", "bmp", "webp", "tiff"]:
-            return "image"
-        if ext in ["mp4", "mov", "avi", "mkv", "webm", "flv"]:
-            return "video"
-        if ext in ["mp3", "wav", "ogg", "aac", "m4a", "flac"]:
-            return "audio"
-        return None
+        return get_file_type(filename)
 
     def get_icon(self, file_type):
         icons = {
@@ -223,134 +384,124 @@ class MediaConverterGUI:
             ]
         )
 
+        added = []
         for file_path in files:
-            if not os.path.exists(file_path):
-                continue
-
             file_type = self.get_file_type(file_path)
             if not file_type:
                 continue
 
-            file_size = os.path.getsize(file_path) / (1024 * 1024)  # MB
+            try:
+                file_size = os.stat(file_path).st_size / (1024 * 1024)  # MB
+            except OSError:
+                continue
 
             file_data = {
                 "path": file_path,
                 "name": os.path.basename(file_path),
                 "type": file_type,
                 "size": f"{file_size:.2f} MB",
-                "format": tk.StringVar(value=self.formats[file_type][0]),
+                "format": self.type_formats[file_type].get(),
                 "status": "pending",
-                "progress": 0
+                "progress": 0,
+                "eta": None
             }
+            added.append(file_data)
 
-            self.files_data.append(file_data)
-            self.create_file_widget(file_data)
+        self.files_data.extend(added)
+        self.insert_rows(added, self.rows_generation)
 
         if self.files_data:
             self.convert_btn.config(state="normal")
             self.status_var.set(f"Додано {len(self.files_data)} файл(ів)")
 
-    def create_file_widget(self, file_data):
-        frame = tk.Frame(self.scrollable_frame, bg="#f8fafc", relief="solid", bd=1)
-        frame.pack(fill="x", padx=10, pady=5)
-
-        file_data["widget"] = frame
-
-        # Верхній рядок
-        top_row = tk.Frame(frame, bg="#f8fafc")
-        top_row.pack(fill="x", padx=10, pady=10)
-
-        # Іконка + інфо
-        icon_label = tk.Label(
-            top_row,
-            text=self.get_icon(file_data["type"]),
-            font=("Segoe UI", 24),
-            bg="#f8fafc"
-        )
-        icon_label.pack(side="left", padx=(0, 10))
-
-        info_frame = tk.Frame(top_row, bg="#f8fafc")
-        info_frame.pack(side="left", fill="x", expand=True)
-
-        name_label = tk.Label(
-            info_frame,
-            text=file_data["name"],
-            font=("Segoe UI", 11, "bold"),
-            bg="#f8fafc",
-            fg="#1e293b",
-            anchor="w"
-        )
-        name_label.pack(anchor="w")
-
-        size_label = tk.Label(
-            info_frame,
-            text=f"Розмір: {file_data['size']} | Тип: {file_data['type'].upper()}",
-            font=("Segoe UI", 9),
-            bg="#f8fafc",
-            fg="#64748b",
-            anchor="w"
-        )
-        size_label.pack(anchor="w")
-
-        # Вибір формату
-        format_label = tk.Label(
-            top_row,
-            text="Конвертувати в:",
-            font=("Segoe UI", 9),
-            bg="#f8fafc",
-            fg="#475569"
-        )
-        format_label.pack(side="left", padx=(10, 5))
-
-        format_menu = ttk.Combobox(
-            top_row,
-            textvariable=file_data["format"],
-            values=self.formats[file_data["type"]],
-            state="readonly",
-            width=10,
-            font=("Segoe UI", 10)
-        )
-        format_menu.pack(side="left", padx=5)
-
-        # Статус
-        file_data["status_label"] = tk.Label(
-            top_row,
-            text="⏳ Очікує",
-            font=("Segoe UI", 9),
-            bg="#fef3c7",
-            fg="#92400e",
-            padx=8,
-            pady=3,
-            relief="flat"
-        )
-        file_data["status_label"].pack(side="left", padx=10)
-
-        # Кнопка видалення
-        delete_btn = tk.Button(
-            top_row,
-            text="❌",
-            command=lambda: self.remove_file(file_data),
-            font=("Segoe UI", 10),
-            bg="#fee2e2",
-            fg="#991b1b",
-            relief="flat",
-            cursor="hand2",
-            padx=8,
-            pady=2
-        )
-        delete_btn.pack(side="left", padx=5)
-
-        # Прогрес бар
-        file_data["progress_bar"] = ttk.Progressbar(
-            frame,
-            length=860,
-            mode="determinate"
-        )
+    def insert_rows(self, rows, generation, start=0):
+        """Додає рядки в Treeview пакетами по ROW_BATCH, повертаючи керування циклу подій між ними"""
+        if generation != self.rows_generation:
+            return
+        for file_data in rows[start:start + ROW_BATCH]:
+            file_data["item"] = self.tree.insert(
+                "", "end",
+                text=f"{self.get_icon(file_data['type'])} {file_data['name']}",
+                values=self.row_values(file_data),
+                tags=(STATUS_STYLES[file_data["status"]][1],)
+            )
+        if start + ROW_BATCH < len(rows):
+            self.root.after(1, self.insert_rows, rows, generation, start + ROW_BATCH)
+
+    def row_values(self, file_data):
+        status = file_data["status"]
+        status_text = STATUS_STYLES[status][0]
+        progress = file_data["progress"]
+        progress_text = ""
+        if status == "converting":
+            if 0 < progress < 100:
+                status_text = f"🔄 {progress:.0f}%"
+                if file_data["eta"] is not None:
+                    minutes, seconds = divmod(int(file_data["eta"]), 60)
+                    status_text += f" · ~{minutes}:{seconds:02d}"
+            filled = int(progress / 100 * PROGRESS_BAR_WIDTH)
+            progress_text = "█" * filled + "░" * (PROGRESS_BAR_WIDTH - filled) + f" {progress:.0f}%"
+        elif status in ("completed", "cached"):
+            progress_text = "█" * PROGRESS_BAR_WIDTH + " 100%"
+        return (file_data["type"].upper(), file_data["size"], file_data["format"], status_text, progress_text)
+
+    def refresh_row(self, file_data):
+        item = file_data.get("item")
+        if item is not None:
+            self.tree.item(item, values=self.row_values(file_data), tags=(STATUS_STYLES[file_data["status"]][1],))
+
+    def selected_files(self):
+        selected = set(self.tree.selection())
+        return [file_data for file_data in self.files_data if file_data.get("item") in selected]
+
+    def apply_type_format(self, file_type):
+        """Ставить формат типу всім вибраним файлам цього типу, а якщо таких немає - усім файлам типу"""
+        output_format = self.type_formats[file_type].get()
+        targets = [file_data for file_data in self.selected_files() if file_data["type"] == file_type]
+        if not targets:
+            targets = [file_data for file_data in self.files_data if file_data["type"] == file_type]
+        for file_data in targets:
+            file_data["format"] = output_format
+            self.refresh_row(file_data)
+
+    def show_format_menu(self, event):
+        """Меню форматів для рядка під курсором; вибір застосовується до всіх вибраних рядків цього типу"""
+        item = self.tree.identify_row(event.y)
+        if not item:
+            return
+        if item not in self.tree.selection():
+            self.tree.selection_set(item)
+        file_type = next(file_data["type"] for file_data in self.files_data if file_data.get("item") == item)
+
+        menu = tk.Menu(self.root, tearoff=0)
+        for output_format in self.formats[file_type]:
+            menu.add_command(label=output_format,
+                             command=lambda f=output_format: self.set_selected_format(file_type, f))
+        menu.tk_popup(event.x_root, event.y_root)
+
+    def set_selected_format(self, file_type, output_format):
+        for file_data in self.selected_files():
+            if file_data["type"] == file_type:
+                file_data["format"] = output_format
+                self.refresh_row(file_data)
+
+    def remove_selected(self):
+        selected = self.selected_files()
+        # Під час конвертації Delete скасовує завдання вибраних файлів, а не прибирає рядки
+        if self.scheduler is not None:
+            for file_data in selected:
+                if "job_id" in file_data and file_data["status"] in ("queued", "converting"):
+                    self.scheduler.cancel(file_data["job_id"])
+            return
 
-    def remove_file(self, file_data):
-        file_data["widget"].destroy()
-        self.files_data.remove(file_data)
+        if not selected:
+            return
+        removed = {id(file_data) for file_data in selected}
+        self.tree.delete(*[file_data["item"] for file_data in selected])
+        self.files_data = [file_data for file_data in self.files_data if id(file_data) not in removed]
+        self.update_file_count()
 
+    def update_file_count(self):
         if not self.files_data:
             self.convert_btn.config(state="disabled")
             self.status_var.set("Готовий до роботи")
@@ -358,13 +509,12 @@ class MediaConverterGUI:
             self.status_var.set(f"Залишилось {len(self.files_data)} файл(ів)")
 
     def clear_all(self):
-        if not self.files_data:
+        if not self.files_data or self.scheduler is not None:
             return
 
         if messagebox.askyesno("Підтвердження", "Видалити всі файли зі списку?"):
-            for file_data in self.files_data[:]:
-                file_data["widget"].destroy()
-
+            self.rows_generation += 1
+            self.tree.delete(*self.tree.get_children())
             self.files_data.clear()
             self.convert_btn.config(state="disabled")
             self.status_var.set("Готовий до роботи")
@@ -380,97 +530,129 @@ class MediaConverterGUI:
             os.makedirs(output_dir)
 
         self.convert_btn.config(state="disabled")
+        self.cancel_btn.config(state="normal")
         self.status_var.set("🔄 Конвертація...")
 
+        try:
+            max_jobs = self.max_jobs.get()
+            max_video_jobs = self.max_video_jobs.get()
+        except tk.TclError:
+            max_jobs, max_video_jobs = DEFAULT_MAX_JOBS, DEFAULT_VIDEO_JOBS
+        cache_path = os.path.join(SCRIPT_DIR, CACHE_FILENAME) if self.use_cache.get() else None
+        self.scheduler = ConversionScheduler(self.progress_queue, max_jobs, max_video_jobs, cache_path)
+        self.cache_text = ""
+
+        image_options = {"profile": self.image_profile.get()}
+
         # Запуск конвертації в окремому потоці
-        thread = Thread(target=self.convert_files, args=(output_dir,))
+        thread = Thread(target=self.convert_files, args=(output_dir, image_options))
         thread.daemon = True
         thread.start()
 
-    def convert_files(self, output_dir):
-        total = len(self.files_data)
-
-        for idx, file_data in enumerate(self.files_data, 1):
-            self.progress_queue.put(("status", file_data, "converting", "🔄 Конвертація..."))
-
-            try:
-                output_format = file_data["format"].get().lower()
-                base_name = os.path.splitext(file_data["name"])[0]
-                output_path = os.path.join(output_dir, f"{base_name}.{output_format}")
-
-                # Конвертація
-                if file_data["type"] == "image":
-                    self.convert_image(file_data["path"], output_path, output_format)
-                elif file_data["type"] == "video":
-                    self.convert_video(file_data["path"], output_path, output_format)
-                elif file_data["type"] == "audio":
-                    self.convert_audio(file_data["path"], output_path, output_format)
-
-                self.progress_queue.put(("status", file_data, "completed", "✅ Готово"))
-                self.progress_queue.put(("progress", idx, total))
-
-            except Exception as e:
-                self.progress_queue.put(("status", file_data, "error", f"❌ Помилка"))
-                print(f"Помилка: {e}")
-
-        self.progress_queue.put(("done",))
-
-    def convert_image(self, src, output, format):
-        img = Image.open(src)
-        if format == "jpeg":
-            img = img.convert("RGB")
-        img.save(output)
-
-    def convert_video(self, src, output, format):
-        clip = VideoFileClip(src)
-        if format == "gif":
-            clip.write_gif(output, fps=10)
-        else:
-            clip.write_videofile(output, codec="libx264", audio_codec="aac", verbose=False, logger=None)
-        clip.close()
-
-    def convert_audio(self, src, output, format):
-        audio = AudioSegment.from_file(src)
-        audio.export(output, format=format)
+    @staticmethod
+    def unique_output(output_dir, name, output_format, used):
+        """
+        Шлях виходу, якого ще немає серед used. Завдання йдуть паралельно, тож a.png і a.jpg
+        не можуть писати в один a.webp: до назви додається розширення джерела, а далі номер
+        """
+        base_name, ext = os.path.splitext(name)
+        candidates = [base_name, f"{base_name}_{ext.lstrip('.')}"]
+        number = 2
+        while True:
+            for candidate in candidates:
+                output = os.path.join(output_dir, f"{candidate}.{output_format}")
+                # Без урахування регістру, як у файловій системі Windows
+                if output.lower() not in used:
+                    used.add(output.lower())
+                    return output
+            candidates = [f"{base_name}_{ext.lstrip('.')}_{number}"]
+            number += 1
+
+    def convert_files(self, output_dir, image_options):
+        jobs = []
+        used_outputs = set()
+        for file_data in self.files_data:
+            file_data["job_id"] = len(jobs)
+            output_format = file_data["format"].lower()
+            jobs.append({
+                "src": file_data["path"],
+                "output": self.unique_output(output_dir, file_data["name"], output_format, used_outputs),
+                "type": file_data["type"],
+                "format": output_format,
+                "options": image_options if file_data["type"] == "image" else None,
+                "ref": file_data
+            })
+
+        self.scheduler.run(jobs)
+
+    def cancel_conversion(self):
+        if self.scheduler is not None:
+            self.scheduler.cancel_all()
+            self.status_var.set("⏹ Скасування...")
 
     def check_progress_queue(self):
+        """Забирає всі події з черги, а потім оновлює кожен змінений рядок один раз"""
+        dirty = {}
+        status_text = None
+        finished = False
         try:
             while True:
                 msg = self.progress_queue.get_nowait()
 
                 if msg[0] == "status":
-                    _, file_data, status, text = msg
+                    _, file_data, status, _text = msg
                     file_data["status"] = status
-                    file_data["status_label"].config(text=text)
-
                     if status == "converting":
-                        file_data["status_label"].config(bg="#dbeafe", fg="#1e40af")
-                        file_data["progress_bar"].pack(fill="x", padx=10, pady=(0, 10))
-                        file_data["progress_bar"].start(10)
-                    elif status == "completed":
-                        file_data["status_label"].config(bg="#dcfce7", fg="#166534")
-                        file_data["progress_bar"].stop()
-                        file_data["progress_bar"]["value"] = 100
-                    elif status == "error":
-                        file_data["status_label"].config(bg="#fee2e2", fg="#991b1b")
-                        file_data["progress_bar"].stop()
+                        file_data["progress"] = 0
+                        file_data["eta"] = None
+                    elif status in ("completed", "cached"):
+                        file_data["progress"] = 100
+                    dirty[id(file_data)] = file_data
+
+                elif msg[0] == "job_progress":
+                    _, file_data, percent, eta = msg
+                    file_data["progress"] = percent
+                    file_data["eta"] = eta
+                    dirty[id(file_data)] = file_data
 
                 elif msg[0] == "progress":
                     _, current, total = msg
-                    self.status_var.set(f"🔄 Конвертовано {current} з {total}")
+                    status_text = f"🔄 Конвертовано {current} з {total}"
+
+                elif msg[0] == "cache":
+                    _, hits, misses = msg
+                    self.cache_text = f" | ♻️ Кеш: {hits} влучань, {misses} промахів"
 
                 elif msg[0] == "done":
-                    self.convert_btn.config(state="normal")
-                    self.status_var.set("✅ Конвертація завершена!")
-                    messagebox.showinfo("Готово", "Всі файли успішно конвертовано!")
+                    finished = True
 
         except queue.Empty:
             pass
 
-        self.root.after(100, self.check_progress_queue)
+        for file_data in dirty.values():
+            self.refresh_row(file_data)
+        if status_text is not None:
+            self.status_var.set(status_text + self.cache_text)
+        if finished:
+            self.finish_conversion()
+
+        self.root.after(PROGRESS_POLL_MS, self.check_progress_queue)
+
+    def finish_conversion(self):
+        self.scheduler = None
+        self.convert_btn.config(state="normal")
+        self.cancel_btn.config(state="disabled")
+        failed = sum(1 for file_data in self.files_data if file_data["status"] in ("error", "cancelled"))
+        self.status_var.set(f"✅ Конвертація завершена!{self.cache_text}")
+        if failed:
+            messagebox.showwarning("Готово", f"Конвертацію завершено, не конвертовано файлів: {failed}")
+        else:
+            messagebox.showinfo("Готово", "Всі файли успішно конвертовано!")
 
 
 if __name__ == "__main__":
+    # Потрібно для пулу процесів у зібраному PyInstaller exe
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = MediaConverterGUI(root)
     root.mainloop()
\ No newline at end of file
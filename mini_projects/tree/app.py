@@ -99,18 +99,15 @@ class App(tk.Tk):
             'excluded_folders': excluded_raw,
         })
 
-        # 1. Генеруємо дерево для ВІДОБРАЖЕННЯ і рахуємо ВІДОБРАЖЕНІ папки/файли
-        # Передаємо лише об'єкт конфігурації
+        # 1. Генеруємо дерево для ВІДОБРАЖЕННЯ, рахуємо ВІДОБРАЖЕНІ папки/файли
+        # і розмір за той самий прохід (без окремого обходу диска)
         output_lines, display_stats = generate_tree(path, self.config_obj)
 
-        # 2. Розраховуємо ПОВНИЙ розмір папки окремо
-        total_size = calculate_total_size(path)
-
-        # 3. Формуємо фінальну статистику
+        # 2. Формуємо фінальну статистику
         final_stats = {
             'folders': display_stats.get('folders', 0),  # Кількість з generate_tree
             'files': display_stats.get('files', 0),  # Кількість з generate_tree
-            'size': total_size  # Повний розмір з calculate_total_size
+            'size': display_stats.get('size', 0)  # Розмір усіх файлів у пройдених папках
         }
 
         # Виводимо дерево в консоль з розфарбуванням
@@ -188,15 +185,16 @@ def is_hidden(filepath):
     return False
 
 
-# --- Функція generate_tree тепер НЕ РАХУЄ РОЗМІР ---
-def generate_tree(root_path, config_obj, prefix='', depth=0, stats=None):
+def generate_tree(root_path, config_obj, prefix='', depth=0, stats=None, count_size=True):
     """
-    Генерує дерево файлів та папок для ВІДОБРАЖЕННЯ та рахує КІЛЬКІСТЬ
-    відображених елементів. НЕ РАХУЄ загальний розмір.
+    Генерує дерево файлів та папок для ВІДОБРАЖЕННЯ, рахує КІЛЬКІСТЬ
+    відображених елементів і загальний розмір файлів за той самий прохід.
+    Вміст ігнорованих папок не обходиться, тому до розміру не входить.
+    count_size=False - папка відкрита через символічне посилання: вона показується,
+    але її файли до розміру не додаються, щоб не рахувати чужий або той самий вміст двічі
     """
-    # Ініціалізуємо статистику ЛИШЕ для кількості
     if stats is None:
-        stats = {'folders': 0, 'files': 0}  # Розмір тут не рахуємо!
+        stats = {'folders': 0, 'files': 0, 'size': 0}
 
     if config_obj.config['max_depth'] > 0 and depth >= config_obj.config['max_depth']:
         return [], stats
@@ -220,6 +218,10 @@ def generate_tree(root_path, config_obj, prefix='', depth=0, stats=None):
             is_dir = stat.S_ISDIR(entry_stat.st_mode)
             is_link = stat.S_ISLNK(entry_stat.st_mode)
 
+            # Розмір беремо з уже отриманого lstat, включно з прихованими файлами
+            if count_size and stat.S_ISREG(entry_stat.st_mode):
+                stats['size'] += entry_stat.st_size
+
             # Якщо це символічне посилання на директорію, вважаємо її директорією для відображення
             # Але повний шлях нам потрібен для рекурсії
             if is_link:
@@ -240,8 +242,8 @@ def generate_tree(root_path, config_obj, prefix='', depth=0, stats=None):
             items_to_process.append({
                 'name': entry_name,
                 'path': entry_path,  # Використовуємо оригінальний шлях для подальшої обробки
-                'is_dir': is_dir
-                # Розмір тут більше не потрібен
+                'is_dir': is_dir,
+                'is_link': is_link
             })
         except OSError:
             continue
@@ -268,7 +270,8 @@ def generate_tree(root_path, config_obj, prefix='', depth=0, stats=None):
                 output_lines.append(ignore_line)
             else:
                 # Рекурсія лише для неігнорованих папок
-                sub_lines, stats = generate_tree(folder_path, config_obj, next_level_prefix, depth + 1, stats)
+                sub_lines, stats = generate_tree(folder_path, config_obj, next_level_prefix, depth + 1, stats,
+                                                 count_size and not item['is_link'])
                 output_lines.extend(sub_lines)
         else:  # Це файл або посилання, яке не є директорією
             file_name = item['name']
@@ -276,40 +279,10 @@ def generate_tree(root_path, config_obj, prefix='', depth=0, stats=None):
             file_line = current_prefix + icon + file_name
             output_lines.append(file_line)
             stats['files'] += 1  # Рахуємо файл (для відображення)
-            # Розмір файлу тут не додаємо!
 
     return output_lines, stats
 
 
-# --- Повертаємо окрему функцію для РОЗРАХУНКУ ПОВНОГО РОЗМІРУ ---
-def calculate_total_size(root_path):
-    """
-    Розраховує повний розмір папки та її вмісту, рекурсивно.
-    Ігнорує помилки доступу до окремих файлів.
-    """
-    total_size = 0
-    try:
-        # Використовуємо os.scandir для потенційно кращої продуктивності
-        for entry in os.scandir(root_path):
-            try:
-                if entry.is_dir(follow_symlinks=False):
-                    # Рекурсивно викликаємо для підпапок
-                    total_size += calculate_total_size(entry.path)
-                elif entry.is_file(follow_symlinks=False):
-                    # Додаємо розмір файлу
-                    total_size += entry.stat(follow_symlinks=False).st_size
-            except OSError:
-                # Ігноруємо помилки доступу до окремих елементів (файли, папки)
-                # Це може бути через права доступу або якщо файл зник
-                # print(f"Warning: Cannot access '{entry.path}', skipping size calculation.")
-                continue  # Переходимо до наступного елемента
-    except OSError as e:
-        # Помилка доступу до самої root_path папки
-        return 0  # Повертаємо -1 або інший індикатор помилки
-
-    return total_size
-
-
 if __name__ == "__main__":
     config = TreeConfig()
     app = App(config)
@@ -1,107 +1,168 @@
 import os
-import stat
 import sys
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
+from tkinter import font as tkfont
 import json
 import datetime
 import webbrowser
 from pathlib import Path
 import mimetypes
 import subprocess
+import threading
+import queue
+import sqlite3
+import argparse
+import heapq
+import io
 
 from colorama import init, Fore, Style
 
-init(autoreset=True)
-SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-
-
-class TreeConfig:
-    def __init__(self):
-        self.config = {
-            'excluded_folders': [".git", "__pycache__", "venv", ".idea", "node_modules", "bin", "obj"],
-            'excluded_extensions': ['.tmp', '.log', '.cache'],
-            'max_depth': 0,
-            'show_files': True,
-            'show_hidden': True,
-            'file_icons': True,
-            'show_sizes': True,
-            'show_dates': True,
-            'show_permissions': False,
-            'group_by_type': False,
-            'last_path': SCRIPT_DIR,
-            'output_format': 'tree'  # 'tree', 'json', 'csv'
-        }
-
-    def save_config(self):
-        """Зберігає конфігурацію у файл"""
-        config_path = os.path.join(SCRIPT_DIR, "scanner_config.json")
-        try:
-            with open(config_path, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=2, ensure_ascii=False)
-        except Exception:
-            pass
-
-    def load_config(self):
-        """Завантажує конфігурацію з файлу"""
-        config_path = os.path.join(SCRIPT_DIR, "scanner_config.json")
-        try:
-            if os.path.exists(config_path):
-                with open(config_path, 'r', encoding='utf-8') as f:
-                    loaded_config = json.load(f)
-                    self.config.update(loaded_config)
-        except Exception:
-            pass
-
-
-# Визначаємо SCRIPT_DIR коректно для .exe
-if getattr(sys, 'frozen', False):
-    SCRIPT_DIR = os.path.dirname(sys.executable)
-else:
-    SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+from tree_config import TreeConfig, SCRIPT_DIR
+from file_types import FileTypeAnalyzer
+from scan_engine import ScanEngine, human_readable_size, format_tree_line, iter_tree_lines, tree_header_lines
+from scan_index import ScanIndex
+from duplicate_finder import DuplicateFinder
+from tree_export import write_csv
+from folder_compare import FolderComparer
 
+init(autoreset=True)
 
-class FileTypeAnalyzer:
-    """Аналізатор типів файлів для кращої категоризації"""
+# Потоковий режим: розмір пакета елементів, ліміт черги (у пакетах) та інтервали GUI
+STREAM_BATCH_SIZE = 500
+STREAM_QUEUE_BATCHES = 64
+STREAM_POLL_MS = 50
+FILTER_DELAY_MS = 150
+# Скільки груп дублікатів показувати у вкладці аналітики
+MAX_DUPLICATE_GROUPS = 500
+# Скільки шляхів кожної категорії показувати в результаті порівняння папок
+MAX_COMPARISON_PATHS = 50
 
-    @staticmethod
-    def get_file_category(filepath):
-        """Визначає категорію файлу за розширенням"""
-        ext = os.path.splitext(filepath)[1].lower()
-
-        categories = {
-            'code': ['.py', '.js', '.html', '.css', '.cpp', '.c', '.java', '.php', '.rb', '.go', '.rs', '.ts'],
-            'image': ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.svg', '.webp', '.ico'],
-            'video': ['.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.webm'],
-            'audio': ['.mp3', '.wav', '.flac', '.aac', '.ogg', '.m4a'],
-            'document': ['.pdf', '.doc', '.docx', '.txt', '.md', '.rtf', '.odt'],
-            'archive': ['.zip', '.rar', '.7z', '.tar', '.gz', '.bz2'],
-            'data': ['.json', '.xml', '.csv', '.xlsx', '.db', '.sql']
-        }
 
-        for category, extensions in categories.items():
-            if ext in extensions:
-                return category
-        return 'other'
-
-    @staticmethod
-    def get_file_icon(filepath, is_dir=False):
-        """Повертає відповідну іконку для файлу або папки"""
-        if is_dir:
-            return "📁"
+class VirtualResultsView(ttk.Frame):
+    """
+    Віртуалізований перегляд результатів: у Text потрапляють лише видимі рядки.
+    Рядки зберігаються у пам'яті (рядки тексту або елементи сканування),
+    а пошук працює по індексу ключів, а не по вмісту віджета.
+    """
 
-        category = FileTypeAnalyzer.get_file_category(filepath)
-        icons = {
-            'code': '💻',
-            'image': '🖼️',
-            'video': '🎬',
-            'audio': '🎵',
-            'document': '📄',
-            'archive': '📦',
-            'data': '📊',
-            'other': '📄'
-        }
-        return icons.get(category, '📄')
+    def __init__(self, parent, font=("Consolas", 10)):
+        super().__init__(parent)
+        self.text = tk.Text(self, wrap='none', font=font, height=25)
+        self.scrollbar = ttk.Scrollbar(self, orient='vertical', command=self.yview)
+        self.scrollbar.pack(side='right', fill='y')
+        self.text.pack(side='left', fill='both', expand=True)
+        self.line_height = max(1, tkfont.Font(font=font).metrics('linespace'))
+
+        self.rows = []
+        self.keys = []
+        self.formatter = str
+        self.key_func = str.lower
+        self.visible = None  # Індекси рядків після фільтрації (None = всі рядки)
+        self.filter_term = ''
+        self.top = 0
+        self._render_job = None
+
+        self.text.bind('<Configure>', lambda e: self.render())
+        self.text.bind('<MouseWheel>', self._on_mousewheel)
+        self.text.bind('<Button-4>', lambda e: self.scroll(-3))
+        self.text.bind('<Button-5>', lambda e: self.scroll(3))
+        self.text.bind('<Prior>', lambda e: self.scroll(-self.page_size()))
+        self.text.bind('<Next>', lambda e: self.scroll(self.page_size()))
+
+    def set_rows(self, rows, formatter=str, key_func=str.lower):
+        """Замінює всі рядки перегляду"""
+        self.rows = list(rows)
+        self.formatter = formatter
+        self.key_func = key_func
+        self.keys = [key_func(row) for row in self.rows]
+        self.visible = None
+        self.filter_term = ''
+        self.top = 0
+        self.render()
+
+    def append_rows(self, rows):
+        """Додає рядки в кінець (потоковий режим), перемальовка відкладається"""
+        start = len(self.rows)
+        new_keys = [self.key_func(row) for row in rows]
+        self.rows.extend(rows)
+        self.keys.extend(new_keys)
+        if self.visible is not None:
+            self.visible.extend(start + i for i, key in enumerate(new_keys) if self.filter_term in key)
+        self.schedule_render()
+
+    def filter(self, term):
+        """Фільтрує рядки за підрядком, звужуючи попередній результат якщо можливо"""
+        term = term.lower()
+        if not term:
+            self.visible = None
+        elif self.visible is not None and term.startswith(self.filter_term):
+            self.visible = [i for i in self.visible if term in self.keys[i]]
+        else:
+            self.visible = [i for i, key in enumerate(self.keys) if term in key]
+        self.filter_term = term
+        self.top = 0
+        self.render()
+
+    def row_count(self):
+        return len(self.visible) if self.visible is not None else len(self.rows)
+
+    def page_size(self):
+        return max(1, self.text.winfo_height() // self.line_height)
+
+    def get_row(self, position):
+        """Повертає рядок за позицією у відфільтрованому списку"""
+        if position < 0 or position >= self.row_count():
+            return None
+        return self.rows[self.visible[position] if self.visible is not None else position]
+
+    def current_row(self):
+        """Повертає рядок, на якому стоїть курсор"""
+        line = int(self.text.index(tk.INSERT).split('.')[0]) - 1
+        return self.get_row(self.top + line)
+
+    def yview(self, *args):
+        """Обробляє команди скролбару"""
+        if args[0] == 'moveto':
+            self.top = int(float(args[1]) * self.row_count())
+        elif args[0] == 'scroll':
+            step = self.page_size() if args[2] == 'pages' else 1
+            self.top += int(args[1]) * step
+        self.render()
+
+    def scroll(self, delta):
+        self.top += delta
+        self.render()
+        return 'break'
+
+    def _on_mousewheel(self, event):
+        return self.scroll(-3 if event.delta > 0 else 3)
+
+    def schedule_render(self):
+        if self._render_job is None:
+            self._render_job = self.after(STREAM_POLL_MS, self._flush_render)
+
+    def _flush_render(self):
+        self._render_job = None
+        self.render()
+
+    def render(self):
+        """Перемальовує лише видиму сторінку рядків"""
+        count = self.row_count()
+        page = self.page_size()
+        self.top = max(0, min(self.top, count - page))
+        end = min(count, self.top + page)
+
+        lines = [self.formatter(self.get_row(position)) for position in range(self.top, end)]
+        cursor = self.text.index(tk.INSERT)
+        self.text.delete('1.0', tk.END)
+        self.text.insert('1.0', '\n'.join(lines))
+        self.text.mark_set(tk.INSERT, cursor)
+
+        if count:
+            self.scrollbar.set(self.top / count, end / count)
+        else:
+            self.scrollbar.set(0, 1)
 
 
 class App(tk.Tk):
@@ -121,6 +182,15 @@ class App(tk.Tk):
         self.scan_results = None
         self.file_paths = {}  # Словник для швидкого пошуку шляхів
 
+        # Потокове сканування
+        self.scan_thread = None
+        self.scan_queue = None
+        self.scan_cancel = threading.Event()
+        self.scan_error = None
+        self._filter_job = None
+        self.duplicates_state = None
+        self.comparison_state = None
+
         self.create_widgets()
         self.create_menu()
 
@@ -145,6 +215,7 @@ class App(tk.Tk):
         tools_menu.add_command(label="Знайти дублікати файлів", command=self.find_duplicates)
         tools_menu.add_command(label="Аналіз розмірів файлів", command=self.analyze_file_sizes)
         tools_menu.add_command(label="Статистика типів файлів", command=self.file_type_statistics)
+        tools_menu.add_command(label="Найважчі папки", command=self.show_heaviest_folders)
 
     def choose_directory(self):
         path = filedialog.askdirectory(initialdir=self.config_obj.config.get('last_path', SCRIPT_DIR))
@@ -197,6 +268,14 @@ class App(tk.Tk):
         self.depth_spin.pack(side='right')
         self.depth_spin.insert(0, str(self.config_obj.config['max_depth']))
 
+        # Потоки сканування
+        workers_frame = ttk.Frame(main_options)
+        workers_frame.pack(fill='x', **padding)
+        ttk.Label(workers_frame, text="Потоків сканування (1 = послідовно):").pack(side='left')
+        self.workers_spin = ttk.Spinbox(workers_frame, from_=1, to=64, width=5)
+        self.workers_spin.pack(side='right')
+        self.workers_spin.insert(0, str(self.config_obj.config['scan_workers']))
+
         # Чекбокси
         self.hidden_var = tk.BooleanVar(value=self.config_obj.config['show_hidden'])
         ttk.Checkbutton(main_options, text="🔍 Показувати приховані файли/папки", variable=self.hidden_var).pack(
@@ -224,6 +303,10 @@ class App(tk.Tk):
         ttk.Checkbutton(main_options, text="🗂️ Групувати файли за типом", variable=self.group_by_type_var).pack(
             anchor='w', **padding)
 
+        self.streaming_var = tk.BooleanVar(value=self.config_obj.config['streaming_mode'])
+        ttk.Checkbutton(main_options, text="⚡ Потоковий режим (показувати результати під час сканування)",
+                        variable=self.streaming_var).pack(anchor='w', **padding)
+
         # Виключення
         exclusions_frame = ttk.LabelFrame(settings_frame, text="🚫 Виключення")
         exclusions_frame.pack(fill='x', **padding)
@@ -244,11 +327,22 @@ class App(tk.Tk):
         ttk.Radiobutton(format_frame, text="📊 JSON", variable=self.format_var, value='json').pack(anchor='w', **padding)
         ttk.Radiobutton(format_frame, text="📈 CSV", variable=self.format_var, value='csv').pack(anchor='w', **padding)
 
+        # Режим сканування
+        mode_frame = ttk.LabelFrame(settings_frame, text="🗃️ Режим сканування")
+        mode_frame.pack(fill='x', **padding)
+
+        self.scan_mode_var = tk.StringVar(value=self.config_obj.config['scan_mode'])
+        ttk.Radiobutton(mode_frame, text="🔁 Повне (перечитує все та оновлює індекс)", variable=self.scan_mode_var,
+                        value='full').pack(anchor='w', **padding)
+        ttk.Radiobutton(mode_frame, text="⚡ Інкрементальне (пропускає папки з незміненою датою)",
+                        variable=self.scan_mode_var, value='incremental').pack(anchor='w', **padding)
+
         # Кнопки дій
         buttons_frame = ttk.Frame(settings_frame)
         buttons_frame.pack(fill='x', pady=10)
 
         ttk.Button(buttons_frame, text="🔍 Сканувати", command=self.run_scan).pack(side='left', padx=5)
+        ttk.Button(buttons_frame, text="⏹ Зупинити", command=self.stop_scan).pack(side='left', padx=5)
         ttk.Button(buttons_frame, text="💾 Зберегти налаштування", command=self.save_settings).pack(side='left', padx=5)
         ttk.Button(buttons_frame, text="🔄 Скинути налаштування", command=self.reset_settings).pack(side='left', padx=5)
 
@@ -274,9 +368,9 @@ class App(tk.Tk):
         ttk.Button(search_frame, text="🗂️ Відкрити папку", command=self.open_selected_folder).pack(side='right', padx=5)
         ttk.Button(search_frame, text="📄 Відкрити файл", command=self.open_selected_file).pack(side='right', padx=5)
 
-        # Текстове поле з прокруткою для результатів
-        self.results_text = scrolledtext.ScrolledText(results_frame, height=25, font=("Consolas", 10))
-        self.results_text.pack(fill='both', expand=True, padx=5, pady=5)
+        # Віртуалізований перегляд результатів (малює лише видимі рядки)
+        self.results_view = VirtualResultsView(results_frame, font=("Consolas", 10))
+        self.results_view.pack(fill='both', expand=True, padx=5, pady=5)
 
         # Контекстне меню для результатів
         self.context_menu = tk.Menu(self, tearoff=0)
@@ -284,7 +378,7 @@ class App(tk.Tk):
         self.context_menu.add_command(label="📂 Відкрити в провіднику", command=self.open_in_explorer_context)
         self.context_menu.add_command(label="📄 Відкрити файл", command=self.open_file_context)
 
-        self.results_text.bind("<Button-3>", self.show_context_menu)
+        self.results_view.text.bind("<Button-3>", self.show_context_menu)
 
     def create_analytics_tab(self):
         """Створює вкладку з аналітикою"""
@@ -299,6 +393,8 @@ class App(tk.Tk):
                                                                                                             padx=5)
         ttk.Button(analytics_buttons, text="🗂️ Типи файлів", command=self.show_file_types).pack(side='left', padx=5)
         ttk.Button(analytics_buttons, text="📅 Останні зміни", command=self.show_recent_files).pack(side='left', padx=5)
+        ttk.Button(analytics_buttons, text="🏋️ Найважчі папки", command=self.show_heaviest_folders).pack(side='left',
+                                                                                                        padx=5)
 
         # Текстове поле для аналітики
         self.analytics_text = scrolledtext.ScrolledText(analytics_frame, height=25, font=("Consolas", 10))
@@ -323,6 +419,8 @@ class App(tk.Tk):
         self.excluded_ext_var.set(",".join(self.config_obj.config['excluded_extensions']))
         self.depth_spin.delete(0, tk.END)
         self.depth_spin.insert(0, str(self.config_obj.config['max_depth']))
+        self.workers_spin.delete(0, tk.END)
+        self.workers_spin.insert(0, str(self.config_obj.config['scan_workers']))
 
         # Оновлюємо чекбокси
         self.hidden_var.set(self.config_obj.config['show_hidden'])
@@ -332,12 +430,15 @@ class App(tk.Tk):
         self.dates_var.set(self.config_obj.config['show_dates'])
         self.permissions_var.set(self.config_obj.config['show_permissions'])
         self.group_by_type_var.set(self.config_obj.config['group_by_type'])
+        self.streaming_var.set(self.config_obj.config['streaming_mode'])
         self.format_var.set(self.config_obj.config['output_format'])
+        self.scan_mode_var.set(self.config_obj.config['scan_mode'])
 
     def update_config(self):
         """Оновлює конфігурацію з GUI"""
         self.config_obj.config.update({
             'max_depth': int(self.depth_spin.get()),
+            'scan_workers': max(1, int(self.workers_spin.get())),
             'show_hidden': self.hidden_var.get(),
             'show_files': self.files_var.get(),
             'file_icons': self.icons_var.get(),
@@ -345,10 +446,12 @@ class App(tk.Tk):
             'show_dates': self.dates_var.get(),
             'show_permissions': self.permissions_var.get(),
             'group_by_type': self.group_by_type_var.get(),
+            'streaming_mode': self.streaming_var.get(),
             'last_path': self.path_var.get(),
             'excluded_folders': [x.strip().lower() for x in self.excluded_var.get().split(',') if x.strip()],
             'excluded_extensions': [x.strip().lower() for x in self.excluded_ext_var.get().split(',') if x.strip()],
             'output_format': self.format_var.get(),
+            'scan_mode': self.scan_mode_var.get(),
         })
 
     def open_in_explorer(self):
@@ -359,19 +462,15 @@ class App(tk.Tk):
 
     def open_selected_folder(self):
         """Відкриває вибрану в результатах папку"""
-        current_line = self.get_current_line()
-        if current_line:
-            path = self.extract_path_from_line(current_line)
-            if path and os.path.isdir(path):
-                self.open_path_in_system(path)
+        path = self.get_selected_path()
+        if path and os.path.isdir(path):
+            self.open_path_in_system(path)
 
     def open_selected_file(self):
         """Відкриває вибраний файл"""
-        current_line = self.get_current_line()
-        if current_line:
-            path = self.extract_path_from_line(current_line)
-            if path and os.path.isfile(path):
-                self.open_path_in_system(path)
+        path = self.get_selected_path()
+        if path and os.path.isfile(path):
+            self.open_path_in_system(path)
 
     @staticmethod
     def open_path_in_system(path):
@@ -387,14 +486,18 @@ class App(tk.Tk):
             messagebox.showerror("Помилка", f"Не вдалося відкрити: {e}")
 
     def get_current_line(self):
-        """Отримує поточний рядок з текстового поля"""
-        try:
-            current_pos = self.results_text.index(tk.INSERT)
-            line_start = self.results_text.index(f"{current_pos} linestart")
-            line_end = self.results_text.index(f"{current_pos} lineend")
-            return self.results_text.get(line_start, line_end)
-        except:
-            return None
+        """Отримує поточний рядок з перегляду результатів"""
+        row = self.results_view.current_row()
+        return self._result_row_text(row) if row is not None else None
+
+    def get_selected_path(self):
+        """Повертає шлях вибраного в результатах елемента"""
+        row = self.results_view.current_row()
+        if isinstance(row, dict):
+            return row['path'] if row['type'] != 'error' else None
+        if row:
+            return self.extract_path_from_line(row)
+        return None
 
     def extract_path_from_line(self, line):
         """Витягує шлях з рядка результатів"""
@@ -413,13 +516,11 @@ class App(tk.Tk):
 
     def copy_path(self):
         """Копіює шлях до буфера обміну"""
-        current_line = self.get_current_line()
-        if current_line:
-            path = self.extract_path_from_line(current_line)
-            if path:
-                self.clipboard_clear()
-                self.clipboard_append(path)
-                messagebox.showinfo("Скопійовано", f"Шлях скопійовано:\n{path}")
+        path = self.get_selected_path()
+        if path:
+            self.clipboard_clear()
+            self.clipboard_append(path)
+            messagebox.showinfo("Скопійовано", f"Шлях скопійовано:\n{path}")
 
     def open_in_explorer_context(self):
         """Відкриває в провіднику через контекстне меню"""
@@ -430,23 +531,37 @@ class App(tk.Tk):
         self.open_selected_file()
 
     def filter_results(self, *args):
-        """Фільтрує результати за пошуковим запитом"""
-        if not hasattr(self, 'original_results'):
-            return
+        """Фільтрує результати за пошуковим запитом (з затримкою між натисканнями)"""
+        if self._filter_job is not None:
+            self.after_cancel(self._filter_job)
+        self._filter_job = self.after(FILTER_DELAY_MS, self._apply_filter)
 
-        search_term = self.search_var.get().lower()
-        if not search_term:
-            self.results_text.delete('1.0', tk.END)
-            self.results_text.insert('1.0', self.original_results)
-            return
+    def _apply_filter(self):
+        self._filter_job = None
+        self.results_view.filter(self.search_var.get())
 
-        filtered_lines = []
-        for line in self.original_results.split('\n'):
-            if search_term in line.lower():
-                filtered_lines.append(line)
+    def _result_row_text(self, row):
+        """Текст рядка перегляду: готовий рядок або елемент дерева"""
+        if isinstance(row, dict):
+            return self._format_tree_line(row)
+        return row
 
-        self.results_text.delete('1.0', tk.END)
-        self.results_text.insert('1.0', '\n'.join(filtered_lines))
+    @staticmethod
+    def _result_row_key(row):
+        """Ключ пошуку для рядка перегляду"""
+        if isinstance(row, dict):
+            return row['name'].lower()
+        return row.lower()
+
+    def display_results(self, output_content=None):
+        """Показує результати у віртуалізованому перегляді"""
+        if self.config_obj.config['output_format'] == 'tree' or output_content is None:
+            rows = tree_header_lines(self.scan_results) + self.scan_results['structure']
+        else:
+            rows = output_content.split('\n')
+        self.results_view.set_rows(rows, self._result_row_text, self._result_row_key)
+        if self.search_var.get():
+            self.results_view.filter(self.search_var.get())
 
     def run_scan(self):
         """Запускає сканування"""
@@ -455,11 +570,19 @@ class App(tk.Tk):
             messagebox.showerror("Помилка", "Вкажіть існуючу папку")
             return
 
+        if self.scan_thread is not None:
+            messagebox.showwarning("Попередження", "Сканування вже триває")
+            return
+
         self.update_config()
 
         # Очищуємо попередні результати
         self.file_paths.clear()
 
+        if self.config_obj.config['streaming_mode']:
+            self.start_streaming_scan(path)
+            return
+
         try:
             # Прогрес-бар
             progress_window = tk.Toplevel(self)
@@ -481,19 +604,10 @@ class App(tk.Tk):
             self.scan_results = self.perform_detailed_scan(path)
 
             # Генеруємо вивід
-            if self.config_obj.config['output_format'] == 'json':
-                output_content = self.generate_json_output()
-            elif self.config_obj.config['output_format'] == 'csv':
-                output_content = self.generate_csv_output()
-            else:
-                output_content = self.generate_tree_output()
-
-            # Зберігаємо оригінальні результати для фільтрації
-            self.original_results = output_content
+            output_content = self.generate_output()
 
             # Відображаємо результати
-            self.results_text.delete('1.0', tk.END)
-            self.results_text.insert('1.0', output_content)
+            self.display_results(output_content)
 
             # Переключаємося на вкладку результатів
             self.notebook.select(1)
@@ -511,254 +625,163 @@ class App(tk.Tk):
                 progress_window.destroy()
             messagebox.showerror("Помилка", f"Помилка під час сканування: {e}")
 
-    def perform_detailed_scan(self, root_path):
-        """Виконує детальне сканування з збиранням метаданих"""
-        results = {
-            'root_path': root_path,
-            'scan_time': datetime.datetime.now().isoformat(),
-            'structure': [],
-            'statistics': {
-                'total_folders': 0,
-                'total_files': 0,
-                'total_size': 0,
-                'file_types': {},
-                'largest_files': [],
-                'recent_files': []
-            }
-        }
-
-        self._scan_directory_recursive(root_path, results, '', 0)
-        self._calculate_statistics(results)
+    def generate_output(self):
+        """Генерує вивід у вибраному форматі"""
+        if self.config_obj.config['output_format'] == 'json':
+            return self.generate_json_output()
+        elif self.config_obj.config['output_format'] == 'csv':
+            return self.generate_csv_output()
+        return self.generate_tree_output()
+
+    def start_streaming_scan(self, root_path):
+        """Запускає сканування у фоновому потоці з поступовим показом результатів"""
+        self.scan_results = ScanEngine.new_results(root_path)
+        self.scan_queue = queue.Queue(maxsize=STREAM_QUEUE_BATCHES)
+        self.scan_cancel.clear()
+        self.scan_error = None
+
+        self.results_view.set_rows(tree_header_lines(self.scan_results), self._result_row_text, self._result_row_key)
+        if self.search_var.get():
+            self.results_view.filter(self.search_var.get())
+        self.notebook.select(1)
+
+        self.scan_thread = threading.Thread(
+            target=self._streaming_scan_worker,
+            args=(dict(self.config_obj.config), root_path, self.scan_results['statistics']),
+            daemon=True)
+        self.scan_thread.start()
+        self.after(STREAM_POLL_MS, self._drain_scan_queue)
+
+    def _streaming_scan_worker(self, config, root_path, statistics):
+        """Фоновий потік: передає елементи сканування пакетами через обмежену чергу"""
+        index = self._open_scan_index()
+        scan = self._create_engine(config, index).iter_scan(root_path, statistics)
+        batch = []
+        try:
+            for item in scan:
+                if self.scan_cancel.is_set():
+                    break
+                batch.append(item)
+                if len(batch) >= STREAM_BATCH_SIZE:
+                    # Блокується, якщо GUI не встигає, тож черга не росте без обмежень
+                    self.scan_queue.put(batch)
+                    batch = []
+            if batch:
+                self.scan_queue.put(batch)
+        except Exception as e:
+            self.scan_error = e
+        finally:
+            scan.close()
+            if index is not None:
+                index.close()
+            self.scan_queue.put(None)
+
+    def _drain_scan_queue(self):
+        """Забирає пакети з черги та додає їх до перегляду"""
+        structure = self.scan_results['structure']
+        while True:
+            try:
+                batch = self.scan_queue.get_nowait()
+            except queue.Empty:
+                break
+            if batch is None:
+                self._finish_streaming_scan()
+                return
 
-        return results
+            structure.extend(batch)
+            for item in batch:
+                if item['type'] != 'error':
+                    self.file_paths[item['path']] = item['name']
+            self.results_view.append_rows(batch)
 
-    def _scan_directory_recursive(self, dir_path, results, prefix, depth):
-        """Рекурсивно сканує директорію"""
-        if self.config_obj.config['max_depth'] > 0 and depth >= self.config_obj.config['max_depth']:
+        stats = self.scan_results['statistics']
+        self.stats_label.config(
+            text=f"⏳ Сканування... Папок: {stats['total_folders']} | Файлів: {stats['total_files']}")
+        self.after(STREAM_POLL_MS, self._drain_scan_queue)
+
+    def _finish_streaming_scan(self):
+        """Завершує потокове сканування: статистика, формат виводу, збереження"""
+        self.scan_thread = None
+        if self.scan_error:
+            messagebox.showerror("Помилка", f"Помилка під час сканування: {self.scan_error}")
             return
 
-        try:
-            entries = os.listdir(dir_path)
-        except OSError as e:
-            error_item = {
-                'name': f"[Помилка доступу: {e.strerror}]",
-                'path': dir_path,
-                'type': 'error',
-                'prefix': prefix,
-                'depth': depth
-            }
-            results['structure'].append(error_item)
-            return
+        self.update_statistics()
 
-        items_to_process = []
-        excluded_lower = self.config_obj.config['excluded_folders']
-        excluded_ext = self.config_obj.config['excluded_extensions']
+        if self.config_obj.config['output_format'] == 'tree':
+            output_content = iter_tree_lines(self.scan_results, self.config_obj.config, self._tree_icon)
+        else:
+            output_content = self.generate_output()
+            self.display_results(output_content)
 
-        for entry_name in entries:
-            entry_path = os.path.join(dir_path, entry_name)
+        self.save_results_to_file(output_content)
 
-            try:
-                entry_stat = os.lstat(entry_path)
-                is_dir = stat.S_ISDIR(entry_stat.st_mode)
-                is_link = stat.S_ISLNK(entry_stat.st_mode)
-
-                # Перевірки виключень
-                if not self.config_obj.config['show_hidden'] and is_hidden(entry_path):
-                    continue
-                if not is_dir and not self.config_obj.config['show_files']:
-                    continue
-                if not is_dir:
-                    ext = os.path.splitext(entry_name)[1].lower()
-                    if ext in excluded_ext:
-                        continue
-
-                # Збираємо метадані
-                file_info = {
-                    'name': entry_name,
-                    'path': entry_path,
-                    'type': 'directory' if is_dir else 'file',
-                    'is_link': is_link,
-                    'size': entry_stat.st_size if not is_dir else 0,
-                    'modified': datetime.datetime.fromtimestamp(entry_stat.st_mtime),
-                    'permissions': oct(entry_stat.st_mode)[-3:] if hasattr(entry_stat, 'st_mode') else '---',
-                    'prefix': prefix,
-                    'depth': depth
-                }
-
-                if not is_dir:
-                    file_info['category'] = FileTypeAnalyzer.get_file_category(entry_path)
-                    file_info['extension'] = os.path.splitext(entry_name)[1].lower()
-
-                items_to_process.append(file_info)
-
-            except OSError:
-                continue
+    def stop_scan(self):
+        """Зупиняє потокове сканування"""
+        self.scan_cancel.set()
 
-        # Сортуємо: спочатку папки, потім файли
-        items_to_process.sort(key=lambda x: (x['type'] != 'directory', x['name'].lower()))
+    def _open_scan_index(self):
+        """Відкриває індекс сканування; якщо не вдалося - сканування буде повним без індексу"""
+        try:
+            return ScanIndex(self.config_obj.get_index_path())
+        except sqlite3.Error:
+            return None
 
-        # Додаємо до результатів
-        for item in items_to_process:
-            results['structure'].append(item)
+    @staticmethod
+    def _create_engine(config, index=None):
+        """Створює рушій сканування для поточних налаштувань"""
+        return ScanEngine(config, FileTypeAnalyzer.get_classifier(), index=index,
+                          incremental=config['scan_mode'] == 'incremental')
 
-            # Зберігаємо шлях для швидкого пошуку
-            self.file_paths[item['path']] = item['name']
+    def perform_detailed_scan(self, root_path):
+        """Виконує детальне сканування з збиранням метаданих"""
+        index = self._open_scan_index()
+        try:
+            results = self._create_engine(self.config_obj.config, index).scan(root_path)
+        finally:
+            if index is not None:
+                index.close()
 
-            # Оновлюємо статистику
-            if item['type'] == 'directory':
-                results['statistics']['total_folders'] += 1
-            else:
-                results['statistics']['total_files'] += 1
-                results['statistics']['total_size'] += item['size']
-
-                # Додаємо до списку найбільших файлів
-                results['statistics']['largest_files'].append({
-                    'path': item['path'],
-                    'size': item['size'],
-                    'name': item['name']
-                })
-
-                # Додаємо до останніх файлів
-                results['statistics']['recent_files'].append({
-                    'path': item['path'],
-                    'modified': item['modified'],
-                    'name': item['name']
-                })
-
-            # Рекурсивно обробляємо папки
-            if item['type'] == 'directory' and item['name'].lower() not in excluded_lower:
-                count = len([x for x in items_to_process if x['type'] == item['type']])
-                current_index = [x for x in items_to_process if x['type'] == item['type']].index(item)
-                is_last = (current_index == count - 1)
-
-                next_prefix = item['prefix'] + ('    ' if is_last else '│   ')
-                self._scan_directory_recursive(item['path'], results, next_prefix, depth + 1)
-
-    def _calculate_statistics(self, results):
-        """Обчислює додаткову статистику"""
-        # Сортуємо найбільші файли
-        results['statistics']['largest_files'].sort(key=lambda x: x['size'], reverse=True)
-        results['statistics']['largest_files'] = results['statistics']['largest_files'][:50]  # Топ 50
-
-        # Сортуємо останні файли
-        results['statistics']['recent_files'].sort(key=lambda x: x['modified'], reverse=True)
-        results['statistics']['recent_files'] = results['statistics']['recent_files'][:50]  # Топ 50
-
-        # Підраховуємо типи файлів
-        file_types = {}
+        # Зберігаємо шляхи для швидкого пошуку
         for item in results['structure']:
-            if item['type'] == 'file':
-                category = item.get('category', 'other')
-                if category not in file_types:
-                    file_types[category] = {'count': 0, 'size': 0}
-                file_types[category]['count'] += 1
-                file_types[category]['size'] += item['size']
+            if item['type'] != 'error':
+                self.file_paths[item['path']] = item['name']
 
-        results['statistics']['file_types'] = file_types
+        return results
 
     def generate_tree_output(self):
         """Генерує вивід у форматі дерева"""
         if not self.scan_results:
             return "Немає результатів сканування"
 
-        lines = []
-        lines.append(f"📂 Структура папки: {self.scan_results['root_path']}")
-        lines.append(f"🕒 Час сканування: {self.scan_results['scan_time']}")
-        lines.append("")
-
-        current_prefix = ""
-        items_by_depth = {}
-
-        # Групуємо елементи за глибиною та префіксом
-        for item in self.scan_results['structure']:
-            depth = item['depth']
-            if depth not in items_by_depth:
-                items_by_depth[depth] = []
-            items_by_depth[depth].append(item)
-
-        # Обробляємо по рівнях
-        for depth in sorted(items_by_depth.keys()):
-            for item in items_by_depth[depth]:
-                line = self._format_tree_line(item)
-                lines.append(line)
-
-        return '\n'.join(lines)
+        return '\n'.join(iter_tree_lines(self.scan_results, self.config_obj.config, self._tree_icon))
 
     def _format_tree_line(self, item):
         """Форматує рядок для дерева"""
-        # Базовий префікс
-        line = item['prefix']
-
-        # Коннектор (останній елемент або ні)
-        siblings = [x for x in self.scan_results['structure']
-                    if x['depth'] == item['depth'] and x['prefix'] == item['prefix']]
-        is_last = siblings[-1] == item if siblings else True
-        connector = '└── ' if is_last else '├── '
-
-        line += connector
-
-        # Іконка
-        if self.config_obj.config['file_icons']:
-            if item['type'] == 'directory':
-                line += "📁 "
-            else:
-                line += FileTypeAnalyzer.get_file_icon(item['path']) + " "
-
-        # Ім'я
-        line += item['name']
+        return format_tree_line(item, self.config_obj.config, self._tree_icon)
 
-        # Додаткова інформація для файлів
-        if item['type'] == 'file':
-            details = []
-
-            if self.config_obj.config['show_sizes']:
-                details.append(f"({human_readable_size(item['size'])})")
-
-            if self.config_obj.config['show_dates']:
-                details.append(f"[{item['modified'].strftime('%Y-%m-%d %H:%M')}]")
-
-            if self.config_obj.config['show_permissions']:
-                details.append(f"<{item['permissions']}>")
-
-            if details:
-                line += " " + " ".join(details)
-
-        return line
+    @staticmethod
+    def _tree_icon(item):
+        """Повертає іконку для елемента дерева"""
+        if item['type'] == 'directory':
+            return "📁"
+        return FileTypeAnalyzer.get_file_icon(item['path'])
 
     def generate_json_output(self):
         """Генерує вивід у форматі JSON"""
         if not self.scan_results:
             return "Немає результатів сканування"
 
-        # Створюємо копію з серіалізованими датами
-        json_data = json.loads(json.dumps(self.scan_results, default=str, ensure_ascii=False))
-        return json.dumps(json_data, indent=2, ensure_ascii=False)
+        return json.dumps(self.scan_results, default=str, indent=2, ensure_ascii=False)
 
     def generate_csv_output(self):
         """Генерує вивід у форматі CSV"""
         if not self.scan_results:
             return "Немає результатів сканування"
 
-        lines = []
-        lines.append("Тип,Ім'я,Шлях,Розмір (байти),Розмір (читабельний),Дата модифікації,Права доступу,Категорія")
-
-        for item in self.scan_results['structure']:
-            if item['type'] == 'error':
-                continue
-
-            row = [
-                item['type'],
-                f'"{item["name"]}"',  # Беремо в лапки на випадок ком у назві
-                f'"{item["path"]}"',
-                str(item.get('size', 0)),
-                f'"{human_readable_size(item.get("size", 0))}"',
-                item.get('modified', '').strftime('%Y-%m-%d %H:%M:%S') if item.get('modified') else '',
-                item.get('permissions', ''),
-                item.get('category', '')
-            ]
-            lines.append(','.join(row))
-
-        return '\n'.join(lines)
+        output = io.StringIO()
+        write_csv(self.scan_results['structure'], output)
+        return output.getvalue().rstrip('\n')
 
     def update_statistics(self):
         """Оновлює відображення статистики"""
@@ -767,10 +790,14 @@ class App(tk.Tk):
 
         stats = self.scan_results['statistics']
 
-        self.stats_label.config(
-            text=f"📊 Папок: {stats['total_folders']} | "
-                 f"Файлів: {stats['total_files']} | "
-                 f"Загальний розмір: {human_readable_size(stats['total_size'])}")
+        text = (f"📊 Папок: {stats['total_folders']} | "
+                f"Файлів: {stats['total_files']} | "
+                f"Загальний розмір: {human_readable_size(stats['total_size'])}")
+        if self.config_obj.config['scan_mode'] == 'incremental':
+            text += f" | Пропущено незмінених папок: {stats['skipped_dirs']} з " \
+                    f"{stats['skipped_dirs'] + stats['scanned_dirs']}"
+
+        self.stats_label.config(text=text)
 
     def save_results_to_file(self, content):
         """Зберігає результати у файл"""
@@ -786,7 +813,11 @@ class App(tk.Tk):
 
         try:
             with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+                if isinstance(content, str):
+                    f.write(content)
+                else:
+                    # Ітератор рядків пишемо поступово, без склеювання у один рядок
+                    f.writelines(line + '\n' for line in content)
             messagebox.showinfo("Збережено", f"Результати збережено у:\n{output_path}")
         except Exception as e:
             messagebox.showerror("Помилка збереження", f"Не вдалося зберегти файл:\n{e}")
@@ -1013,6 +1044,9 @@ class App(tk.Tk):
                     details.append(f"({human_readable_size(item['size'])})")
                 if self.config_obj.config['show_dates']:
                     details.append(f"[{item['modified'].strftime('%Y-%m-%d %H:%M')}]")
+            elif item['type'] == 'directory' and item.get('total_size') is not None:
+                if self.config_obj.config['show_sizes']:
+                    details.append(f"({human_readable_size(item['total_size'])}, файлів: {item['total_files']})")
 
             detail_str = " ".join(details)
 
@@ -1040,65 +1074,88 @@ class App(tk.Tk):
         )
 
     def find_duplicates(self):
-        """Знаходить дублікати файлів"""
+        """Знаходить дублікати файлів за вмістом (розмір -> частковий хеш -> повний хеш)"""
         if not self.scan_results:
             messagebox.showwarning("Попередження", "Спочатку виконайте сканування")
             return
 
+        if self.duplicates_state is not None:
+            messagebox.showwarning("Попередження", "Пошук дублікатів уже триває")
+            return
+
+        files = [(item['path'], item['size'], item['mtime'])
+                 for item in self.scan_results['structure']
+                 if item['type'] == 'file' and not item['is_link']]
+
+        self.duplicates_state = {'progress': None, 'groups': None, 'stats': None, 'error': None}
         self.analytics_text.delete('1.0', tk.END)
         self.analytics_text.insert('1.0', "🔍 Пошук дублікатів файлів...\n\n")
-        self.update()
-
-        # Групуємо файли за розміром та іменем
-        files_by_size = {}
-        files_by_name = {}
+        self.notebook.select(2)  # Переключаємося на вкладку аналітики
 
-        for item in self.scan_results['structure']:
-            if item['type'] == 'file':
-                size = item['size']
-                name = item['name'].lower()
-
-                if size not in files_by_size:
-                    files_by_size[size] = []
-                files_by_size[size].append(item)
-
-                if name not in files_by_name:
-                    files_by_name[name] = []
-                files_by_name[name].append(item)
-
-        # Знаходимо дублікати за розміром
-        duplicates_text = "🔍 ДУБЛІКАТИ ЗА РОЗМІРОМ:\n" + "=" * 50 + "\n\n"
-        size_duplicates_found = False
-
-        for size, files in files_by_size.items():
-            if len(files) > 1 and size > 0:  # Ігноруємо порожні файли
-                size_duplicates_found = True
-                duplicates_text += f"📏 Розмір: {human_readable_size(size)} ({len(files)} файлів)\n"
-                for file_item in files:
-                    duplicates_text += f"   📄 {file_item['path']}\n"
-                duplicates_text += "\n"
+        threading.Thread(target=self._duplicates_worker, args=(files, self.duplicates_state), daemon=True).start()
+        self.after(STREAM_POLL_MS, self._poll_duplicates)
 
-        if not size_duplicates_found:
-            duplicates_text += "✅ Дублікатів за розміром не знайдено.\n\n"
+    def _duplicates_worker(self, files, state):
+        """Фоновий потік пошуку дублікатів"""
+        index = self._open_scan_index()
+        try:
+            finder = DuplicateFinder(self.config_obj.config['scan_workers'], index,
+                                     progress=lambda stage, done, total: state.update(progress=(stage, done, total)))
+            state['stats'] = finder.stats
+            state['groups'] = finder.find(files)
+        except Exception as e:
+            state['error'] = e
+        finally:
+            if index is not None:
+                index.close()
+
+    def _poll_duplicates(self):
+        """Оновлює прогрес пошуку дублікатів і показує результат після завершення"""
+        state = self.duplicates_state
+        if state['error'] is not None:
+            self.duplicates_state = None
+            messagebox.showerror("Помилка", f"Помилка під час пошуку дублікатів: {state['error']}")
+            return
 
-        # Знаходимо дублікати за іменем
-        duplicates_text += "\n🔍 ДУБЛІКАТИ ЗА ІМЕНЕМ:\n" + "=" * 50 + "\n\n"
-        name_duplicates_found = False
+        if state['groups'] is None:
+            if state['progress']:
+                stage, done, total = state['progress']
+                stage_name = "частковий хеш" if stage == 'partial' else "повний хеш"
+                self.analytics_text.delete('1.0', tk.END)
+                self.analytics_text.insert('1.0', f"🔍 Пошук дублікатів файлів...\n\nЕтап: {stage_name} ({done}/{total})\n")
+            self.after(STREAM_POLL_MS * 4, self._poll_duplicates)
+            return
 
-        for name, files in files_by_name.items():
-            if len(files) > 1:
-                name_duplicates_found = True
-                duplicates_text += f"📛 Ім'я: {name} ({len(files)} файлів)\n"
-                for file_item in files:
-                    duplicates_text += f"   📄 {file_item['path']} ({human_readable_size(file_item['size'])})\n"
+        self.duplicates_state = None
+        groups = state['groups']
+        stats = state['stats']
+
+        duplicates_text = "🔍 ДУБЛІКАТИ ЗА ВМІСТОМ (підтверджено хешем):\n" + "=" * 50 + "\n\n"
+        duplicates_text += (f"📊 Кандидатів за розміром: {stats['candidates']} | "
+                            f"часткових хешів: {stats['partial_hashed']} | "
+                            f"повних хешів: {stats['full_hashed']} | "
+                            f"з кешу: {stats['cache_hits']}\n")
+        if stats['errors']:
+            duplicates_text += f"⚠️ Не вдалося прочитати файлів: {stats['errors']}\n"
+
+        if not groups:
+            duplicates_text += "\n✅ Дублікатів не знайдено.\n"
+        else:
+            total_wasted = sum(group['wasted'] for group in groups)
+            duplicates_text += f"💾 Груп: {len(groups)} | Зайве місце: {human_readable_size(total_wasted)}\n\n"
+
+            for i, group in enumerate(groups[:MAX_DUPLICATE_GROUPS], 1):
+                duplicates_text += (f"{i:3d}. 💾 Зайве: {human_readable_size(group['wasted'])} | "
+                                    f"Розмір: {human_readable_size(group['size'])} × {len(group['paths'])} файлів\n")
+                for path in group['paths']:
+                    duplicates_text += f"      📄 {path}\n"
                 duplicates_text += "\n"
 
-        if not name_duplicates_found:
-            duplicates_text += "✅ Дублікатів за іменем не знайдено.\n"
+            if len(groups) > MAX_DUPLICATE_GROUPS:
+                duplicates_text += f"... та ще {len(groups) - MAX_DUPLICATE_GROUPS} груп\n"
 
         self.analytics_text.delete('1.0', tk.END)
         self.analytics_text.insert('1.0', duplicates_text)
-        self.notebook.select(2)  # Переключаємося на вкладку аналітики
 
     def analyze_file_sizes(self):
         """Аналізує розподіл розмірів файлів"""
@@ -1185,6 +1242,27 @@ class App(tk.Tk):
         """Показує статистику типів файлів"""
         self.file_type_statistics()
 
+    def show_heaviest_folders(self):
+        """Показує папки з найбільшим сукупним розміром (з підсумків сканування)"""
+        if not self.scan_results:
+            messagebox.showwarning("Попередження", "Спочатку виконайте сканування")
+            return
+
+        folders = [item for item in self.scan_results['structure']
+                   if item['type'] == 'directory' and item.get('total_size') is not None]
+        heaviest = heapq.nlargest(30, folders, key=lambda item: item['total_size'])
+
+        heavy_text = "🏋️ НАЙВАЖЧІ ПАПКИ\n" + "=" * 50 + "\n\n"
+        heavy_text += "🔝 ТОП-30 ПАПОК ЗА СУКУПНИМ РОЗМІРОМ:\n" + "-" * 35 + "\n"
+
+        for i, item in enumerate(heaviest, 1):
+            heavy_text += (f"{i:2d}. {human_readable_size(item['total_size']):>10} "
+                           f"({item['total_files']:>7} файлів, {item['total_folders']:>5} папок) - {item['path']}\n")
+
+        self.analytics_text.delete('1.0', tk.END)
+        self.analytics_text.insert('1.0', heavy_text)
+        self.notebook.select(2)
+
     def show_recent_files(self):
         """Показує останньо змінені файли"""
         if not self.scan_results:
@@ -1203,22 +1281,6 @@ class App(tk.Tk):
         self.notebook.select(2)
 
 
-def human_readable_size(size_bytes):
-    """Конвертує розмір у байтах у читабельний формат"""
-    if size_bytes is None or size_bytes < 0:
-        return "Н/Д"
-    if size_bytes == 0:
-        return "0 Б"
-
-    units = ['Б', 'КБ', 'МБ', 'ГБ', 'ТБ']
-    i = 0
-    while size_bytes >= 1024 and i < len(units) - 1:
-        size_bytes /= 1024.0
-        i += 1
-
-    return f"{size_bytes:.1f} {units[i]}" if size_bytes % 1 != 0 else f"{int(size_bytes)} {units[i]}"
-
-
 def colorize(item_text, is_dir, full_item_name=None):
     """Додає кольори до тексту для консольного виводу"""
     if is_dir:
@@ -1241,40 +1303,6 @@ def colorize(item_text, is_dir, full_item_name=None):
         return color + item_text + Style.RESET_ALL
 
 
-def is_hidden(filepath):
-    """Перевіряє чи є файл/папка прихованою"""
-    try:
-        if os.name == 'posix':
-            return os.path.basename(filepath).startswith('.')
-        elif os.name == 'nt':
-            attrs = os.stat(filepath).st_file_attributes
-            return attrs & (stat.FILE_ATTRIBUTE_HIDDEN | stat.FILE_ATTRIBUTE_SYSTEM)
-    except OSError:
-        return False
-    return False
-
-
-def calculate_total_size(root_path):
-    """
-    Розраховує повний розмір папки та її вмісту, рекурсивно.
-    Ігнорує помилки доступу до окремих файлів.
-    """
-    total_size = 0
-    try:
-        for entry in os.scandir(root_path):
-            try:
-                if entry.is_dir(follow_symlinks=False):
-                    total_size += calculate_total_size(entry.path)
-                elif entry.is_file(follow_symlinks=False):
-                    total_size += entry.stat(follow_symlinks=False).st_size
-            except OSError:
-                continue
-    except OSError:
-        return 0
-
-    return total_size
-
-
 class QuickAccessPanel:
     """Панель швидкого доступу до популярних папок"""
 
@@ -1570,59 +1598,95 @@ class EnhancedApp(App):
         self.perform_folder_comparison(folder1, folder2)
 
     def perform_folder_comparison(self, folder1, folder2):
-        """Виконує порівняння двох папок"""
+        """Запускає порівняння двох папок у фоновому потоці"""
+        if self.comparison_state is not None:
+            messagebox.showwarning("Попередження", "Порівняння папок уже триває")
+            return
+
+        self.comparison_state = {'folders': (folder1, folder2), 'progress': None, 'result': None,
+                                 'stats': None, 'error': None}
+        self.analytics_text.delete('1.0', tk.END)
+        self.analytics_text.insert('1.0', "📊 Порівняння папок...\n\n")
+        self.notebook.select(2)
+
+        threading.Thread(target=self._comparison_worker, args=(folder1, folder2, self.comparison_state),
+                         daemon=True).start()
+        self.after(STREAM_POLL_MS, self._poll_comparison)
+
+    def _comparison_worker(self, folder1, folder2, state):
+        """Фоновий потік порівняння папок"""
+        index = self._open_scan_index()
+        try:
+            comparer = FolderComparer(self.config_obj.config['scan_workers'], index,
+                                      progress=lambda stage, done, total: state.update(progress=(stage, done, total)))
+            state['stats'] = comparer.stats
+            state['result'] = comparer.compare(folder1, folder2)
+        except Exception as e:
+            state['error'] = e
+        finally:
+            if index is not None:
+                index.close()
+
+    def _poll_comparison(self):
+        """Оновлює прогрес порівняння і показує результат після завершення"""
+        state = self.comparison_state
+        if state['error'] is not None:
+            self.comparison_state = None
+            messagebox.showerror("Помилка", f"Помилка під час порівняння: {state['error']}")
+            return
+
+        if state['result'] is None:
+            if state['progress']:
+                stage, done, total = state['progress']
+                stage_name = {'walk': "обхід папок", 'content': "перевірка вмісту",
+                              'moves': "пошук переміщень"}.get(stage, stage)
+                self.analytics_text.delete('1.0', tk.END)
+                self.analytics_text.insert('1.0', f"📊 Порівняння папок...\n\nЕтап: {stage_name} ({done}/{total})\n")
+            self.after(STREAM_POLL_MS * 4, self._poll_comparison)
+            return
+
+        self.comparison_state = None
+        folder1, folder2 = state['folders']
+        result = state['result']
+        stats = state['stats']
+
         comparison_text = f"📊 ПОРІВНЯННЯ ПАПОК\n{'=' * 50}\n\n"
         comparison_text += f"📁 Папка 1: {folder1}\n"
         comparison_text += f"📁 Папка 2: {folder2}\n\n"
 
-        try:
-            # Отримуємо списки файлів з обох папок
-            files1 = set()
-            files2 = set()
-
-            for root, dirs, files in os.walk(folder1):
-                for file in files:
-                    rel_path = os.path.relpath(os.path.join(root, file), folder1)
-                    files1.add(rel_path)
-
-            for root, dirs, files in os.walk(folder2):
-                for file in files:
-                    rel_path = os.path.relpath(os.path.join(root, file), folder2)
-                    files2.add(rel_path)
-
-            # Знаходимо відмінності
-            only_in_1 = files1 - files2
-            only_in_2 = files2 - files1
-            common_files = files1 & files2
-
-            comparison_text += f"📊 Статистика:\n"
-            comparison_text += f"   Файлів тільки в папці 1: {len(only_in_1)}\n"
-            comparison_text += f"   Файлів тільки в папці 2: {len(only_in_2)}\n"
-            comparison_text += f"   Спільних файлів: {len(common_files)}\n\n"
-
-            if only_in_1:
-                comparison_text += f"📁 Файли тільки в папці 1 ({len(only_in_1)}):\n{'-' * 30}\n"
-                for file in sorted(list(only_in_1)[:50]):  # Показуємо перші 50
-                    comparison_text += f"   {file}\n"
-                if len(only_in_1) > 50:
-                    comparison_text += f"   ... та ще {len(only_in_1) - 50} файлів\n"
-                comparison_text += "\n"
-
-            if only_in_2:
-                comparison_text += f"📁 Файли тільки в папці 2 ({len(only_in_2)}):\n{'-' * 30}\n"
-                for file in sorted(list(only_in_2)[:50]):  # Показуємо перші 50
-                    comparison_text += f"   {file}\n"
-                if len(only_in_2) > 50:
-                    comparison_text += f"   ... та ще {len(only_in_2) - 50} файлів\n"
-                comparison_text += "\n"
-
-        except Exception as e:
-            comparison_text += f"❌ Помилка під час порівняння: {e}\n"
+        comparison_text += f"📊 Статистика:\n"
+        comparison_text += f"   Файлів у папці 1: {stats['files_1']} | у папці 2: {stats['files_2']}\n"
+        comparison_text += f"   Однакових: {len(result['identical'])}\n"
+        comparison_text += f"   Змінених: {len(result['changed'])}\n"
+        comparison_text += f"   Змінено лише дату (вміст той самий): {len(result['touched'])}\n"
+        comparison_text += f"   Переміщених/перейменованих: {len(result['moved'])}\n"
+        comparison_text += f"   Файлів тільки в папці 1: {len(result['only_in_1'])}\n"
+        comparison_text += f"   Файлів тільки в папці 2: {len(result['only_in_2'])}\n"
+        comparison_text += (f"   Прочитано для хешування: {stats['hashed']} файлів "
+                            f"({human_readable_size(stats['hashed_bytes'])}), з кешу: {stats['cache_hits']}\n")
+        if stats['errors']:
+            comparison_text += f"   ⚠️ Помилок читання: {stats['errors']}\n"
+        comparison_text += "\n"
+
+        sections = [
+            ("✏️ Змінені файли", result['changed']),
+            ("🕒 Змінено лише дату", result['touched']),
+            ("🔀 Переміщені/перейменовані", [f"{old} → {new}" for old, new in result['moved']]),
+            ("📁 Файли тільки в папці 1", result['only_in_1']),
+            ("📁 Файли тільки в папці 2", result['only_in_2']),
+        ]
+        for title, paths in sections:
+            if not paths:
+                continue
+            comparison_text += f"{title} ({len(paths)}):\n{'-' * 30}\n"
+            for path in paths[:MAX_COMPARISON_PATHS]:
+                comparison_text += f"   {path}\n"
+            if len(paths) > MAX_COMPARISON_PATHS:
+                comparison_text += f"   ... та ще {len(paths) - MAX_COMPARISON_PATHS} файлів\n"
+            comparison_text += "\n"
 
-        # Відображаємо результат
         self.analytics_text.delete('1.0', tk.END)
         self.analytics_text.insert('1.0', comparison_text)
-        self.notebook.select(2)
 
     def generate_report(self):
         """Генерує детальний звіт"""
@@ -1699,6 +1763,16 @@ class EnhancedApp(App):
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Розширений сканер структури папок")
+    mode_group = parser.add_mutually_exclusive_group()
+    mode_group.add_argument('--full', dest='scan_mode', action='store_const', const='full',
+                            help="повне сканування з оновленням індексу")
+    mode_group.add_argument('--incremental', dest='scan_mode', action='store_const', const='incremental',
+                            help="пропускати папки, дата зміни яких не змінилася з минулого сканування")
+    args = parser.parse_args()
+
     config = TreeConfig()
     app = EnhancedApp(config)
+    if args.scan_mode:
+        app.scan_mode_var.set(args.scan_mode)
     app.mainloop()
\ No newline at end of file
@@ -0,0 +1,183 @@
+"""
+Бенчмарк сканера структури папок.
+
+Створює синтетичне дерево (за замовчуванням 1 000 000 файлів) і порівнює
+старий обхід os.listdir + os.lstat з ScanEngine при різній кількості потоків.
+Режим --render перевіряє, що побудова дерева лишається лінійною (до 1M вузлів).
+
+    python bench_scan.py --files 1000000 --workers 1 8 32
+    python bench_scan.py --root /mnt/nas/share --workers 1 16
+    python bench_scan.py --render 10000 100000 1000000
+"""
+import argparse
+import datetime
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import time
+
+from scan_engine import ScanEngine, iter_tree_lines
+
+BENCH_CONFIG = {
+    'excluded_folders': [],
+    'excluded_extensions': [],
+    'max_depth': 0,
+    'show_files': True,
+    'show_hidden': True,
+    'file_icons': True,
+    'show_sizes': True,
+    'show_dates': True,
+    'show_permissions': False,
+}
+
+# Допустиме зростання часу на один вузол між найменшим і найбільшим деревом
+LINEAR_TOLERANCE = 2.5
+
+
+class StubClassifier:
+    """Класифікатор без звернень до таблиць, щоб міряти лише обхід"""
+
+    @staticmethod
+    def classify_batch(paths):
+        return ['other'] * len(paths)
+
+
+def build_synthetic_tree(root, total_files, files_per_dir=1000, dirs_per_level=100):
+    """Створює дерево root/dNN/dNNN/fNNNN з total_files порожніх файлів"""
+    dir_count = max(1, total_files // files_per_dir)
+    created = 0
+    for d in range(dir_count):
+        sub_dir = os.path.join(root, f"d{d // dirs_per_level:04d}", f"d{d % dirs_per_level:03d}")
+        os.makedirs(sub_dir, exist_ok=True)
+        for f in range(min(files_per_dir, total_files - created)):
+            with open(os.path.join(sub_dir, f"f{f:04d}.txt"), 'wb'):
+                pass
+        created += files_per_dir
+        if created >= total_files:
+            break
+
+
+def build_synthetic_results(total_nodes, fanout=10, files_per_dir=90):
+    """Будує results для дерева з total_nodes вузлів без звернень до диска"""
+    modified = datetime.datetime(2025, 1, 1)
+    listings = {}
+    queue = [('root', 0)]
+    created = 0
+    while queue and created < total_nodes:
+        next_queue = []
+        for dir_path, depth in queue:
+            items = []
+            for d in range(fanout):
+                if created >= total_nodes:
+                    break
+                path = f"{dir_path}/d{d}"
+                items.append({'name': f"d{d}", 'path': path, 'type': 'directory', 'is_link': False, 'size': 0,
+                              'modified': modified, 'permissions': '755', 'prefix': '', 'depth': depth})
+                next_queue.append((path, depth + 1))
+                created += 1
+            for f in range(files_per_dir):
+                if created >= total_nodes:
+                    break
+                items.append({'name': f"f{f}.txt", 'path': f"{dir_path}/f{f}.txt", 'type': 'file',
+                              'is_link': False, 'size': f * 100, 'modified': modified, 'permissions': '644',
+                              'prefix': '', 'depth': depth, 'category': 'document', 'extension': '.txt'})
+                created += 1
+            listings[dir_path] = items
+        queue = next_queue
+
+    engine = ScanEngine(BENCH_CONFIG, StubClassifier(), workers=1)
+    results = engine.new_results('root')
+    results['structure'].extend(engine._iter_emit('root', lambda path, depth: listings.get(path, []),
+                                                  results['statistics']))
+    return results
+
+
+def render_benchmark(sizes):
+    """Вимірює час побудови дерева та перевіряє, що він зростає лінійно"""
+    per_node = []
+    for size in sizes:
+        results = build_synthetic_results(size)
+        nodes = len(results['structure'])
+        start = time.perf_counter()
+        output = '\n'.join(iter_tree_lines(results, BENCH_CONFIG, lambda item: '📄'))
+        elapsed = time.perf_counter() - start
+        per_node.append(elapsed / nodes)
+        print(f"{nodes:>10} вузлів  {elapsed:8.2f} с  {elapsed / nodes * 1e6:8.2f} мкс/вузол  {len(output):>12} символів")
+
+    ratio = max(per_node) / min(per_node)
+    print(f"\nВідношення часу на вузол (макс/мін): {ratio:.2f}")
+    if ratio > LINEAR_TOLERANCE:
+        print("❌ Побудова дерева росте нелінійно")
+        return False
+    print("✅ Побудова дерева лінійна")
+    return True
+
+
+def legacy_scan(root):
+    """Попередній алгоритм: os.listdir + os.lstat для кожного елемента, один потік"""
+    count = 0
+    stack = [root]
+    while stack:
+        dir_path = stack.pop()
+        try:
+            entries = os.listdir(dir_path)
+        except OSError:
+            continue
+        for name in entries:
+            path = os.path.join(dir_path, name)
+            try:
+                entry_stat = os.lstat(path)
+            except OSError:
+                continue
+            count += 1
+            if stat.S_ISDIR(entry_stat.st_mode):
+                stack.append(path)
+    return count
+
+
+def measure(label, func):
+    start = time.perf_counter()
+    count = func()
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed else float('inf')
+    print(f"{label:28} {elapsed:9.2f} с  {count:>10} елементів  {rate:>12.0f} ел/с")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк ScanEngine")
+    parser.add_argument('--files', type=int, default=1_000_000, help="кількість файлів у синтетичному дереві")
+    parser.add_argument('--root', help="сканувати існуючу папку замість синтетичної")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 8, 32], help="кількість потоків")
+    parser.add_argument('--keep', action='store_true', help="не видаляти синтетичне дерево")
+    parser.add_argument('--render', type=int, nargs='+', metavar='NODES',
+                        help="перевірити лінійність побудови дерева для заданих розмірів")
+    args = parser.parse_args()
+
+    if args.render:
+        sys.exit(0 if render_benchmark(args.render) else 1)
+
+    root = args.root
+    temp_root = None
+    if not root:
+        temp_root = tempfile.mkdtemp(prefix="bench_scan_")
+        root = temp_root
+        print(f"Створення {args.files} файлів у {root} ...")
+        start = time.perf_counter()
+        build_synthetic_tree(root, args.files)
+        print(f"Готово за {time.perf_counter() - start:.1f} с\n")
+
+    try:
+        measure("listdir + lstat (старий)", lambda: legacy_scan(root))
+        for workers in args.workers:
+            engine = ScanEngine(BENCH_CONFIG, StubClassifier(), workers=workers)
+            measure(f"ScanEngine, потоків: {workers}", lambda: len(engine.scan(root)['structure']))
+    finally:
+        if temp_root and not args.keep:
+            shutil.rmtree(temp_root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+import os
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from scan_engine import DEFAULT_SCAN_WORKERS
+
+# Скільки байтів з початку та з кінця файлу бере частковий хеш
+PARTIAL_CHUNK = 64 * 1024
+# Буфер для повного хешування
+READ_BUFFER = 1024 * 1024
+
+
+def hash_partial(path, size):
+    """Хеш перших і останніх PARTIAL_CHUNK байтів; малі файли хешуються повністю"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        if size <= 2 * PARTIAL_CHUNK:
+            digest.update(f.read())
+        else:
+            digest.update(f.read(PARTIAL_CHUNK))
+            f.seek(-PARTIAL_CHUNK, os.SEEK_END)
+            digest.update(f.read(PARTIAL_CHUNK))
+    return digest.hexdigest()
+
+
+def hash_full(path):
+    """Потоковий хеш усього файлу великими блоками в один буфер"""
+    digest = hashlib.blake2b(digest_size=20)
+    buffer = bytearray(READ_BUFFER)
+    view = memoryview(buffer)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            digest.update(view[:read])
+    return digest.hexdigest()
+
+
+class DuplicateFinder:
+    """
+    Пошук дублікатів за вмістом у три етапи:
+    1) групування за розміром;
+    2) частковий хеш (початок + кінець файлу) лише для файлів з однаковим розміром;
+    3) повний хеш лише для файлів, що збіглися і після часткового хешу.
+    Хешування виконується у пулі потоків, а готові хеші кешуються в ScanIndex
+    за ключем (шлях, розмір, mtime).
+    """
+
+    def __init__(self, workers=None, cache=None, progress=None):
+        self.workers = max(1, int(workers or DEFAULT_SCAN_WORKERS))
+        self.cache = cache
+        self.progress = progress  # progress(етап, оброблено, всього)
+        self.stats = {'candidates': 0, 'partial_hashed': 0, 'full_hashed': 0, 'cache_hits': 0, 'errors': 0}
+
+    def find(self, files):
+        """
+        Приймає (шлях, розмір, mtime) для кожного файлу.
+        Повертає групи дублікатів, відсортовані за зайвим місцем:
+        [{'size', 'hash', 'paths', 'wasted'}, ...]
+        """
+        by_size = {}
+        for path, size, mtime in files:
+            if size > 0:
+                by_size.setdefault(size, []).append((path, size, mtime))
+
+        candidates = [entry for group in by_size.values() if len(group) > 1 for entry in group]
+        self.stats['candidates'] = len(candidates)
+
+        # Етап 2: частковий хеш
+        partial = self._hash_all(candidates, 'partial')
+        by_partial = {}
+        for entry in candidates:
+            digest = partial.get(entry[0])
+            if digest is not None:
+                by_partial.setdefault((entry[1], digest), []).append(entry)
+
+        # Етап 3: повний хеш лише для великих файлів, що досі збігаються.
+        # Для файлів до 2 * PARTIAL_CHUNK частковий хеш уже охоплює весь вміст
+        groups = {}
+        need_full = []
+        for (size, digest), group in by_partial.items():
+            if len(group) < 2:
+                continue
+            if size <= 2 * PARTIAL_CHUNK:
+                groups[(size, digest)] = group
+            else:
+                need_full.extend(group)
+
+        full = self._hash_all(need_full, 'full')
+        for entry in need_full:
+            digest = full.get(entry[0])
+            if digest is not None:
+                groups.setdefault((entry[1], digest), []).append(entry)
+
+        result = []
+        for (size, digest), group in groups.items():
+            if len(group) > 1:
+                result.append({
+                    'size': size,
+                    'hash': digest,
+                    'paths': sorted(entry[0] for entry in group),
+                    'wasted': size * (len(group) - 1)
+                })
+
+        result.sort(key=lambda g: g['wasted'], reverse=True)
+        return result
+
+    def _hash_all(self, entries, kind):
+        """Хешує файли у пулі потоків, спершу беручи готові хеші з кешу"""
+        digests = self.cache.get_hashes(entries, kind) if self.cache is not None else {}
+        self.stats['cache_hits'] += len(digests)
+
+        pending = [entry for entry in entries if entry[0] not in digests]
+        total = len(entries)
+        done = [len(digests)]
+        lock = threading.Lock()
+        self._report(kind, done[0], total)
+
+        def work(entry):
+            path, size, mtime = entry
+            try:
+                digest = hash_partial(path, size) if kind == 'partial' else hash_full(path)
+            except OSError:
+                digest = None
+            with lock:
+                done[0] += 1
+                self._report(kind, done[0], total)
+            return digest
+
+        fresh = []
+        if pending:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for entry, digest in zip(pending, pool.map(work, pending)):
+                    if digest is None:
+                        self.stats['errors'] += 1
+                        continue
+                    digests[entry[0]] = digest
+                    fresh.append((entry[0], entry[1], entry[2], digest))
+
+        self.stats[f'{kind}_hashed'] += len(fresh)
+        if self.cache is not None and fresh:
+            self.cache.store_hashes(fresh, kind)
+        return digests
+
+    def _report(self, stage, done, total):
+        if self.progress is not None:
+            self.progress(stage, done, total)
@@ -0,0 +1,170 @@
+import os
+import json
+import hashlib
+import functools
+
+from tree_config import SCRIPT_DIR
+
+TYPES_CONFIG_FILENAME = "file_types.json"
+MAGIC_CACHE_SIZE = 4096
+# Скільки байтів з початку файлу читати для розпізнавання сигнатури
+MAGIC_READ_SIZE = 16
+
+DEFAULT_CATEGORIES = {
+    'code': ['.py', '.js', '.html', '.css', '.cpp', '.c', '.java', '.php', '.rb', '.go', '.rs', '.ts'],
+    'image': ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.svg', '.webp', '.ico'],
+    'video': ['.mp4', '.avi', '.mkv', '.mov', '.wmv', '.flv', '.webm'],
+    'audio': ['.mp3', '.wav', '.flac', '.aac', '.ogg', '.m4a'],
+    'document': ['.pdf', '.doc', '.docx', '.txt', '.md', '.rtf', '.odt'],
+    'archive': ['.zip', '.rar', '.7z', '.tar', '.gz', '.bz2'],
+    'data': ['.json', '.xml', '.csv', '.xlsx', '.db', '.sql']
+}
+
+DEFAULT_ICONS = {
+    'code': '💻',
+    'image': '🖼️',
+    'video': '🎬',
+    'audio': '🎵',
+    'document': '📄',
+    'archive': '📦',
+    'data': '📊',
+    'other': '📄'
+}
+
+# Сигнатури (зсув, байти, категорія) для файлів без розширення
+MAGIC_SIGNATURES = [
+    (0, b'\x89PNG\r\n\x1a\n', 'image'),
+    (0, b'\xff\xd8\xff', 'image'),
+    (0, b'GIF87a', 'image'),
+    (0, b'GIF89a', 'image'),
+    (0, b'BM', 'image'),
+    (8, b'WEBP', 'image'),
+    (0, b'%PDF', 'document'),
+    (0, b'{\\rtf', 'document'),
+    (0, b'PK\x03\x04', 'archive'),
+    (0, b'Rar!\x1a\x07', 'archive'),
+    (0, b'7z\xbc\xaf\x27\x1c', 'archive'),
+    (0, b'\x1f\x8b', 'archive'),
+    (0, b'BZh', 'archive'),
+    (0, b'ID3', 'audio'),
+    (0, b'fLaC', 'audio'),
+    (0, b'OggS', 'audio'),
+    (8, b'WAVE', 'audio'),
+    (8, b'AVI ', 'video'),
+    (4, b'ftyp', 'video'),
+    (0, b'\x1aE\xdf\xa3', 'video'),
+    (0, b'SQLite format 3\x00', 'data'),
+    (0, b'#!', 'code'),
+]
+
+
+class FileClassifier:
+    """
+    Класифікатор файлів з наперед зібраною таблицею розширення -> категорія.
+    Файли без розширення за бажанням розпізнаються за сигнатурою перших байтів;
+    результати цього читання кешуються в обмеженому LRU.
+    """
+
+    def __init__(self, categories=None, icons=None, sniff_magic=False, cache_size=MAGIC_CACHE_SIZE):
+        self.categories = categories if categories is not None else DEFAULT_CATEGORIES
+        self.icons = dict(DEFAULT_ICONS, **(icons or {}))
+        self.sniff_magic = sniff_magic
+        self.lookup = {}
+        for category, extensions in self.categories.items():
+            for ext in extensions:
+                ext = ext.lower()
+                self.lookup[ext if ext.startswith('.') else '.' + ext] = category
+        self.sniff = functools.lru_cache(maxsize=cache_size)(self._sniff)
+        # Відбиток правил класифікації: за ним індекс сканування скидає закешовані категорії
+        rules = json.dumps([sorted(self.lookup.items()), self.sniff_magic])
+        self.signature = hashlib.sha1(rules.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def from_config(cls, config_path=None):
+        """
+        Завантажує класифікатор з JSON-файлу:
+        {"categories": {"code": [".py", ...]}, "icons": {...}, "sniff_magic": false, "magic_cache_size": 4096}.
+        Категорії з файлу доповнюють і перевизначають стандартні
+        """
+        config_path = config_path or os.path.join(SCRIPT_DIR, TYPES_CONFIG_FILENAME)
+        try:
+            with open(config_path, 'r', encoding='utf-8') as f:
+                loaded = json.load(f)
+        except (OSError, ValueError):
+            return cls()
+
+        categories = {category: list(extensions) for category, extensions in DEFAULT_CATEGORIES.items()}
+        user_categories = loaded.get('categories', {})
+        # Розширення, перенесене користувачем в іншу категорію, прибираємо зі стандартної
+        reassigned = {'.' + ext.lower().lstrip('.') for extensions in user_categories.values() for ext in extensions}
+        for category in categories:
+            categories[category] = [ext for ext in categories[category] if ext not in reassigned]
+        for category, extensions in user_categories.items():
+            categories.setdefault(category, []).extend(extensions)
+
+        return cls(categories, loaded.get('icons'), bool(loaded.get('sniff_magic', False)),
+                   int(loaded.get('magic_cache_size', MAGIC_CACHE_SIZE)))
+
+    def category(self, filepath):
+        """Категорія файлу: за розширенням, а без розширення - за сигнатурою (якщо ввімкнено)"""
+        ext = os.path.splitext(filepath)[1]
+        if ext:
+            return self.lookup.get(ext.lower(), 'other')
+        if self.sniff_magic:
+            return self.sniff(filepath)
+        return 'other'
+
+    def classify_batch(self, paths):
+        """Категорії для списку шляхів (наприклад, усіх файлів однієї папки) за один виклик"""
+        lookup = self.lookup
+        categories = []
+        for path in paths:
+            ext = os.path.splitext(path)[1]
+            if ext:
+                categories.append(lookup.get(ext.lower(), 'other'))
+            elif self.sniff_magic:
+                categories.append(self.sniff(path))
+            else:
+                categories.append('other')
+        return categories
+
+    def icon(self, filepath, is_dir=False):
+        """Іконка файлу або папки з одним пошуком категорії"""
+        if is_dir:
+            return "📁"
+        return self.icons.get(self.category(filepath), '📄')
+
+    @staticmethod
+    def _sniff(filepath):
+        try:
+            with open(filepath, 'rb') as f:
+                head = f.read(MAGIC_READ_SIZE)
+        except OSError:
+            return 'other'
+        for offset, signature, category in MAGIC_SIGNATURES:
+            if head[offset:offset + len(signature)] == signature:
+                return category
+        return 'other'
+
+
+class FileTypeAnalyzer:
+    """Аналізатор типів файлів для кращої категоризації"""
+
+    classifier = None
+
+    @staticmethod
+    def get_classifier():
+        """Спільний класифікатор, завантажений з file_types.json при першому зверненні"""
+        if FileTypeAnalyzer.classifier is None:
+            FileTypeAnalyzer.classifier = FileClassifier.from_config()
+        return FileTypeAnalyzer.classifier
+
+    @staticmethod
+    def get_file_category(filepath):
+        """Визначає категорію файлу за розширенням"""
+        return FileTypeAnalyzer.get_classifier().category(filepath)
+
+    @staticmethod
+    def get_file_icon(filepath, is_dir=False):
+        """Повертає відповідну іконку для файлу або папки"""
+        return FileTypeAnalyzer.get_classifier().icon(filepath, is_dir)
@@ -0,0 +1,211 @@
+import os
+import stat
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from scan_engine import DEFAULT_SCAN_WORKERS
+from duplicate_finder import hash_full
+
+# Допустима різниця mtime, за якої файли однакового розміру вважаються однаковими без читання.
+# 2 с - точність часу в FAT/exFAT, куди часто пишуть резервні копії
+MTIME_TOLERANCE = 2.0
+
+
+def walk_files(root, pool):
+    """
+    Обходить дерево, читаючи папки паралельно в пулі потоків.
+    Повертає {відносний шлях: (розмір, mtime)} для звичайних файлів та кількість помилок читання.
+    """
+    files = {}
+    errors = 0
+
+    def list_dir(dir_path):
+        # Помилки рахуються в кожному виклику окремо й сумуються в потоці обходу:
+        # спільний лічильник із потоків пулу губив би інкременти
+        found = []
+        sub_dirs = []
+        failed = 0
+        try:
+            with os.scandir(dir_path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            sub_dirs.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            entry_stat = entry.stat(follow_symlinks=False)
+                            if stat.S_ISREG(entry_stat.st_mode):
+                                found.append((entry.path, entry_stat.st_size, entry_stat.st_mtime))
+                    except OSError:
+                        failed += 1
+        except OSError:
+            failed += 1
+        return found, sub_dirs, failed
+
+    pending = {pool.submit(list_dir, root)}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            found, sub_dirs, failed = future.result()
+            errors += failed
+            for path, size, mtime in found:
+                files[os.path.relpath(path, root)] = (size, mtime)
+            pending.update(pool.submit(list_dir, sub_dir) for sub_dir in sub_dirs)
+
+    return files, errors
+
+
+class FolderComparer:
+    """
+    Порівняння двох дерев (наприклад, оригіналу та резервної копії):
+    1) обидва дерева обходяться одночасно в спільному пулі потоків;
+    2) спільні файли з різним розміром - змінені, з однаковим розміром і mtime - однакові
+       (вміст не читається, якщо не ввімкнено verify);
+    3) лише файли з однаковим розміром, але різним mtime хешуються, щоб відрізнити
+       змінені від тих, що просто торкнулися (touched);
+    4) файли, що є лише з одного боку, зіставляються за розміром і хешем - це перейменування/переміщення.
+    Хеші вмісту кешуються в ScanIndex за ключем (шлях, розмір, mtime).
+    """
+
+    def __init__(self, workers=None, cache=None, progress=None, verify=False):
+        self.workers = max(1, int(workers or DEFAULT_SCAN_WORKERS))
+        self.cache = cache
+        self.progress = progress  # progress(етап, оброблено, всього)
+        self.verify = verify
+        self.stats = {'files_1': 0, 'files_2': 0, 'hashed': 0, 'hashed_bytes': 0, 'cache_hits': 0, 'errors': 0}
+
+    def compare(self, folder1, folder2):
+        """
+        Повертає словник зі списками відносних шляхів:
+        only_in_1, only_in_2, identical, changed, touched та moved [(шлях у 1, шлях у 2)]
+        """
+        # Обходи керуються окремими потоками, а читання папок обох дерев іде у спільному пулі
+        with ThreadPoolExecutor(max_workers=self.workers) as pool, ThreadPoolExecutor(max_workers=2) as walkers:
+            self._report('walk', 0, 2)
+            walk1 = walkers.submit(walk_files, folder1, pool)
+            walk2 = walkers.submit(walk_files, folder2, pool)
+            files1, errors1 = walk1.result()
+            files2, errors2 = walk2.result()
+            self._report('walk', 2, 2)
+            self.stats['files_1'] = len(files1)
+            self.stats['files_2'] = len(files2)
+            self.stats['errors'] += errors1 + errors2
+
+            result = {'only_in_1': [], 'only_in_2': [], 'identical': [], 'changed': [], 'touched': [], 'moved': []}
+
+            # Спільні файли: спершу метадані, хеш лише коли вони не дають відповіді
+            to_hash = []
+            for rel_path, (size1, mtime1) in files1.items():
+                meta2 = files2.get(rel_path)
+                if meta2 is None:
+                    continue
+                size2, mtime2 = meta2
+                if size1 != size2:
+                    result['changed'].append(rel_path)
+                elif abs(mtime1 - mtime2) <= MTIME_TOLERANCE and not self.verify:
+                    result['identical'].append(rel_path)
+                else:
+                    to_hash.append(rel_path)
+
+            jobs = []
+            for rel_path in to_hash:
+                size, mtime1 = files1[rel_path]
+                jobs.append((os.path.join(folder1, rel_path), size, mtime1))
+                jobs.append((os.path.join(folder2, rel_path), size, files2[rel_path][1]))
+            digests = self._hash_all(pool, jobs, 'content')
+
+            for rel_path in to_hash:
+                digest1 = digests.get(os.path.join(folder1, rel_path))
+                digest2 = digests.get(os.path.join(folder2, rel_path))
+                if digest1 is None or digest2 is None or digest1 != digest2:
+                    result['changed'].append(rel_path)
+                elif abs(files1[rel_path][1] - files2[rel_path][1]) <= MTIME_TOLERANCE:
+                    result['identical'].append(rel_path)
+                else:
+                    result['touched'].append(rel_path)
+
+            only1 = [rel_path for rel_path in files1 if rel_path not in files2]
+            only2 = [rel_path for rel_path in files2 if rel_path not in files1]
+            moved = self._match_moves(pool, folder1, folder2, files1, files2, only1, only2)
+
+            moved_from = {old for old, new in moved}
+            moved_to = {new for old, new in moved}
+            result['only_in_1'] = [rel_path for rel_path in only1 if rel_path not in moved_from]
+            result['only_in_2'] = [rel_path for rel_path in only2 if rel_path not in moved_to]
+            result['moved'] = moved
+
+        for key in ('only_in_1', 'only_in_2', 'identical', 'changed', 'touched', 'moved'):
+            result[key].sort()
+        return result
+
+    def _match_moves(self, pool, folder1, folder2, files1, files2, only1, only2):
+        """Зіставляє файли, що є лише з одного боку, за розміром, а потім за хешем вмісту"""
+        sizes2 = {}
+        for rel_path in only2:
+            sizes2.setdefault(files2[rel_path][0], []).append(rel_path)
+
+        # Порожні файли між собою не зіставляємо - їх вміст нічого не доводить
+        candidates1 = [rel_path for rel_path in only1 if files1[rel_path][0] and files1[rel_path][0] in sizes2]
+        if not candidates1:
+            return []
+        sizes1 = {files1[rel_path][0] for rel_path in candidates1}
+        candidates2 = [rel_path for size in sizes1 for rel_path in sizes2[size]]
+
+        jobs = [(os.path.join(folder1, rel_path),) + files1[rel_path] for rel_path in candidates1]
+        jobs += [(os.path.join(folder2, rel_path),) + files2[rel_path] for rel_path in candidates2]
+        digests = self._hash_all(pool, jobs, 'moves')
+
+        by_digest = {}
+        for rel_path in candidates2:
+            digest = digests.get(os.path.join(folder2, rel_path))
+            if digest is not None:
+                by_digest.setdefault((files2[rel_path][0], digest), []).append(rel_path)
+
+        moved = []
+        # Однакові за вмістом файли зіставляються парами в порядку шляхів
+        for rel_path in sorted(candidates1):
+            digest = digests.get(os.path.join(folder1, rel_path))
+            targets = by_digest.get((files1[rel_path][0], digest))
+            if digest is not None and targets:
+                targets.sort(reverse=True)
+                moved.append((rel_path, targets.pop()))
+        return moved
+
+    def _hash_all(self, pool, jobs, stage):
+        """Хешує файли (шлях, розмір, mtime) у пулі, спершу беручи готові хеші з кешу"""
+        digests = self.cache.get_hashes(jobs, 'full') if self.cache is not None else {}
+        self.stats['cache_hits'] += len(digests)
+
+        pending = [job for job in jobs if job[0] not in digests]
+        total = len(jobs)
+        done = [len(digests)]
+        lock = threading.Lock()
+        self._report(stage, done[0], total)
+
+        def work(job):
+            path, size, mtime = job
+            try:
+                digest = hash_full(path)
+            except OSError:
+                digest = None
+            with lock:
+                done[0] += 1
+                self._report(stage, done[0], total)
+            return digest
+
+        fresh = []
+        for job, digest in zip(pending, pool.map(work, pending)):
+            if digest is None:
+                self.stats['errors'] += 1
+                continue
+            digests[job[0]] = digest
+            fresh.append((job[0], job[1], job[2], digest))
+            self.stats['hashed'] += 1
+            self.stats['hashed_bytes'] += job[1]
+
+        if self.cache is not None and fresh:
+            self.cache.store_hashes(fresh, 'full')
+        return digests
+
+    def _report(self, stage, done, total):
+        if self.progress is not None:
+            self.progress(stage, done, total)
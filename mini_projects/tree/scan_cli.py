@@ -0,0 +1,135 @@
+"""
+Консольний режим сканера структури папок (без вікна Tk).
+
+Елементи записуються у вихід одразу після сканування, тож пам'ять не залежить
+від розміру дерева. Налаштування беруться з scanner_config.json і можуть
+бути перевизначені аргументами.
+
+    python scan_cli.py /srv/share --format ndjson -o share.ndjson
+    python scan_cli.py /home --format csv --incremental > home.csv
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+from tree_config import TreeConfig
+from file_types import FileTypeAnalyzer
+from scan_engine import ScanEngine, human_readable_size
+from scan_index import ScanIndex
+from tree_export import write_csv, write_ndjson
+
+WRITERS = {
+    'ndjson': write_ndjson,
+    'csv': write_csv,
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Сканер структури папок без графічного інтерфейсу")
+    parser.add_argument('path', help="папка для сканування")
+    parser.add_argument('-f', '--format', choices=sorted(WRITERS), default='ndjson', help="формат виводу")
+    parser.add_argument('-o', '--output', help="файл для запису (за замовчуванням stdout)")
+    parser.add_argument('-w', '--workers', type=int, help="кількість потоків читання папок")
+    parser.add_argument('--max-depth', type=int, help="максимальна глибина (0 - без обмежень)")
+    parser.add_argument('--exclude', action='append', default=[], metavar='FOLDER',
+                        help="додатково виключити папку (можна повторювати)")
+    parser.add_argument('--exclude-ext', action='append', default=[], metavar='EXT',
+                        help="додатково виключити розширення (можна повторювати)")
+
+    hidden_group = parser.add_mutually_exclusive_group()
+    hidden_group.add_argument('--hidden', dest='show_hidden', action='store_const', const=True,
+                              help="включати приховані файли")
+    hidden_group.add_argument('--no-hidden', dest='show_hidden', action='store_const', const=False,
+                              help="пропускати приховані файли")
+    parser.add_argument('--dirs-only', action='store_true', help="записувати лише папки")
+
+    mode_group = parser.add_mutually_exclusive_group()
+    mode_group.add_argument('--full', dest='scan_mode', action='store_const', const='full',
+                            help="повне сканування з оновленням індексу")
+    mode_group.add_argument('--incremental', dest='scan_mode', action='store_const', const='incremental',
+                            help="пропускати папки, дата зміни яких не змінилася з минулого сканування")
+    parser.add_argument('--no-index', action='store_true', help="не використовувати індекс сканування")
+    parser.add_argument('-q', '--quiet', action='store_true', help="не виводити підсумок у stderr")
+    return parser.parse_args(argv)
+
+
+def build_config(args):
+    """Налаштування з scanner_config.json з урахуванням аргументів командного рядка"""
+    config_obj = TreeConfig()
+    config_obj.load_config()
+    config = dict(config_obj.config)
+
+    if args.workers:
+        config['scan_workers'] = args.workers
+    if args.max_depth is not None:
+        config['max_depth'] = args.max_depth
+    if args.show_hidden is not None:
+        config['show_hidden'] = args.show_hidden
+    if args.dirs_only:
+        config['show_files'] = False
+    if args.scan_mode:
+        config['scan_mode'] = args.scan_mode
+    config['excluded_folders'] = list(config['excluded_folders']) + args.exclude
+    config['excluded_extensions'] = list(config['excluded_extensions']) + [
+        ext if ext.startswith('.') else '.' + ext for ext in args.exclude_ext]
+    return config
+
+
+def open_index(args):
+    """Відкриває індекс сканування; без нього сканування просто буде повним"""
+    if args.no_index:
+        return None
+    try:
+        return ScanIndex(TreeConfig.get_index_path())
+    except sqlite3.Error as e:
+        print(f"⚠️ Індекс недоступний ({e}), виконується повне сканування", file=sys.stderr)
+        return None
+
+
+def run(args):
+    root_path = os.path.abspath(args.path)
+    if not os.path.isdir(root_path):
+        print(f"❌ Папка не існує: {root_path}", file=sys.stderr)
+        return 2
+
+    config = build_config(args)
+    index = open_index(args)
+    engine = ScanEngine(config, FileTypeAnalyzer.get_classifier(), index=index,
+                        incremental=config['scan_mode'] == 'incremental')
+    results = engine.new_results(root_path)
+    statistics = results['statistics']
+
+    stream = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+    start = time.perf_counter()
+    try:
+        written = WRITERS[args.format](engine.iter_scan(root_path, statistics), stream)
+        stream.flush()
+    except BrokenPipeError:
+        # Споживач (наприклад, head) закрив канал - це не помилка сканування
+        sys.stderr.close()
+        return 0
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+        if index is not None:
+            index.close()
+
+    if not args.quiet:
+        elapsed = time.perf_counter() - start
+        summary = (f"📊 Папок: {statistics['total_folders']} | Файлів: {statistics['total_files']} | "
+                   f"Розмір: {human_readable_size(statistics['total_size'])} | "
+                   f"Записів: {written} | {elapsed:.2f} с")
+        if config['scan_mode'] == 'incremental':
+            summary += f" | З індексу: {statistics['skipped_dirs']}, прочитано: {statistics['scanned_dirs']}"
+        print(summary, file=sys.stderr)
+    return 0
+
+
+def main(argv=None):
+    sys.exit(run(parse_args(argv)))
+
+
+if __name__ == '__main__':
+    main()
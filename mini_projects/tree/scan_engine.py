@@ -0,0 +1,436 @@
+import os
+import stat
+import datetime
+import heapq
+import itertools
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# Кількість потоків за замовчуванням: сканування впирається у I/O, а не в CPU
+DEFAULT_SCAN_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+# Скільки найбільших/останніх файлів зберігати у статистиці
+TOP_FILES = 50
+# Максимум папок, прочитаних наперед і ще не відданих; далі читання відкладається до запиту,
+# тож пам'ять не росте, якщо споживач повільніший за диск
+PREFETCH_LIMIT = 1024
+
+# Сирий запис папки до фільтрації - саме він зберігається в індексі (scan_index.py)
+RawEntry = namedtuple('RawEntry', 'name path is_dir is_link size mtime mode hidden category')
+
+
+def entry_is_hidden(entry, entry_stat=None):
+    """Перевіряє чи є DirEntry прихованим, без додаткових викликів stat"""
+    if os.name == 'nt':
+        try:
+            attrs = (entry_stat or entry.stat(follow_symlinks=False)).st_file_attributes
+            return bool(attrs & (stat.FILE_ATTRIBUTE_HIDDEN | stat.FILE_ATTRIBUTE_SYSTEM))
+        except (OSError, AttributeError):
+            return False
+    return entry.name.startswith('.')
+
+
+class ScanEngine:
+    """
+    Сканер на основі os.scandir з пулом потоків.
+    Сусідні папки читаються паралельно, а результат збирається у тому ж порядку
+    та форматі, що й results['structure']/statistics у App.
+    """
+
+    def __init__(self, config, classifier, workers=None, index=None, incremental=False):
+        self.config = config
+        # Об'єкт з методом classify_batch(шляхи) -> категорії (див. file_types.FileClassifier)
+        self.classifier = classifier
+        self.workers = max(1, int(workers or config.get('scan_workers') or DEFAULT_SCAN_WORKERS))
+        # Індекс (ScanIndex) оновлюється при кожному скануванні, а в інкрементальному
+        # режимі папки з незміненим mtime беруться з нього без читання диска.
+        # mtime папки змінюється лише при додаванні/видаленні/перейменуванні записів,
+        # тому зміна вмісту файлу в незміненій папці до індексу не потрапить.
+        self.index = index
+        self.incremental = incremental and index is not None
+        self.counter_lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        """Лічильники і топ-файли рахуються для кожного сканування окремо"""
+        self.scanned_dirs = 0
+        self.skipped_dirs = 0
+        # Папки, записані в індекс або взяті з нього, - решта під коренем застаріла
+        self.visited_dirs = set()
+        self._largest = []
+        self._recent = []
+
+    def scan(self, root_path):
+        """Сканує root_path і повертає словник результатів"""
+        results = self.new_results(root_path)
+        results['structure'].extend(self.iter_scan(root_path, results['statistics']))
+        return results
+
+    @staticmethod
+    def new_results(root_path):
+        """Створює порожній словник результатів"""
+        return {
+            'root_path': root_path,
+            'scan_time': datetime.datetime.now().isoformat(),
+            'structure': [],
+            'statistics': {
+                'total_folders': 0,
+                'total_files': 0,
+                'total_size': 0,
+                'file_types': {},
+                'largest_files': [],
+                'recent_files': [],
+                'scanned_dirs': 0,
+                'skipped_dirs': 0
+            }
+        }
+
+    def iter_scan(self, root_path, statistics=None):
+        """
+        Генератор елементів у порядку обходу в глибину.
+        Елементи віддаються одразу, щойно їхня папка прочитана, а вкладені папки
+        читаються наперед у пулі потоків. Закриття генератора зупиняє сканування.
+        """
+        if statistics is None:
+            statistics = self.new_results(root_path)['statistics']
+        if not self._depth_allowed(0):
+            return
+
+        self._reset()
+        signature = getattr(self.classifier, 'signature', None)
+        if self.index is not None and signature is not None:
+            self.index.use_classifier(signature)
+        completed = False
+        try:
+            if self.workers == 1:
+                yield from self._iter_emit(root_path, self._list_dir, statistics)
+            else:
+                yield from self._iter_parallel(root_path, statistics)
+            completed = True
+        finally:
+            self._finish_statistics(statistics)
+            if self.index is not None:
+                # Після перерваного сканування невідвідані папки можуть бути цілком живими
+                if completed:
+                    self.index.prune(root_path, self.visited_dirs)
+                self.index.commit()
+
+    def _finish_statistics(self, statistics):
+        """Перетворює накопичені купи на відсортовані списки топ-файлів"""
+        statistics['scanned_dirs'] = self.scanned_dirs
+        statistics['skipped_dirs'] = self.skipped_dirs
+        statistics['largest_files'] = [info for _, _, info in sorted(self._largest, reverse=True)]
+        statistics['recent_files'] = [info for _, _, info in sorted(self._recent, reverse=True)]
+
+    def _iter_parallel(self, root_path, statistics):
+        """Обхід з читанням вкладених папок наперед у пулі потоків"""
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        futures = {}
+        lock = threading.Lock()
+        cancelled = threading.Event()
+
+        def prefetch(dir_path, depth):
+            with lock:
+                if len(futures) >= PREFETCH_LIMIT:
+                    return  # папку прочитаємо, коли до неї дійде обхід
+                try:
+                    futures[dir_path] = pool.submit(list_and_prefetch, dir_path, depth)
+                except RuntimeError:
+                    pass  # пул уже зупинено
+
+        def list_and_prefetch(dir_path, depth):
+            items = self._list_dir(dir_path, depth)
+            # Вкладені папки ставимо в чергу до повернення результату,
+            # тож до моменту їх запиту майбутні результати вже зареєстровані
+            for item in items:
+                if cancelled.is_set():
+                    break
+                if self._should_descend(item):
+                    prefetch(item['path'], depth + 1)
+            return items
+
+        def get_listing(dir_path, depth):
+            with lock:
+                future = futures.pop(dir_path, None)
+            if future is None:
+                return list_and_prefetch(dir_path, depth)
+            return future.result()
+
+        try:
+            yield from self._iter_emit(root_path, get_listing, statistics)
+        finally:
+            cancelled.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _depth_allowed(self, depth):
+        max_depth = self.config['max_depth']
+        return not (max_depth > 0 and depth >= max_depth)
+
+    def _should_descend(self, item):
+        return (item['type'] == 'directory'
+                and not item['is_link']
+                and item['name'].lower() not in self.config['excluded_folders']
+                and self._depth_allowed(item['depth'] + 1))
+
+    def _list_dir(self, dir_path, depth):
+        """Читає одну папку та повертає відфільтровані, відсортовані елементи"""
+        try:
+            raw_entries = self._read_dir(dir_path)
+        except OSError as e:
+            return [{
+                'name': f"[Помилка доступу: {e.strerror}]",
+                'path': dir_path,
+                'type': 'error',
+                'prefix': '',
+                'depth': depth
+            }]
+
+        items = [self._make_item(raw, depth) for raw in raw_entries if self._accept(raw)]
+
+        # Сортуємо: спочатку папки, потім файли
+        items.sort(key=lambda x: (x['type'] != 'directory', x['name'].lower()))
+        return items
+
+    def _read_dir(self, dir_path):
+        """Повертає сирі записи папки: з індексу, якщо mtime папки не змінився, інакше з диска"""
+        if self.index is None:
+            with self.counter_lock:
+                self.scanned_dirs += 1
+            return self._scandir_entries(dir_path, prefilter=True)
+
+        dir_mtime = os.stat(dir_path).st_mtime_ns
+        if self.incremental:
+            cached = self.index.get_listing(dir_path, dir_mtime)
+            if cached is not None:
+                with self.counter_lock:
+                    self.skipped_dirs += 1
+                    self.visited_dirs.add(dir_path)
+                return cached
+
+        # В індекс пишемо всі записи без фільтрів, бо налаштування можуть змінитися
+        entries = self._scandir_entries(dir_path, prefilter=False)
+        self.index.store_listing(dir_path, dir_mtime, entries)
+        with self.counter_lock:
+            self.scanned_dirs += 1
+            self.visited_dirs.add(dir_path)
+        return entries
+
+    def _scandir_entries(self, dir_path, prefilter):
+        """Читає папку через os.scandir, використовуючи закешовані дані DirEntry"""
+        rows = []
+        file_paths = []
+        with os.scandir(dir_path) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                    # Відкинуті файли не потребують stat
+                    if prefilter and not is_dir and not self._accept_file_name(entry.name):
+                        continue
+
+                    # На Windows stat вже закешовано у DirEntry, на POSIX це один lstat
+                    entry_stat = entry.stat(follow_symlinks=False)
+                    rows.append((
+                        entry.name,
+                        entry.path,
+                        is_dir,
+                        entry.is_symlink(),
+                        entry_stat.st_size if not is_dir else 0,
+                        entry_stat.st_mtime,
+                        entry_stat.st_mode,
+                        entry_is_hidden(entry, entry_stat)
+                    ))
+                    if not is_dir:
+                        file_paths.append(entry.path)
+                except OSError:
+                    continue
+
+        # Категорії всіх файлів папки визначаються одним викликом
+        categories = iter(self.classifier.classify_batch(file_paths))
+        return [RawEntry(*row, None if row[2] else next(categories)) for row in rows]
+
+    def _accept_file_name(self, name):
+        if not self.config['show_files']:
+            return False
+        return os.path.splitext(name)[1].lower() not in self.config['excluded_extensions']
+
+    def _accept(self, raw):
+        if not self.config['show_hidden'] and raw.hidden:
+            return False
+        return raw.is_dir or self._accept_file_name(raw.name)
+
+    @staticmethod
+    def _make_item(raw, depth):
+        """Створює елемент results['structure'] із сирого запису"""
+        file_info = {
+            'name': raw.name,
+            'path': raw.path,
+            'type': 'directory' if raw.is_dir else 'file',
+            'is_link': raw.is_link,
+            'size': raw.size,
+            'modified': datetime.datetime.fromtimestamp(raw.mtime),
+            'permissions': oct(raw.mode)[-3:],
+            'prefix': '',
+            'depth': depth
+        }
+
+        if not raw.is_dir:
+            file_info['category'] = raw.category
+            file_info['extension'] = os.path.splitext(raw.name)[1].lower()
+            # Точний st_mtime: 'modified' округлений datetime, а кеш хешів потребує того ж числа, що й stat
+            file_info['mtime'] = raw.mtime
+
+        return file_info
+
+    def _iter_emit(self, root_path, get_listing, stats):
+        """
+        Віддає елементи у порядку обходу в глибину та рахує статистику.
+        Кожен елемент отримує 'parent' (індекс у structure), 'is_last' серед сусідів,
+        а папки - список 'children' з індексами дочірніх елементів і сукупні
+        'total_size'/'total_files'/'total_folders' усього піддерева. Сукупні значення
+        стають остаточними, коли обхід виходить з папки (знизу вгору, без повторного обходу диска).
+        """
+        index = 0
+        sequence = itertools.count()
+        self._largest = []
+        self._recent = []
+        file_types = stats['file_types']
+
+        # Стек кадрів [елементи, позиція, префікс, індекс батька, батько] замість рекурсії,
+        # щоб глибокі дерева не впиралися в ліміт рекурсії
+        stack = [[get_listing(root_path, 0), 0, '', None, None]]
+
+        while stack:
+            frame = stack[-1]
+            items, position, prefix, parent_index, parent = frame
+            if position == len(items):
+                stack.pop()
+                # Папку завершено - додаємо її підсумки до батьківської
+                if parent is not None and stack and stack[-1][4] is not None:
+                    grandparent = stack[-1][4]
+                    grandparent['total_size'] += parent['total_size']
+                    grandparent['total_files'] += parent['total_files']
+                    grandparent['total_folders'] += parent['total_folders']
+                continue
+            frame[1] += 1
+
+            item = items[position]
+            item['prefix'] = prefix
+            item['is_last'] = (position == len(items) - 1)
+            item['parent'] = parent_index
+            if parent is not None:
+                parent['children'].append(index)
+
+            if item['type'] == 'directory':
+                item['children'] = []
+                item['total_size'] = 0
+                item['total_files'] = 0
+                item['total_folders'] = 0
+                stats['total_folders'] += 1
+                if parent is not None:
+                    parent['total_folders'] += 1
+
+                if self._should_descend(item):
+                    next_prefix = prefix + ('    ' if item['is_last'] else '│   ')
+                    stack.append([get_listing(item['path'], item['depth'] + 1), 0, next_prefix, index, item])
+                else:
+                    # Вміст не скановано (виключена папка або ліміт глибини) - підсумки невідомі
+                    item['total_size'] = item['total_files'] = item['total_folders'] = None
+            elif item['type'] == 'file':
+                stats['total_files'] += 1
+                stats['total_size'] += item['size']
+                if parent is not None:
+                    parent['total_size'] += item['size']
+                    parent['total_files'] += 1
+
+                category = file_types.setdefault(item.get('category', 'other'), {'count': 0, 'size': 0})
+                category['count'] += 1
+                category['size'] += item['size']
+
+                # Топ-файли тримаємо в купах фіксованого розміру, а не в списку всіх файлів
+                seq = -next(sequence)  # при рівних ключах перевага ранішому файлу
+                self._push_top(self._largest, (item['size'], seq, {
+                    'path': item['path'],
+                    'size': item['size'],
+                    'name': item['name']
+                }))
+                self._push_top(self._recent, (item['modified'], seq, {
+                    'path': item['path'],
+                    'modified': item['modified'],
+                    'name': item['name']
+                }))
+
+            yield item
+            index += 1
+
+    @staticmethod
+    def _push_top(heap, entry):
+        if len(heap) < TOP_FILES:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            heapq.heapreplace(heap, entry)
+
+
+def human_readable_size(size_bytes):
+    """Конвертує розмір у байтах у читабельний формат"""
+    if size_bytes is None or size_bytes < 0:
+        return "Н/Д"
+    if size_bytes == 0:
+        return "0 Б"
+
+    units = ['Б', 'КБ', 'МБ', 'ГБ', 'ТБ']
+    i = 0
+    while size_bytes >= 1024 and i < len(units) - 1:
+        size_bytes /= 1024.0
+        i += 1
+
+    return f"{size_bytes:.1f} {units[i]}" if size_bytes % 1 != 0 else f"{int(size_bytes)} {units[i]}"
+
+
+def format_tree_line(item, config, icon_for):
+    """Форматує рядок дерева, використовуючи попередньо обчислені prefix/is_last"""
+    line = item['prefix'] + ('└── ' if item.get('is_last', True) else '├── ')
+
+    # Іконка
+    if config['file_icons']:
+        line += icon_for(item) + " "
+
+    # Ім'я
+    line += item['name']
+
+    # Додаткова інформація для файлів
+    if item['type'] == 'file':
+        details = []
+
+        if config['show_sizes']:
+            details.append(f"({human_readable_size(item['size'])})")
+
+        if config['show_dates']:
+            details.append(f"[{item['modified'].strftime('%Y-%m-%d %H:%M')}]")
+
+        if config['show_permissions']:
+            details.append(f"<{item['permissions']}>")
+
+        if details:
+            line += " " + " ".join(details)
+    elif item['type'] == 'directory' and config['show_sizes'] and item.get('total_size') is not None:
+        line += f" ({human_readable_size(item['total_size'])}, файлів: {item['total_files']})"
+
+    return line
+
+
+def tree_header_lines(results):
+    """Повертає рядки заголовка дерева"""
+    return [
+        f"📂 Структура папки: {results['root_path']}",
+        f"🕒 Час сканування: {results['scan_time']}",
+        ""
+    ]
+
+
+def iter_tree_lines(results, config, icon_for):
+    """Генерує рядки дерева за один прохід по structure (лінійний час)"""
+    yield from tree_header_lines(results)
+
+    for item in results['structure']:
+        yield format_tree_line(item, config, icon_for)
@@ -0,0 +1,180 @@
+import os
+import sqlite3
+import threading
+
+from scan_engine import RawEntry
+
+INDEX_FILENAME = "scanner_index.db"
+
+
+def mtime_ns(mtime):
+    """
+    Ключ кешу хешів із st_mtime у секундах: ціле число наносекунд. Пошук дублікатів
+    і порівняння папок передають той самий st_mtime, тож ключі збігаються точно
+    """
+    return round(mtime * 1_000_000_000)
+
+
+class ScanIndex:
+    """
+    Постійний SQLite-індекс сканування.
+    Для кожної папки зберігається її mtime та сирі записи (розмір, mtime, категорія),
+    тож при інкрементальному скануванні незмінену папку не потрібно перечитувати.
+    Також тут кешуються хеші файлів за ключем (шлях, розмір, mtime) для пошуку дублікатів.
+    Одне з'єднання ділиться між потоками пулу під замком.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS dirs (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS entries (
+                path TEXT PRIMARY KEY,
+                dir TEXT NOT NULL,
+                name TEXT NOT NULL,
+                is_dir INTEGER NOT NULL,
+                is_link INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                mode INTEGER NOT NULL,
+                hidden INTEGER NOT NULL,
+                category TEXT
+            );
+            CREATE INDEX IF NOT EXISTS entries_dir ON entries (dir);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            DROP TABLE IF EXISTS hashes;
+            CREATE TABLE IF NOT EXISTS file_hashes (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                partial TEXT,
+                full TEXT
+            );
+        """)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def get_listing(self, dir_path, mtime_ns):
+        """Повертає збережені записи папки, якщо її mtime не змінився, інакше None"""
+        with self.lock:
+            if self.conn is None:
+                return None
+            row = self.conn.execute("SELECT mtime_ns FROM dirs WHERE path = ?", (dir_path,)).fetchone()
+            if row is None or row[0] != mtime_ns:
+                return None
+            rows = self.conn.execute(
+                "SELECT name, path, is_dir, is_link, size, mtime, mode, hidden, category "
+                "FROM entries WHERE dir = ?", (dir_path,)).fetchall()
+        return [RawEntry(name, path, bool(is_dir), bool(is_link), size, mtime, mode, bool(hidden), category)
+                for name, path, is_dir, is_link, size, mtime, mode, hidden, category in rows]
+
+    def store_listing(self, dir_path, mtime_ns, entries):
+        """Замінює збережені записи папки свіжими"""
+        with self.lock:
+            if self.conn is None:
+                return
+            self.conn.execute("DELETE FROM entries WHERE dir = ?", (dir_path,))
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO entries "
+                "(path, dir, name, is_dir, is_link, size, mtime, mode, hidden, category) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(e.path, dir_path, e.name, e.is_dir, e.is_link, e.size, e.mtime, e.mode, e.hidden, e.category)
+                 for e in entries])
+            self.conn.execute("INSERT OR REPLACE INTO dirs (path, mtime_ns) VALUES (?, ?)", (dir_path, mtime_ns))
+
+    def use_classifier(self, signature):
+        """
+        Записи папок містять категорії файлів, тож при зміні правил класифікатора
+        збережені папки скидаються і при наступному скануванні перечитуються
+        """
+        with self.lock:
+            if self.conn is None:
+                return
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'classifier'").fetchone()
+            if row is not None and row[0] == signature:
+                return
+            self.conn.execute("DELETE FROM dirs")
+            self.conn.execute("DELETE FROM entries")
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('classifier', ?)", (signature,))
+            self.conn.commit()
+
+    def prune(self, root_path, visited):
+        """Видаляє папки під root_path, яких не було в останньому скануванні (видалені, перейменовані)"""
+        prefix = os.path.join(root_path, '')
+        with self.lock:
+            if self.conn is None:
+                return
+            stale = [(path,) for path, in self.conn.execute(
+                "SELECT path FROM dirs WHERE path = ? OR substr(path, 1, ?) = ?",
+                (root_path, len(prefix), prefix))
+                if path not in visited]
+            self.conn.executemany("DELETE FROM entries WHERE dir = ?", stale)
+            self.conn.executemany("DELETE FROM dirs WHERE path = ?", stale)
+
+    def get_hashes(self, files, kind):
+        """Повертає {шлях: хеш} для файлів (шлях, розмір, mtime), чий хеш kind ('partial'/'full') вже відомий"""
+        column = self._hash_column(kind)
+        found = {}
+        with self.lock:
+            if self.conn is None:
+                return found
+            for path, size, mtime in files:
+                row = self.conn.execute(
+                    f"SELECT {column} FROM file_hashes WHERE path = ? AND size = ? AND mtime_ns = ?",
+                    (path, size, mtime_ns(mtime))).fetchone()
+                if row is not None and row[0] is not None:
+                    found[path] = row[0]
+        return found
+
+    def store_hashes(self, hashes, kind):
+        """
+        Зберігає хеші [(шлях, розмір, mtime, хеш)]. Оновлюється лише стовпець kind:
+        хеш іншого виду зберігається, поки розмір і mtime файлу ті самі, інакше скидається
+        """
+        column = self._hash_column(kind)
+        other = 'full' if column == 'partial' else 'partial'
+        with self.lock:
+            if self.conn is None:
+                return
+            # У SET усі вирази бачать старий рядок, тож порівняння йде з попередніми size/mtime_ns
+            self.conn.executemany(
+                f"INSERT INTO file_hashes (path, size, mtime_ns, {column}) VALUES (?, ?, ?, ?) "
+                f"ON CONFLICT(path) DO UPDATE SET "
+                f"{other} = CASE WHEN size = excluded.size AND mtime_ns = excluded.mtime_ns "
+                f"THEN {other} END, "
+                f"{column} = excluded.{column}, size = excluded.size, mtime_ns = excluded.mtime_ns",
+                [(path, size, mtime_ns(mtime), digest) for path, size, mtime, digest in hashes])
+            self.conn.commit()
+
+    @staticmethod
+    def _hash_column(kind):
+        if kind not in ('partial', 'full'):
+            raise ValueError(f"Невідомий тип хешу: {kind}")
+        return kind
+
+    def commit(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.commit()
+                self.conn.close()
+                self.conn = None
+
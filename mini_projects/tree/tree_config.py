@@ -0,0 +1,58 @@
+import os
+import sys
+import json
+
+from scan_engine import DEFAULT_SCAN_WORKERS
+from scan_index import INDEX_FILENAME
+
+# Визначаємо SCRIPT_DIR коректно для .exe
+if getattr(sys, 'frozen', False):
+    SCRIPT_DIR = os.path.dirname(sys.executable)
+else:
+    SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class TreeConfig:
+    def __init__(self):
+        self.config = {
+            'excluded_folders': [".git", "__pycache__", "venv", ".idea", "node_modules", "bin", "obj"],
+            'excluded_extensions': ['.tmp', '.log', '.cache'],
+            'max_depth': 0,
+            'show_files': True,
+            'show_hidden': True,
+            'file_icons': True,
+            'show_sizes': True,
+            'show_dates': True,
+            'show_permissions': False,
+            'group_by_type': False,
+            'scan_workers': DEFAULT_SCAN_WORKERS,
+            'streaming_mode': True,
+            'scan_mode': 'full',  # 'full', 'incremental'
+            'last_path': SCRIPT_DIR,
+            'output_format': 'tree'  # 'tree', 'json', 'csv'
+        }
+
+    def save_config(self):
+        """Зберігає конфігурацію у файл"""
+        config_path = os.path.join(SCRIPT_DIR, "scanner_config.json")
+        try:
+            with open(config_path, 'w', encoding='utf-8') as f:
+                json.dump(self.config, f, indent=2, ensure_ascii=False)
+        except Exception:
+            pass
+
+    def load_config(self):
+        """Завантажує конфігурацію з файлу"""
+        config_path = os.path.join(SCRIPT_DIR, "scanner_config.json")
+        try:
+            if os.path.exists(config_path):
+                with open(config_path, 'r', encoding='utf-8') as f:
+                    loaded_config = json.load(f)
+                    self.config.update(loaded_config)
+        except Exception:
+            pass
+
+    @staticmethod
+    def get_index_path():
+        """Шлях до індексу сканування поруч з файлом конфігурації"""
+        return os.path.join(SCRIPT_DIR, INDEX_FILENAME)
@@ -0,0 +1,59 @@
+import csv
+import datetime
+import json
+
+from scan_engine import human_readable_size
+
+CSV_HEADER = ["Тип", "Ім'я", "Шлях", "Розмір (байти)", "Розмір (читабельний)",
+              "Дата модифікації", "Права доступу", "Категорія"]
+
+# Службові ключі, які не мають сенсу в потоковому записі: індекси дерева
+# та підсумки папок, що на момент запису ще не пораховані; mtime дублює modified
+NDJSON_SKIP_KEYS = ('prefix', 'parent', 'children', 'is_last', 'total_size', 'total_files', 'total_folders',
+                    'mtime')
+
+
+def csv_row(item):
+    """Рядок CSV для одного елемента results['structure']"""
+    modified = item.get('modified')
+    return [
+        item['type'],
+        item['name'],
+        item['path'],
+        item.get('size', 0),
+        human_readable_size(item.get('size', 0)),
+        modified.strftime('%Y-%m-%d %H:%M:%S') if modified else '',
+        item.get('permissions', ''),
+        item.get('category', '')
+    ]
+
+
+def write_csv(items, stream):
+    """Записує елементи у CSV по одному, не накопичуючи їх у пам'яті; повертає кількість рядків"""
+    writer = csv.writer(stream, lineterminator='\n')
+    writer.writerow(CSV_HEADER)
+    count = 0
+    for item in items:
+        if item['type'] == 'error':
+            continue
+        writer.writerow(csv_row(item))
+        count += 1
+    return count
+
+
+def ndjson_record(item):
+    """Словник для одного рядка NDJSON"""
+    record = {key: value for key, value in item.items() if key not in NDJSON_SKIP_KEYS}
+    if isinstance(record.get('modified'), datetime.datetime):
+        record['modified'] = record['modified'].isoformat(timespec='seconds')
+    return record
+
+
+def write_ndjson(items, stream):
+    """Записує кожен елемент окремим JSON-рядком одразу після сканування; повертає кількість рядків"""
+    count = 0
+    for item in items:
+        stream.write(json.dumps(ndjson_record(item), ensure_ascii=False))
+        stream.write('\n')
+        count += 1
+    return count